@@ -1 +1,6 @@
-from semantix_genai_inference.inference.model_client import ModelClient
\ No newline at end of file
+def __getattr__(name):
+    # imported on first access so importing the package, e.g. to run the CLI, stays fast
+    if name == "ModelClient":
+        from semantix_genai_inference.inference.model_client import ModelClient
+        return ModelClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
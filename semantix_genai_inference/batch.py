@@ -0,0 +1,182 @@
+import asyncio
+import json
+import os
+from collections.abc import Mapping
+from typing import Optional
+from semantix_genai_inference.inference.codec import dumps
+
+
+class BatchCheckpoint:
+    """ Progress of a batch run, saved atomically so an interrupted run resumes without redoing finished rows.
+
+    Rows complete out of order, so the checkpoint stores the line before which every row is finished, the
+    finished lines after it and the size of the output file at that point. On resume the output is truncated
+    to that size, dropping rows written after the last checkpoint, which are then processed again.
+    Failed rows count as finished so the checkpoint moves past them, and are kept apart with the id of
+    their error record, to be retried by the next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.next_line = 0
+        self.done = set()
+        self.failed = {}
+        self.output_size = 0
+
+    def load(self) -> bool:
+        if not os.path.isfile(self.path):
+            return False
+        with open(self.path) as f:
+            state = json.load(f)
+        self.next_line = state["nextLine"]
+        self.done = set(state["done"])
+        self.failed = {line: row_id for line, row_id in state.get("failed", ())}
+        self.output_size = state["outputSize"]
+        return True
+
+    def save(self) -> None:
+        state = {"nextLine": self.next_line, "done": sorted(self.done),
+                 "failed": [[line, self.failed[line]] for line in sorted(self.failed)], "outputSize": self.output_size}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def mark_done(self, line: int) -> None:
+        self.failed.pop(line, None)
+        self._finish(line)
+
+    def mark_failed(self, line: int, row_id) -> None:
+        self.failed[line] = row_id
+        self._finish(line)
+
+    def _finish(self, line: int) -> None:
+        self.done.add(line)
+        while self.next_line in self.done:
+            self.done.remove(self.next_line)
+            self.next_line += 1
+
+
+def _drop_failed_results(output_path: str, failed: dict) -> None:
+    """ Remove the error records of the rows about to be retried, so the output keeps one result per row """
+    ids = {json.dumps(row_id, sort_keys=True) for row_id in failed.values()}
+    tmp_path = f"{output_path}.tmp"
+    with open(output_path, "rb") as source, open(tmp_path, "wb") as target:
+        for line in source:
+            # only the error records are decoded
+            if b'"error"' in line:
+                record = json.loads(line)
+                if "error" in record and json.dumps(record.get("id"), sort_keys=True) in ids:
+                    continue
+            target.write(line)
+    os.replace(tmp_path, output_path)
+
+
+def _error_of(response):
+    """ Return the error of a response returned instead of raised, the clients return error bodies by default """
+    if not isinstance(response, Mapping):
+        return None
+    if "error" in response:
+        return response["error"]
+    status = response.get("status")
+    if isinstance(status, int) and status >= 400:
+        return response
+    return None
+
+
+async def run_batch(client, input_path: str, output_path: str, concurrency: Optional[int] = 8,
+                    checkpoint_path: Optional[str] = None, method: Optional[str] = "generate",
+                    checkpoint_every: Optional[int] = 100) -> dict:
+    """  Run every request of a JSONL file through a client and write the results to a JSONL file
+
+    Each input line is a JSON object with the keyword arguments of the client method and an optional id,
+    rows are dispatched concurrently and their results are written as they complete. A row that raised or
+    got an error body is sent again by a resumed run, whose result replaces its error in the output.
+
+    Args:
+        client: A client created with ModelClient.create
+        input_path (str): The JSONL file of requests, read lazily
+        output_path (str): The JSONL file of results, each line has the id of the row and either its response or its error
+        concurrency (int, optional): Maximum number of requests in flight. Defaults to 8
+        checkpoint_path (str, optional): Where the progress is saved. Defaults to the output path with a .checkpoint suffix
+        method (str, optional): generate or embeddings. Defaults to generate
+        checkpoint_every (int, optional): Number of completed rows between checkpoints. Defaults to 100
+
+    Returns:
+        dict: The number of rows that succeeded, failed and were skipped because a previous run finished them
+    """
+    call = {"generate": client.agenerate, "embeddings": client.aembeddings}[method]
+    checkpoint = BatchCheckpoint(checkpoint_path or f"{output_path}.checkpoint")
+    if checkpoint.load() and os.path.isfile(output_path):
+        with open(output_path, "r+b") as output:
+            output.truncate(checkpoint.output_size)
+        if checkpoint.failed:
+            _drop_failed_results(output_path, checkpoint.failed)
+        output = open(output_path, "ab")
+    else:
+        checkpoint = BatchCheckpoint(checkpoint.path)
+        output = open(output_path, "wb")
+    stats = {"succeeded": 0, "failed": 0, "skipped": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+    completed = 0
+
+    def save_checkpoint():
+        output.flush()
+        checkpoint.output_size = output.tell()
+        checkpoint.save()
+
+    async def process(line, row):
+        nonlocal completed
+        try:
+            row_id = row.pop("id", line)
+            try:
+                response = await call(**row)
+                error = _error_of(response)
+                record = {"id": row_id, "response": response} if error is None else {"id": row_id, "error": error}
+            except Exception as e:
+                record = {"id": row_id, "error": str(e)}
+            output.write(dumps(record) + b"\n")
+            if "error" in record:
+                stats["failed"] += 1
+                checkpoint.mark_failed(line, row_id)
+            else:
+                stats["succeeded"] += 1
+                checkpoint.mark_done(line)
+            completed += 1
+            if completed % checkpoint_every == 0:
+                save_checkpoint()
+        finally:
+            semaphore.release()
+
+    try:
+        with open(input_path, encoding="utf-8") as requests:
+            for line, text in enumerate(requests):
+                if (line < checkpoint.next_line or line in checkpoint.done) and line not in checkpoint.failed:
+                    stats["skipped"] += 1
+                    continue
+                if not text.strip():
+                    checkpoint.mark_done(line)
+                    continue
+                try:
+                    row = json.loads(text)
+                    if not isinstance(row, dict):
+                        raise ValueError("a row must be a JSON object")
+                except ValueError as e:
+                    output.write(dumps({"id": line, "error": f"Invalid row: {e}"}) + b"\n")
+                    stats["failed"] += 1
+                    checkpoint.mark_done(line)
+                    continue
+                # bounds the rows held in memory to the ones in flight
+                await semaphore.acquire()
+                task = asyncio.ensure_future(process(line, row))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        save_checkpoint()
+        output.close()
+    return stats
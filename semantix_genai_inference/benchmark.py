@@ -0,0 +1,206 @@
+import asyncio
+import sys
+import time
+import tracemalloc
+from collections.abc import Mapping
+from typing import List, Optional, Sequence
+
+MESSAGES = [{"role": "system", "content": "You are a helpful assistant."},
+            {"role": "user", "content": "Write a short story about a client library."}]
+PROMPT = "Write a short story about a client library."
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """ The q-th percentile of values, interpolated between the closest ranks, None when there are no values """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _peak_rss() -> Optional[int]:
+    """ High water mark of the resident memory of the process in bytes, None where it is not available """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class BenchmarkResult:
+    """ Outcome of the requests of one concurrency level, latencies are in seconds """
+
+    def __init__(self, concurrency: int, requests: int, errors: int, duration: float, latencies: List[float],
+                 ttfts: List[float], peak_rss: Optional[int] = None, peak_traced: Optional[int] = None):
+        self.concurrency = concurrency
+        self.requests = requests
+        self.errors = errors
+        self.duration = duration
+        self.latencies = latencies
+        self.ttfts = ttfts
+        self.peak_rss = peak_rss
+        self.peak_traced = peak_traced
+
+    @property
+    def throughput(self) -> float:
+        """ Successful requests per second """
+        return (self.requests - self.errors) / self.duration if self.duration else 0.0
+
+    def latency(self, q: float) -> Optional[float]:
+        return percentile(self.latencies, q)
+
+    def ttft(self, q: float) -> Optional[float]:
+        return percentile(self.ttfts, q)
+
+    def as_dict(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "duration": self.duration,
+            "throughput": self.throughput,
+            "p50": self.latency(50),
+            "p95": self.latency(95),
+            "p99": self.latency(99),
+            "ttftP50": self.ttft(50),
+            "ttftP95": self.ttft(95),
+            "peakRss": self.peak_rss,
+            "peakTraced": self.peak_traced,
+        }
+
+
+async def _request(client, stream: bool) -> Optional[float]:
+    """ Send one request and return its time to first token when streamed, error responses are raised """
+    start = time.perf_counter()
+    chat = hasattr(client, "generate_stream_deltas")
+    if stream:
+        if chat:
+            deltas = client.generate_stream_deltas(MESSAGES)
+        elif hasattr(client, "generate_stream"):
+            deltas = client.generate_stream(PROMPT)
+        else:
+            raise Exception(f"The {type(client).__name__} does not stream responses.")
+        ttft = None
+        async for _ in deltas:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+        return ttft
+    # the response cache would turn the repeated prompt into a lookup
+    response = await client.agenerate(MESSAGES if chat else PROMPT, cache=False)
+    if isinstance(response, Mapping) and "error" in response:
+        raise Exception(str(response["error"]))
+    return None
+
+
+async def run_level(client, concurrency: int, requests: int, stream: Optional[bool] = False,
+                    trace_memory: Optional[bool] = False) -> BenchmarkResult:
+    """  Send requests through a client from concurrency workers and measure them
+
+    Args:
+        client: The client under test, a client created with ModelClient.create or create_mock_client
+        concurrency (int): Number of requests kept in flight
+        requests (int): Number of requests sent
+        stream (bool, optional): Stream the responses and measure the time to first token. Defaults to False
+        trace_memory (bool, optional): Trace the Python allocations to report their peak, which slows the requests down. Defaults to False
+    """
+    latencies, ttfts = [], []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                ttft = await _request(client, stream)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            if ttft is not None:
+                ttfts.append(ttft)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+        duration = time.perf_counter() - start
+        peak_traced = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return BenchmarkResult(concurrency, requests, errors, duration, latencies, ttfts, _peak_rss(), peak_traced)
+
+
+async def run_benchmark(client, concurrency: Sequence[int] = (1, 8, 32), requests: Optional[int] = 200,
+                        stream: Optional[bool] = False, warmup: Optional[int] = 10,
+                        trace_memory: Optional[bool] = False) -> List[BenchmarkResult]:
+    """  Measure a client at increasing concurrency levels, takes the arguments of run_level
+
+    Args:
+        concurrency (Sequence[int], optional): The concurrency levels, run in order. Defaults to 1, 8 and 32
+        warmup (int, optional): Requests sent before the first level to open the pooled connections, not measured. Defaults to 10
+    """
+    if warmup:
+        await run_level(client, min(warmup, max(concurrency)), warmup, stream)
+    return [await run_level(client, level, requests, stream, trace_memory) for level in concurrency]
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """ Render benchmark results as a text table, latencies in milliseconds and memory in megabytes """
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.1f}"
+
+    def mb(value):
+        return "-" if value is None else f"{value / 1048576:.1f}"
+
+    header = ("concurrency", "requests", "errors", "req/s", "p50", "p95", "p99", "ttft p50", "ttft p95", "rss", "traced")
+    rows = [header]
+    for result in results:
+        rows.append((str(result.concurrency), str(result.requests), str(result.errors), f"{result.throughput:.1f}",
+                     ms(result.latency(50)), ms(result.latency(95)), ms(result.latency(99)),
+                     ms(result.ttft(50)), ms(result.ttft(95)), mb(result.peak_rss), mb(result.peak_traced)))
+    widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def create_mock_client(client_type: str, url: str, **kwargs):
+    """  Create a built-in client with default settings sending its requests to a MockServer
+
+    Args:
+        client_type (str): alpaca, llama2, cohere, openai, azure-openai or router
+        url (str): The base url of the MockServer
+        kwargs: Passed to the client, such as session_config, rate_limiter or metrics
+    """
+    if client_type in ("alpaca", "llama2"):
+        if client_type == "alpaca":
+            from semantix_genai_inference.inference.llm.alpaca import AlpacaInferenceClient as client_class
+        else:
+            from semantix_genai_inference.inference.llm.llama2 import Llama2InferenceClient as client_class
+        client = client_class("mock", "mock", version="v0", **kwargs)
+        client.url = f"{url}/v0/inference"
+        return client
+    if client_type == "cohere":
+        from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
+        client = CohereInferenceClient(api_key="mock", **kwargs)
+        client._host = url
+        return client
+    if client_type == "openai":
+        from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+        return OpenAIInferenceClient(api_key="mock", host=url, **kwargs)
+    if client_type == "azure-openai":
+        from semantix_genai_inference.inference.llm.azure_openai import AzureOpenAIInferenceClient
+        return AzureOpenAIInferenceClient(url, "gpt-35-turbo", "2023-05-15", api_key="mock", **kwargs)
+    if client_type == "router":
+        from semantix_genai_inference.inference.llm.router import RouterInferenceClient
+        from semantix_genai_inference.inference.routing import Backend
+        return RouterInferenceClient([Backend(create_mock_client("openai", url, **kwargs), "openai"),
+                                      Backend(create_mock_client("azure-openai", url, **kwargs), "azure-openai")])
+    raise Exception(f"Invalid mock client type: {client_type}, valid options are alpaca, llama2, cohere, openai, azure-openai and router")
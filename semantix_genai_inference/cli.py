@@ -11,5 +11,80 @@ def inference(prompt):
     """SA python client library to make it easier to call Semantix GenAI model inference endpoint"""
     click.echo('CLI is being developed, use this as a module. Your prompt {0}.'.format(prompt))
 
+@cli.command()
+@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+@click.argument('output_file', type=click.Path(dir_okay=False))
+@click.option('--model', '-m', required=True, help='The model client type, the same passed to ModelClient.create.')
+@click.option('--concurrency', '-c', default=8, show_default=True, help='Maximum number of requests in flight.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False), help='Progress file, defaults to OUTPUT_FILE.checkpoint.')
+@click.option('--method', type=click.Choice(['generate', 'embeddings']), default='generate', show_default=True,
+              help='The client method called for each row.')
+def batch(input_file, output_file, model, concurrency, checkpoint, method):
+    """Run the requests of a JSONL file concurrently and write the results to a JSONL file.
+
+    Each line of INPUT_FILE is a JSON object with the arguments of the client method and an optional id.
+    An interrupted run resumes from its checkpoint when called again with the same files.
+    """
+    import asyncio
+    from semantix_genai_inference import ModelClient
+    from semantix_genai_inference.batch import run_batch
+
+    async def run():
+        async with ModelClient.create(model) as client:
+            return await run_batch(client, input_file, output_file, concurrency=concurrency,
+                                   checkpoint_path=checkpoint, method=method)
+
+    stats = asyncio.run(run())
+    click.echo('{succeeded} succeeded, {failed} failed, {skipped} skipped.'.format(**stats))
+
+@cli.command()
+@click.option('--model', '-m', required=True, help='The model client type, the same passed to ModelClient.create.')
+@click.option('--concurrency', '-c', default='1,8,32', show_default=True, help='Comma separated concurrency levels.')
+@click.option('--requests', '-n', default=200, show_default=True, help='Requests sent at each concurrency level.')
+@click.option('--stream', is_flag=True, help='Stream the responses and measure the time to first token.')
+@click.option('--warmup', default=10, show_default=True, help='Requests sent before measuring.')
+@click.option('--trace-memory', is_flag=True, help='Report the peak of the Python allocations, slows the requests down.')
+@click.option('--live', is_flag=True, help='Call the APIs configured in semantix.yaml instead of a local mock server.')
+@click.option('--latency', default=0.05, show_default=True, help='Seconds the mock server waits before answering.')
+@click.option('--jitter', default=0.0, show_default=True, help='Maximum seconds added to or removed from the mock latency.')
+@click.option('--chunk-delay', default=0.0, show_default=True, help='Seconds between the chunks of mock streams.')
+@click.option('--tokens', default=16, show_default=True, help='Words of each mock completion.')
+@click.option('--throttle-rate', default=0.0, show_default=True, help='Fraction of mock requests answered with 429.')
+@click.option('--error-rate', default=0.0, show_default=True, help='Fraction of mock requests answered with 500.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON lines.')
+def benchmark(model, concurrency, requests, stream, warmup, trace_memory, live, latency, jitter, chunk_delay, tokens,
+              throttle_rate, error_rate, as_json):
+    """Measure the throughput, latency percentiles, time to first token and memory of a client.
+
+    By default the client has default settings and calls a local server emulating the API, so the
+    numbers show the overhead of the library rather than of the network.
+    """
+    import asyncio
+    import json
+    from contextlib import nullcontext
+    from semantix_genai_inference.benchmark import create_mock_client, format_results, run_benchmark
+    from semantix_genai_inference.mock_server import MockConfig, MockServer
+
+    levels = [int(level) for level in concurrency.split(',')]
+    config = MockConfig(latency=latency, jitter=jitter, chunk_delay=chunk_delay, tokens=tokens,
+                        throttle_rate=throttle_rate, error_rate=error_rate)
+
+    async def run(url):
+        if url is None:
+            from semantix_genai_inference import ModelClient
+            client = ModelClient.create(model, reuse=False)
+        else:
+            client = create_mock_client(model, url)
+        async with client:
+            return await run_benchmark(client, levels, requests, stream, warmup, trace_memory)
+
+    with (nullcontext() if live else MockServer(config)) as server:
+        results = asyncio.run(run(server.url if server is not None else None))
+    if as_json:
+        for result in results:
+            click.echo(json.dumps(result.as_dict()))
+    else:
+        click.echo(format_results(results))
+
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    cli()
@@ -0,0 +1,129 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+
+class BatchingConfig:
+    """  Dynamic batching settings of the Semantix Hub clients
+
+    Args:
+        max_batch_size (int, optional): Maximum number of prompts sent in one request. Defaults to 16
+        max_wait (float, optional): Seconds the first prompt of a batch waits for others to join it. Defaults to 0.01
+    """
+
+    def __init__(self, max_batch_size: Optional[int] = 16, max_wait: Optional[float] = 0.01):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a BatchingConfig from the `batching` section of semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys maxBatchSize and maxWaitMs
+        """
+        config = config or {}
+        kwargs = {}
+        if "maxBatchSize" in config:
+            kwargs["max_batch_size"] = config["maxBatchSize"]
+        if "maxWaitMs" in config:
+            kwargs["max_wait"] = config["maxWaitMs"] / 1000
+        return cls(**kwargs)
+
+
+def split_batch_response(response, size: int) -> list:
+    """ Split the response of a batched request into the responses each single prompt request would get.
+
+    The inference server answers either a list with one item per prompt, or a dict whose list values
+    have one item per prompt.
+    """
+    if isinstance(response, list) and len(response) == size:
+        return [[item] for item in response]
+    if isinstance(response, dict):
+        batched = [key for key, value in response.items() if isinstance(value, list) and len(value) == size]
+        if batched:
+            responses = []
+            for i in range(size):
+                item = dict(response)
+                for key in batched:
+                    item[key] = [response[key][i]]
+                responses.append(item)
+            return responses
+    raise Exception(f"Can't split the inference server response into {size} results: {response}")
+
+
+class _Batch:
+    __slots__ = ("prompts", "futures", "timer")
+
+    def __init__(self):
+        self.prompts = []
+        self.futures = []
+        self.timer = None
+
+
+class MicroBatcher:
+    """ Coalesces concurrent single prompt requests with the same parameters into one batched request """
+
+    def __init__(self, send: Callable[[List[str], dict], Awaitable], config: BatchingConfig):
+        self._send = send
+        self.config = config
+        self._pending = {}
+        # the loop only keeps weak references to tasks, the batches in flight are kept here
+        self._tasks = set()
+
+    async def submit(self, prompt: str, params: dict):
+        loop = asyncio.get_running_loop()
+        key = (loop, tuple(sorted(params.items())))
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _Batch()
+            self._pending[key] = batch
+            batch.timer = loop.call_later(self.config.max_wait, self._flush, key, batch)
+        future = loop.create_future()
+        batch.prompts.append(prompt)
+        batch.futures.append(future)
+        if len(batch.prompts) >= self.config.max_batch_size:
+            self._flush(key, batch)
+        return await future
+
+    def _flush(self, key, batch: _Batch):
+        if self._pending.get(key) is not batch:
+            return
+        del self._pending[key]
+        batch.timer.cancel()
+        task = asyncio.ensure_future(self._dispatch(batch, dict(key[1])))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def aclose(self):
+        """ Send the pending batches of the running loop and wait for its batches in flight, those of other loops are cancelled """
+        loop = asyncio.get_running_loop()
+        for key, batch in list(self._pending.items()):
+            if key[0] is loop:
+                self._flush(key, batch)
+        tasks = []
+        for task in list(self._tasks):
+            if task.get_loop() is loop:
+                tasks.append(task)
+            elif not task.get_loop().is_closed():
+                task.get_loop().call_soon_threadsafe(task.cancel)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _dispatch(self, batch: _Batch, params: dict):
+        try:
+            response = await self._send(batch.prompts, params)
+            results = split_batch_response(response, len(batch.prompts))
+        except asyncio.CancelledError:
+            for future in batch.futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
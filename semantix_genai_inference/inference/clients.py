@@ -0,0 +1,588 @@
+import os
+import asyncio
+from typing import Optional, List, Union
+from abc import ABC, abstractmethod
+from .session import PooledHttpClient, ResponseError, SessionConfig
+from .batching import BatchingConfig, MicroBatcher
+from .embeddings import import_numpy, pack_batches, parse_embeddings
+from .embedding_cache import EmbeddingCache
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .ratelimit import RateLimiter
+from .hedging import Hedger, HedgingConfig
+from .metrics import Metrics
+from .single_flight import SingleFlight
+from .conversation import Conversation
+from .responses import ChatCompletion, Embeddings
+from .tokens import OVERFLOW_MODES, context_window as model_context_window, fit_messages, fit_prompt
+from .streaming import ChoiceStreams, iter_chat_deltas
+
+def _check_overflow(overflow: Optional[str]) -> Optional[str]:
+    if overflow is not None and overflow not in OVERFLOW_MODES:
+        raise Exception(f"Invalid overflow mode: {overflow}, valid options are {', '.join(OVERFLOW_MODES)}")
+    return overflow
+
+def _resolve_window(window: Optional[int], model: str) -> int:
+    window = window or model_context_window(model)
+    if window is None:
+        raise Exception(f"Unknown context window of model {model}, pass context_window to the client.")
+    return window
+
+class SemantixGenClient(PooledHttpClient, ABC):
+    def __init__(self, inference_server_id: str, api_secret: Optional[str], 
+                 version: Optional[str]="v0", server: Optional[str]="app.elemeno.ai",
+                 session_config: Optional[SessionConfig]=None,
+                 batching: Optional[BatchingConfig]=None,
+                 response_cache: Optional[ResponseCache]=None,
+                 metrics: Optional[Metrics]=None,
+                 single_flight: Optional[SingleFlight]=None):
+        super().__init__(session_config, response_cache, metrics=metrics, single_flight=single_flight)
+        # when batching is set, concurrent generate calls are coalesced into batched requests
+        self._batcher = MicroBatcher(self._complete_batch, batching) if batching else None
+        self.inference_server_id = inference_server_id
+        self.url = f"https://infserv-{inference_server_id}.{server}/{version}/inference"
+
+        if not api_secret:
+            api_secret = os.environ.get("SEMANTIX_API_SECRET")
+        if not api_secret:
+            raise Exception("No API secret provided. Either pass it as an argument or set the SEMANTIX_API_SECRET environment variable.")
+
+        # set the Authorization header sent on every request
+        self.headers = {
+            "Authorization": f"Bearer {api_secret}",
+        }
+
+    def add_header(self, key, value):
+        self.headers[key] = value
+
+    def _model_label(self):
+        return self.inference_server_id
+
+    async def aclose(self):
+        """ Wait for the batches in flight, then close the pooled sessions of this client """
+        if self._batcher is not None:
+            await self._batcher.aclose()
+        await super().aclose()
+
+    @abstractmethod
+    def generate(self, **kwargs):
+        pass
+
+    @abstractmethod
+    async def agenerate(self, **kwargs):
+        """  Awaitable version of generate, takes the same arguments """
+        pass
+
+    @abstractmethod
+    def generate_batch(self, prompts: List[str], **kwargs):
+        """  Generate the completions of several prompts in a single request to the inference server
+
+        Args:
+            prompts (List[str]): The prompts to complete, the other arguments are the same of generate and apply to every prompt
+        """
+        pass
+
+    @abstractmethod
+    async def agenerate_batch(self, prompts: List[str], **kwargs):
+        """  Awaitable version of generate_batch, takes the same arguments """
+        pass
+
+    async def _complete_batch(self, prompts: List[str], params: dict):
+        return await self._complete_async(prompts, **params)
+
+    async def _submit_batched(self, prompt: str, params: dict, cache_key: Optional[str]):
+        if cache_key is not None:
+            cached = await self.response_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+        response = await self._batcher.submit(prompt, params)
+        # a failure must not be replayed as a hit
+        if cache_key is not None and not (isinstance(response, dict) and "error" in response):
+            await self.response_cache.aset(cache_key, response)
+        return response
+
+class CohereClient(PooledHttpClient, ABC):
+
+    def __init__(self, api_key: Optional[str]=None, 
+                 generate_model: Optional[str] = "command",
+                 version: Optional[str] = "v1",
+                 session_config: Optional[SessionConfig]=None,
+                 response_cache: Optional[ResponseCache]=None,
+                 rate_limiter: Optional[RateLimiter]=None,
+                 context_window: Optional[int]=None,
+                 overflow: Optional[str]=None,
+                 metrics: Optional[Metrics]=None,
+                 single_flight: Optional[SingleFlight]=None):
+        super().__init__(session_config, response_cache, rate_limiter, metrics, single_flight)
+        self._api_key = api_key
+        self._generate_model = generate_model
+        # prompts are checked against the context window before they are sent, see fit_prompt
+        self.context_window = context_window
+        self.overflow = _check_overflow(overflow)
+        self._host = "https://api.cohere.ai"
+        self._version = version
+
+        if not api_key:
+            api_key = os.environ.get("COHERE_API_KEY")
+        if not api_key:
+            raise Exception("No API key provided. Either pass it as an argument or set the COHERE_API_KEY environment variable.")
+
+        # set the Authorization header sent on every request
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+        }
+
+    def add_header(self, key, value):
+        self.headers[key] = value
+
+    def _model_label(self):
+        return self._generate_model
+
+    def _fit_prompt(self, prompt: str, max_tokens):
+        if self.overflow is None and max_tokens != "auto":
+            return prompt, max_tokens
+        return fit_prompt(prompt, _resolve_window(self.context_window, self._generate_model), max_tokens, self.overflow)
+
+    @abstractmethod
+    def generate(self, prompt: str, num_generations: Optional[int],
+                 stream: Optional[bool], max_tokens: Optional[int],
+                 truncate: Optional[str], temperature: Optional[float],
+                 preset: Optional[str], end_sequences: Optional[List[str]],
+                 stop_sequences: Optional[List[str]], k: Optional[int], 
+                 p: Optional[float], frequency_penalty: Optional[float],
+                 presence_penalty: Optional[float], return_likelihoods: Optional[str],
+                 logit_bias: Optional[dict], cache: Optional[bool]):
+        """  Call cohere generate API to generates realistic text conditioned on a given input.
+
+        Args:
+            prompt (str): The input text that serves as the starting point for generating the response. Note: The prompt will be pre-processed and modified before reaching the model.
+            num_generations (int, optional): The maximum number of generations that will be returned. Defaults to 1, min value of 1, max value of 5
+            stream (bool, optional): When true, the generation is streamed by the API as a JSON stream of events and the full response is returned once it finishes. Use generate_stream to receive the events as they are generated, which is beneficial for user interfaces that render the contents of the response piece by piece.
+            max_tokens (int, optional): The maximum number of tokens the model will generate as part of the response. Note: Setting a low value may result in incomplete generations. Defaults to 20. Pass "auto" to use all the room the prompt leaves in the context window
+            truncate (str, optional): One of NONE|START|END to specify how the API will handle inputs longer than the maximum token length.
+            temperature (float, optional): A non-negative float that tunes the degree of randomness in generation. Lower temperatures mean less random generations. Defaults to 0.75, min value of 0.0, max value of 5.0.
+            preset (str, optional): Identifier of a custom preset. A preset is a combination of parameters, such as prompt, temperature etc
+            end_sequences (List[str], optional): The generated text will be cut at the beginning of the earliest occurence of an end sequence. The sequence will be excluded from the text
+            start_sequences (List[str], optional): The generated text will be cut at the end of the earliest occurence of a stop sequence. The sequence will be included the text
+            k (int, optional): Ensures only the top k most likely tokens are considered for generation at each step. Defaults to 0, min value of 0, max value of 500
+            p (float, optional): Ensures that only the most likely tokens, with total probability mass of p, are considered for generation at each step. If both k and p are enabled, p acts after k. Defaults to 0. min value of 0.01, max value of 0.99
+            frequency_penalty (float, optional): Used to reduce repetitiveness of generated tokens. The higher the value, the stronger a penalty is applied to previously present tokens, proportional to how many times they have already appeared in the prompt or prior generation
+            presence_penalty (float, optional): Defaults to 0.0, min value of 0.0, max value of 1.0. Can be used to reduce repetitiveness of generated tokens. Similar to frequency_penalty, except that this penalty is applied equally to all tokens that have already appeared, regardless of their exact frequencies
+            return_likelihoods (str, optional): One of GENERATION|ALL|NONE to specify how and if the token likelihoods are returned with the response. Defaults to NONE
+            logit_bias (dict, optional): sed to prevent the model from generating unwanted tokens or to incentivize it to include desired tokens. The format is {token_id: bias} where bias is a float between -10 and 10
+            cache (bool, optional): Set to False to bypass the response cache of the client for this call. True does not cache a request sampled with a temperature other than 0 unless the cache allows nondeterministic requests. Defaults to True
+        """
+        pass
+
+    @abstractmethod
+    async def agenerate(self, prompt: str, num_generations: Optional[int],
+                 stream: Optional[bool], max_tokens: Optional[int],
+                 truncate: Optional[str], temperature: Optional[float],
+                 preset: Optional[str], end_sequences: Optional[List[str]],
+                 stop_sequences: Optional[List[str]], k: Optional[int], 
+                 p: Optional[float], frequency_penalty: Optional[float],
+                 presence_penalty: Optional[float], return_likelihoods: Optional[str],
+                 logit_bias: Optional[dict], cache: Optional[bool]):
+        """  Awaitable version of generate, takes the same arguments """
+        pass
+
+    @abstractmethod
+    async def generate_stream(self, prompt: str, num_generations: Optional[int],
+                 max_tokens: Optional[int], truncate: Optional[str], temperature: Optional[float],
+                 preset: Optional[str], end_sequences: Optional[List[str]],
+                 stop_sequences: Optional[List[str]], k: Optional[int], 
+                 p: Optional[float], frequency_penalty: Optional[float],
+                 presence_penalty: Optional[float], return_likelihoods: Optional[str],
+                 logit_bias: Optional[dict]):
+        """  Stream a cohere generation, takes the same arguments of generate except stream and cache
+
+        Yields:
+            GenerationDelta: The text generated since the previous event, the last event has is_finished set and carries the full response
+        """
+        pass
+
+class OpenAIClient(PooledHttpClient, ABC):
+
+    def __init__(self, api_key: Optional[str]=None, 
+                 model: Optional[str] = "gpt-4",
+                 embeddings_model: Optional[str] = "text-embedding-ada-002",
+                 host: Optional[str] = "https://api.openai.com",
+                 version: Optional[str] = "v1",
+                 session_config: Optional[SessionConfig]=None,
+                 embedding_cache: Optional[EmbeddingCache]=None,
+                 response_cache: Optional[ResponseCache]=None,
+                 rate_limiter: Optional[RateLimiter]=None,
+                 hedging: Optional[HedgingConfig]=None,
+                 hedge_client: Optional["OpenAIClient"]=None,
+                 context_window: Optional[int]=None,
+                 overflow: Optional[str]=None,
+                 metrics: Optional[Metrics]=None,
+                 single_flight: Optional[SingleFlight]=None,
+                 semantic_cache: Optional[SemanticCache]=None,
+                 embeddings_client: Optional["OpenAIClient"]=None):
+        super().__init__(session_config, response_cache, rate_limiter, metrics, single_flight)
+        # when set, chat completions are also looked up by the embedding of their prompt, made by embeddings_client if given
+        self.semantic_cache = semantic_cache
+        self.embeddings_client = embeddings_client
+        # prompts are checked against the context window before they are sent, see fit_messages
+        self.context_window = context_window
+        self.overflow = _check_overflow(overflow)
+        # when hedging is set, slow chat completions are duplicated, to hedge_client if given
+        self._hedger = Hedger(hedging) if hedging else None
+        self.hedge_client = hedge_client
+        self._api_key = api_key
+        self._model = model
+        self._embeddings_model = embeddings_model
+        # identifies the embedding model in the cache keys
+        self._embeddings_id = embeddings_model
+        self.embedding_cache = embedding_cache
+        self._host = host
+        self._version = version
+
+        if not api_key:
+            api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise Exception("No API key provided. Either pass it as an argument or set the OPENAI_API_KEY environment variable.")
+
+        # set the Authorization header sent on every request
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+        }
+
+    def add_header(self, key, value):
+        self.headers[key] = value
+
+    def _model_label(self):
+        return self._model
+
+    def _fit_messages(self, messages: Union[List[dict], Conversation], max_tokens):
+        if self.overflow is None and max_tokens != "auto":
+            return messages, max_tokens
+        window = _resolve_window(self.context_window, self._model)
+        if not isinstance(messages, Conversation):
+            return fit_messages(messages, window, max_tokens, self.overflow)
+        kept, max_tokens = fit_messages(messages.messages, window, max_tokens, self.overflow, messages.message_tokens)
+        return (messages if len(kept) == len(messages) else messages._select(kept)), max_tokens
+
+    @abstractmethod
+    def generate(self, messages: List[dict], functions: Optional[List[dict]], function_call: Optional[str],
+                    temperature: Optional[float], top_p: Optional[float], n: Optional[int], stop: Optional[Union[str, List[str]]], 
+                    max_tokens: Optional[int], presence_penalty: Optional[float], frequency_penalty: Optional[float], 
+                    logit_bias: Optional[dict], user: Optional[str], cache: Optional[bool]
+                 ):
+        """  Call OpenAI API to create a chat completion for the provided prompt and parameters
+
+        Args:
+            messages (List[dict]): A list of messages comprising the conversation so far. Each message is a dictionary with the following keys: role, content, name, and function_call.
+            functions (List[dict], optional): A list of functions the model may generate JSON inputs for. Each message is a dictionary with the following keys: name, description, and parameters.
+            function_call (str, optional): Controls how the model responds to function calls. none means the model does not call a function, and responds to the end-user. auto means the model can pick between an end-user or calling a function. Specifying a particular function via {"name": "my_function"} forces the model to call that function. none is the default when no functions are present. auto is the default if functions are present.
+            temperature (float, optional): What sampling temperature to use, between 0 and 2. Higher values like 0.8 will make the output more random, while lower values like 0.2 will make it more focused and deterministic.
+            top_p (float, optional): An alternative to sampling with temperature, called nucleus sampling, where the model considers the results of the tokens with top_p probability mass. So 0.1 means only the tokens comprising the top 10% probability mass are considered.
+            n (int, optional): How many chat completion choices to generate for each input message.
+            logprobs (int, optional): Include the log probabilities on the logprobs most likely tokens, as well the chosen tokens. For example, if logprobs is 10, the API will return a list of the 10 most likely tokens.
+            echo (bool, optional): Echo back the prompt in addition to the completion.
+            stop (Union[str, List[str]], optional): One or more sequences where the API will stop generating further tokens. The returned text will not contain the stop sequence.
+            max_tokens (int, optional): The maximum number of tokens to generate. Pass "auto" to use all the room the prompt leaves in the context window.
+            presence_penalty (float, optional): What penalty to apply if a token is already present at all. Between 0 and 1.
+            frequency_penalty (float, optional): What penalty to apply if a token has already been generated. 0 means no penalty. Between 0 and 1.
+            best_of (int, optional): Generates best_of completions server-side and returns the "best" (the one with the lowest log probability per token). Results cannot be streamed.
+            logit_bias (dict, optional): Modify the likelihood of specified tokens appearing in the completion. Accepts a json object that maps tokens (specified by their token ID in the GPT tokenizer) to an associated bias value from -100 to 100. You can use this tokenizer tool (which works for both GPT-2 and GPT-3) to convert text to token IDs. Mathematically, the bias is added to the logits generated by the model prior to sampling. The exact effect will vary per model, but values between -1 and 1 should decrease or increase likelihood of selection; values like -100 or 100 should result in a ban or exclusive selection of the relevant token.
+            user (str, optional): A string to use as the user identifier for the request. This will let opeani correlate requests with your usage in the billing dashboard.
+            cache (bool, optional): Set to False to bypass the response cache of the client for this call. True does not cache a request sampled with a temperature other than 0 unless the cache allows nondeterministic requests. Defaults to True
+        """
+        pass
+
+    @abstractmethod
+    async def agenerate(self, messages: List[dict], functions: Optional[List[dict]], function_call: Optional[str],
+                    temperature: Optional[float], top_p: Optional[float], n: Optional[int], stop: Optional[Union[str, List[str]]], 
+                    max_tokens: Optional[int], presence_penalty: Optional[float], frequency_penalty: Optional[float], 
+                    logit_bias: Optional[dict], user: Optional[str], cache: Optional[bool]
+                 ):
+        """  Awaitable version of generate, takes the same arguments """
+        pass
+
+    @abstractmethod
+    async def generate_stream(self, messages: List[dict], functions: Optional[List[dict]], function_call: Optional[str],
+                    temperature: Optional[float], top_p: Optional[float], n: Optional[int], stop: Optional[Union[str, List[str]]], 
+                    max_tokens: Optional[int], presence_penalty: Optional[float], frequency_penalty: Optional[float], 
+                    logit_bias: Optional[dict], user: Optional[str]
+                 ):
+        """  Call OpenAI API to create a chat completion for the provided prompt and parameters
+
+        Args:
+            messages (List[dict]): A list of messages comprising the conversation so far. Each message is a dictionary with the following keys: role, content, name, and function_call.
+            functions (List[dict], optional): A list of functions the model may generate JSON inputs for. Each message is a dictionary with the following keys: name, description, and parameters.
+            function_call (str, optional): Controls how the model responds to function calls. none means the model does not call a function, and responds to the end-user. auto means the model can pick between an end-user or calling a function. Specifying a particular function via {"name": "my_function"} forces the model to call that function. none is the default when no functions are present. auto is the default if functions are present.
+            temperature (float, optional): What sampling temperature to use, between 0 and 2. Higher values like 0.8 will make the output more random, while lower values like 0.2 will make it more focused and deterministic.
+            top_p (float, optional): An alternative to sampling with temperature, called nucleus sampling, where the model considers the results of the tokens with top_p probability mass. So 0.1 means only the tokens comprising the top 10% probability mass are considered.
+            n (int, optional): How many chat completion choices to generate for each input message.
+            logprobs (int, optional): Include the log probabilities on the logprobs most likely tokens, as well the chosen tokens. For example, if logprobs is 10, the API will return a list of the 10 most likely tokens.
+            echo (bool, optional): Echo back the prompt in addition to the completion.
+            stop (Union[str, List[str]], optional): One or more sequences where the API will stop generating further tokens. The returned text will not contain the stop sequence.
+            max_tokens (int, optional): The maximum number of tokens to generate. Pass "auto" to use all the room the prompt leaves in the context window.
+            presence_penalty (float, optional): What penalty to apply if a token is already present at all. Between 0 and 1.
+            frequency_penalty (float, optional): What penalty to apply if a token has already been generated. 0 means no penalty. Between 0 and 1.
+            best_of (int, optional): Generates best_of completions server-side and returns the "best" (the one with the lowest log probability per token). Results cannot be streamed.
+            logit_bias (dict, optional): Modify the likelihood of specified tokens appearing in the completion. Accepts a json object that maps tokens (specified by their token ID in the GPT tokenizer) to an associated bias value from -100 to 100. You can use this tokenizer tool (which works for both GPT-2 and GPT-3) to convert text to token IDs. Mathematically, the bias is added to the logits generated by the model prior to sampling. The exact effect will vary per model, but values between -1 and 1 should decrease or increase likelihood of selection; values like -100 or 100 should result in a ban or exclusive selection of the relevant token.
+            user (str, optional): A string to use as the user identifier for the request. This will let opeani correlate requests with your usage in the billing dashboard.
+        """
+        pass
+    
+    async def generate_stream_deltas(self, messages: List[dict], functions: Optional[List[dict]]=None,
+                    function_call: Optional[str]=None,
+                    temperature: Optional[float]=None,
+                    top_p: Optional[float]=None,
+                    n: Optional[int]=None,
+                    stop: Optional[Union[str, List[str]]]=None,
+                    max_tokens: Optional[int]=None,
+                    presence_penalty: Optional[float]=None,
+                    frequency_penalty: Optional[float]=None,
+                    logit_bias: Optional[dict]=None,
+                    user: Optional[str]=None):
+        """  Stream a chat completion as parsed ChatCompletionDelta objects, takes the same arguments of generate_stream
+
+        The Server-Sent Events framing, the [DONE] sentinel and the JSON decoding are handled here,
+        use ChatStreamAccumulator or `accumulate` to rebuild the final messages.
+        """
+        url, body = self._chat_request(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                       presence_penalty, frequency_penalty, logit_bias, user, stream=True)
+        async for delta in self._shared_stream(url, body, "deltas", lambda: self._stream_deltas(url, body)):
+            yield delta
+
+    async def _stream_lines(self, url: str, body: dict):
+        async with self._post_stream(url, body) as response:
+            async for line in response.content:
+                yield line
+
+    async def _stream_deltas(self, url: str, body: dict):
+        async with self._post_stream(url, body) as response:
+            if response.status >= 400:
+                text = await response.text()
+                raise ResponseError(response.status, text,
+                                    f"Chat completion stream failed with status {response.status}: {text}")
+            async for delta in iter_chat_deltas(response.content):
+                yield delta
+
+    def generate_stream_sync(self, messages: List[dict], functions: Optional[List[dict]]=None,
+                    function_call: Optional[str]=None,
+                    temperature: Optional[float]=None,
+                    top_p: Optional[float]=None,
+                    n: Optional[int]=None,
+                    stop: Optional[Union[str, List[str]]]=None,
+                    max_tokens: Optional[int]=None,
+                    presence_penalty: Optional[float]=None,
+                    frequency_penalty: Optional[float]=None,
+                    logit_bias: Optional[dict]=None,
+                    user: Optional[str]=None,
+                    deltas: Optional[bool]=False,
+                    max_buffer: Optional[int]=16):
+        """  Sync version of generate_stream, a regular iterator for threaded code, takes the same arguments
+
+        The stream is read on the shared background loop. Up to max_buffer items are read ahead, then the
+        connection waits for the caller. Stopping the iteration early closes the response.
+
+        Args:
+            deltas (bool, optional): Yield ChatCompletionDelta objects, as generate_stream_deltas, instead of the raw lines. Defaults to False
+            max_buffer (int, optional): Maximum number of items read ahead of the caller. Defaults to 16
+        """
+        stream = self.generate_stream_deltas if deltas else self.generate_stream
+        return self._iter_sync(stream(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                      presence_penalty, frequency_penalty, logit_bias, user), max_buffer)
+
+    def generate_stream_choices(self, messages: List[dict], n: int, max_buffer: Optional[int] = 64,
+                                **kwargs) -> ChoiceStreams:
+        """  Stream the n choices of a chat completion as one async iterator of ChoiceDelta per choice, over a single connection
+
+        Args:
+            messages (List[dict]): The messages, as in generate_stream
+            n (int): How many chat completion choices to generate
+            max_buffer (int, optional): Maximum number of deltas buffered per choice before the connection stops being read, 0 is unbounded. Defaults to 64
+            kwargs: The other arguments of generate_stream
+
+        Returns:
+            A ChoiceStreams to use with `async with`, which gives the list of the choice streams
+        """
+        return ChoiceStreams(self.generate_stream_deltas(messages, n=n, **kwargs), n, max_buffer)
+
+    async def _complete_chat(self, request_args: tuple, cache: bool):
+        url, body = self._chat_request(*request_args)
+        cache_key = self._response_cache_key(url, body, cache)
+        query = self.semantic_cache.query_for(url, body) if cache and self.semantic_cache is not None else None
+        if query is None:
+            return await self._send_chat(request_args, url, body, cache_key)
+        # an exact hit saves the embeddings request
+        if cache_key is not None:
+            cached = await self.response_cache.aget(cache_key, ChatCompletion)
+            if cached is not None:
+                return cached
+        partition, prompt = query
+        vector = await self._prompt_embedding(prompt)
+        if vector is None:
+            self.semantic_cache.stats.misses += 1
+            return await self._send_chat(request_args, url, body, cache_key)
+        cached = await self.semantic_cache.aget(partition, vector, ChatCompletion)
+        if cached is not None:
+            return cached
+        response = await self._send_chat(request_args, url, body, cache_key)
+        if "error" not in response:
+            await self.semantic_cache.aset(partition, vector, prompt, response)
+        return response
+
+    async def _prompt_embedding(self, prompt: str):
+        """ The embedding of a prompt looked up in the semantic cache, None when it can't be had """
+        client = self.embeddings_client or self
+        try:
+            response = await client.aembeddings(prompt)
+            if "error" in response:
+                return None
+            return parse_embeddings(response, 1)[0]
+        except Exception:
+            # the cache must not fail the completion, it is sent as on a miss
+            return None
+
+    async def _send_chat(self, request_args: tuple, url: str, body: dict, cache_key: Optional[str]):
+        if self._hedger is None:
+            return await self._post_json(url, body, cache_key, ChatCompletion)
+        if cache_key is not None:
+            cached = await self.response_cache.aget(cache_key, ChatCompletion)
+            if cached is not None:
+                return cached
+        target = self.hedge_client or self
+        hedge_url, hedge_body = target._chat_request(*request_args)
+        # the API reports failures in an error key, an error body must not win over a healthy request,
+        # and the hedge must not join the single flight of the request it duplicates
+        response = await self._hedger.run(lambda: self._post_json(url, body, response_class=ChatCompletion),
+                                          lambda: target._post_json(hedge_url, hedge_body, response_class=ChatCompletion,
+                                                                    flight="hedge"),
+                                          lambda response: "error" in response)
+        if cache_key is not None and "error" not in response:
+            await self.response_cache.aset(cache_key, response)
+        return response
+
+    @property
+    def hedging_stats(self):
+        """ Requests, hedges and hedge wins of the client, None when hedging is off """
+        return self._hedger.stats if self._hedger is not None else None
+
+    @abstractmethod
+    def _chat_request(self, messages: List[dict], functions: Optional[List[dict]], function_call: Optional[str],
+                      temperature: Optional[float], top_p: Optional[float], n: Optional[int],
+                      stop: Optional[Union[str, List[str]]], max_tokens: Optional[int],
+                      presence_penalty: Optional[float], frequency_penalty: Optional[float],
+                      logit_bias: Optional[dict], user: Optional[str], stream: Optional[bool]):
+        """  Build the url and the body of a chat completion request """
+        pass
+
+    @abstractmethod
+    def embeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str]):
+        """  Call OpenAI embedding API to tokenize the provided text
+
+        Args:
+            text (Union[str, List[str], List[dict]]): A string, a list of strings embedded in a single request or a list of message objects to tokenize
+            user (str, optional): A string to use as the user identifier for the request. This will let opeani correlate requests with your usage in the billing dashboard.
+
+        Returns:
+            List[dict]: A list of embedding objects
+        """
+        pass
+
+    @abstractmethod
+    async def aembeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str]):
+        """  Awaitable version of embeddings, takes the same arguments """
+        pass
+
+    def embed_many(self, texts: List[str], max_batch_size: Optional[int] = 256,
+                   max_batch_tokens: Optional[int] = 100000, concurrency: Optional[int] = 8,
+                   user: Optional[str] = None, encoding_format: Optional[str] = None):
+        """  Embed a large list of texts with concurrent batched requests
+
+        Args:
+            texts (List[str]): The texts to embed
+            max_batch_size (int, optional): Maximum number of texts sent in one request. Defaults to 256
+            max_batch_tokens (int, optional): Maximum estimated number of tokens sent in one request. Defaults to 100000
+            concurrency (int, optional): Maximum number of requests in flight. Defaults to 8
+            user (str, optional): A string to use as the user identifier for the request. This will let opeani correlate requests with your usage in the billing dashboard.
+            encoding_format (str, optional): float or base64, base64 responses are smaller and faster to decode when the API supports it
+
+        Returns:
+            numpy.ndarray: A contiguous float32 matrix with one row per text, in the order of texts
+        """
+        return self._run_sync(self.aembed_many(texts, max_batch_size, max_batch_tokens, concurrency, user, encoding_format))
+
+    async def aembed_many(self, texts: List[str], max_batch_size: Optional[int] = 256,
+                          max_batch_tokens: Optional[int] = 100000, concurrency: Optional[int] = 8,
+                          user: Optional[str] = None, encoding_format: Optional[str] = None):
+        """  Awaitable version of embed_many, takes the same arguments """
+        np = import_numpy()
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        matrix = None
+        keys = None
+        missing = texts
+        rows = None
+        if self.embedding_cache is not None:
+            keys = [self._embedding_key(item) for item in texts]
+            cached = await self.embedding_cache.aget_many(keys)
+            rows = [i for i, vector in enumerate(cached) if vector is None]
+            hits = [i for i, vector in enumerate(cached) if vector is not None]
+            if hits:
+                matrix = np.empty((len(texts), cached[hits[0]].shape[0]), dtype=np.float32)
+                matrix[hits] = np.stack([cached[i] for i in hits])
+            missing = [texts[i] for i in rows]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def embed(start, end):
+            nonlocal matrix
+            async with semaphore:
+                response = await self._embeddings_async(missing[start:end], user, encoding_format)
+            vectors = parse_embeddings(response, end - start)
+            if matrix is None:
+                matrix = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            if rows is None:
+                matrix[start:end] = vectors
+            else:
+                matrix[rows[start:end]] = vectors
+                await self.embedding_cache.aput_many([keys[i] for i in rows[start:end]], vectors)
+
+        tasks = [asyncio.ensure_future(embed(start, end))
+                 for start, end in pack_batches(missing, max_batch_size, max_batch_tokens)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return matrix
+
+    def _embedding_key(self, text: str) -> str:
+        return EmbeddingCache.make_key(self._type, self._embeddings_id, text)
+
+    async def _cached_embeddings_async(self, text, user=None):
+        # only plain strings are cached, messages are sent as they are
+        if isinstance(text, str):
+            texts = [text]
+        elif isinstance(text, list) and text and all(isinstance(item, str) for item in text):
+            texts = text
+        else:
+            texts = None
+        if self.embedding_cache is None or texts is None:
+            return await self._embeddings_async(text, user)
+        keys = [self._embedding_key(item) for item in texts]
+        vectors = await self.embedding_cache.aget_many(keys)
+        rows = [i for i, vector in enumerate(vectors) if vector is None]
+        # the usage only counts the texts sent to the provider
+        model, usage = self._embeddings_model, {"prompt_tokens": 0, "total_tokens": 0}
+        if rows:
+            response = await self._embeddings_async([texts[i] for i in rows], user)
+            fetched = parse_embeddings(response, len(rows))
+            await self.embedding_cache.aput_many([keys[i] for i in rows], fetched)
+            for i, vector in zip(rows, fetched):
+                vectors[i] = vector
+            model = response.get("model", model)
+            usage = response.get("usage", usage)
+        return Embeddings.from_data({
+            "object": "list",
+            "data": [{"object": "embedding", "index": i, "embedding": vector.tolist()} for i, vector in enumerate(vectors)],
+            "model": model,
+            "usage": usage,
+        })
@@ -0,0 +1,97 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Optional, Union
+
+JSON_BACKENDS = ("orjson", "json")
+
+# sent with every request body, which is serialized before it reaches aiohttp
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+_backend = None
+_dumps = None
+_loads = None
+
+
+class PreEncoded(ABC):
+    """ A value that keeps its own JSON encoding, spliced as is when it is a value of the body passed to dumps """
+    __slots__ = ()
+
+    @abstractmethod
+    def json_bytes(self) -> bytes:
+        """ The JSON encoding of the value """
+
+    @abstractmethod
+    def to_list(self) -> list:
+        """ The decoded value, used where the encoding can't be spliced """
+
+
+def to_jsonable(obj):
+    """ The `default` hook of the encoders, for the library types and numpy vectors nested in other values """
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if hasattr(obj, "to_list"):
+        return obj.to_list()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def set_json_backend(name: Optional[str] = None) -> str:
+    """  Choose the library encoding request bodies and decoding responses
+
+    Args:
+        name (str, optional): orjson or json, None picks orjson when it is installed
+
+    Returns:
+        The name of the backend in use
+    """
+    global _backend, _dumps, _loads
+    if name is not None and name not in JSON_BACKENDS:
+        raise Exception(f"Invalid JSON backend: {name}, valid options are {', '.join(JSON_BACKENDS)}")
+    if name in (None, "orjson"):
+        try:
+            import orjson
+        except ImportError:
+            if name == "orjson":
+                raise ImportError("orjson is not installed, install it with `pip install semantix-genai-inference[orjson]`.")
+        else:
+            options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            _dumps = lambda obj: orjson.dumps(obj, default=to_jsonable, option=options)
+            _loads = orjson.loads
+            _backend = "orjson"
+            return _backend
+    encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=to_jsonable)
+    _dumps = lambda obj: encoder.encode(obj).encode("utf-8")
+    _loads = json.loads
+    _backend = "json"
+    return _backend
+
+
+def json_backend() -> str:
+    """ The name of the JSON backend in use """
+    if _backend is None:
+        set_json_backend()
+    return _backend
+
+
+def dumps(obj: Any) -> bytes:
+    """ Encode a request body as compact UTF-8 JSON, the PreEncoded values of a dict are spliced without encoding them again """
+    if _dumps is None:
+        set_json_backend()
+    if type(obj) is not dict or not any(isinstance(value, PreEncoded) for value in obj.values()):
+        return _dumps(obj)
+    rest = {}
+    fragments = []
+    for key, value in obj.items():
+        if isinstance(value, PreEncoded):
+            fragments.append(_dumps(key) + b":" + value.json_bytes())
+        else:
+            rest[key] = value
+    head = _dumps(rest)
+    return head[:-1] + (b"," if rest else b"") + b",".join(fragments) + b"}"
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if _loads is None:
+        set_json_backend()
+    return _loads(data)
@@ -0,0 +1,200 @@
+import asyncio
+import gzip
+import zlib
+from typing import Optional, Tuple
+
+REQUEST_ENCODINGS = ("gzip", "zstd")
+
+# bodies above this size are compressed off the event loop, zlib and zstandard release the GIL
+EXECUTOR_THRESHOLD = 256 * 1024
+
+
+def import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required for zstd compression, install it with `pip install semantix-genai-inference[zstd]`.")
+    return zstandard
+
+
+def has_zstandard() -> bool:
+    try:
+        import_zstandard()
+    except ImportError:
+        return False
+    return True
+
+
+class CompressionConfig:
+    """  Compression of the request and response bodies of a client
+
+    Args:
+        request (str, optional): gzip or zstd compresses the request bodies, only for endpoints accepting a Content-Encoding, such as self-hosted Semantix inference servers. Defaults to None, uncompressed
+        min_size (int, optional): Smallest request body compressed, in bytes. Defaults to 1024
+        level (int, optional): Compression level of the request bodies. Defaults to 6 for gzip and 3 for zstd
+        response (bool, optional): Ask for gzip, deflate and, when zstandard is installed, zstd responses, decompressed as they are read. Defaults to True
+    """
+
+    def __init__(self, request: Optional[str] = None, min_size: Optional[int] = 1024, level: Optional[int] = None,
+                 response: Optional[bool] = True):
+        if request is not None and request not in REQUEST_ENCODINGS:
+            raise Exception(f"Invalid request compression: {request}, valid options are {', '.join(REQUEST_ENCODINGS)}")
+        if request == "zstd":
+            import_zstandard()
+        self.request = request
+        self.min_size = min_size
+        self.level = level
+        self.response = response
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a CompressionConfig from the `compression` key of an `http` section in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys request, minSize, level and response
+        """
+        config = config or {}
+        keys = {
+            "request": "request",
+            "minSize": "min_size",
+            "level": "level",
+            "response": "response",
+        }
+        kwargs = {}
+        for key, value in config.items():
+            if key not in keys:
+                raise Exception(f"Invalid compression configuration key: {key}")
+            kwargs[keys[key]] = value
+        return cls(**kwargs)
+
+    def accept_encoding(self) -> str:
+        return "zstd, gzip, deflate" if has_zstandard() else "gzip, deflate"
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+    if encoding == "zstd":
+        return import_zstandard().ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise Exception(f"Invalid request compression: {encoding}")
+
+
+async def compress_body(payload: bytes, config: CompressionConfig) -> Tuple[bytes, Optional[str]]:
+    """ Return the body to send and its Content-Encoding, None when it is sent as is """
+    if config.request is None or len(payload) < config.min_size:
+        return payload, None
+    if len(payload) < EXECUTOR_THRESHOLD:
+        compressed = compress(payload, config.request, config.level)
+    else:
+        loop = asyncio.get_running_loop()
+        compressed = await loop.run_in_executor(None, compress, payload, config.request, config.level)
+    return compressed, config.request
+
+
+def _decoder(encoding: str):
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return zlib.decompressobj()
+    if encoding == "zstd":
+        return import_zstandard().ZstdDecompressor().decompressobj()
+    return None
+
+
+class DecompressedContent:
+    """ Wraps the compressed body of a response and decompresses it chunk by chunk as it is read.
+
+    Takes the place of `response.content`, so `response.read()`, `text()` and `json()` and the stream
+    parsers all read the decompressed body. The bytes saved are added to the record of the request.
+    """
+
+    def __init__(self, content, decoder, record=None):
+        self._content = content
+        self._decoder = decoder
+        self._record = record
+        self._buffer = bytearray()
+        self._eof = False
+
+    def _decompress(self, chunk: bytes) -> bytes:
+        data = self._decoder.decompress(chunk) if chunk else self._decoder.flush()
+        if self._record is not None:
+            self._record.response_bytes_saved += len(data) - len(chunk)
+        return data
+
+    async def readany(self) -> bytes:
+        """ The next decompressed chunk, empty at the end of the body """
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            return data
+        while not self._eof:
+            chunk = await self._content.readany()
+            if not chunk:
+                self._eof = True
+            data = self._decompress(chunk)
+            if data:
+                return data
+        return b""
+
+    async def read(self, n: int = -1) -> bytes:
+        if n >= 0:
+            while len(self._buffer) < n and not self._eof:
+                self._buffer.extend(await self._read_more())
+            data = bytes(self._buffer[:n])
+            del self._buffer[:n]
+            return data
+        parts = [bytes(self._buffer)]
+        self._buffer.clear()
+        while not self._eof:
+            parts.append(await self._read_more())
+        return b"".join(parts)
+
+    async def _read_more(self) -> bytes:
+        chunk = await self._content.readany()
+        if not chunk:
+            self._eof = True
+        return self._decompress(chunk)
+
+    async def readline(self) -> bytes:
+        while True:
+            end = self._buffer.find(b"\n")
+            if end >= 0 or self._eof:
+                end = end + 1 if end >= 0 else len(self._buffer)
+                line = bytes(self._buffer[:end])
+                del self._buffer[:end]
+                return line
+            self._buffer.extend(await self._read_more())
+
+    async def __aiter__(self):
+        while True:
+            line = await self.readline()
+            if not line:
+                return
+            yield line
+
+    async def iter_any(self):
+        while True:
+            data = await self.readany()
+            if not data:
+                return
+            yield data
+
+    async def iter_chunked(self, n: int):
+        while True:
+            data = await self.read(n)
+            if not data:
+                return
+            yield data
+
+    def at_eof(self) -> bool:
+        return self._eof and not self._buffer
+
+    def __getattr__(self, name):
+        return getattr(self._content, name)
+
+
+def decompress_response(response, record=None) -> None:
+    """ Replace the content of a response received with a Content-Encoding by its decompressed stream """
+    decoder = _decoder(response.headers.get("Content-Encoding", "").strip().lower())
+    if decoder is not None:
+        response.content = DecompressedContent(response.content, decoder, record)
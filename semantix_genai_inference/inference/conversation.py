@@ -0,0 +1,170 @@
+from typing import AsyncIterator, Iterable, List, Optional
+from .codec import PreEncoded, dumps
+from .streaming import ChatCompletionDelta, ChatStreamAccumulator
+from .tokens import REPLY_TOKENS, count_message_tokens
+
+
+class Conversation(PreEncoded):
+    """  History of a chat session, passed in place of the messages to generate, generate_stream and generate_stream_deltas
+
+    The JSON encoding and the token count of each message are computed once, when it is appended, and the
+    request bodies splice the cached encodings, so a new turn costs the same however long the history is.
+    Messages are copied when appended and must not be modified afterwards.
+
+    When max_messages or max_tokens is set the oldest messages after the leading system ones are dropped
+    on every append, the last message is always kept.
+
+    Args:
+        messages (Iterable[dict], optional): The initial messages
+        max_messages (int, optional): Maximum number of messages kept, the system ones included
+        max_tokens (int, optional): Maximum estimated prompt tokens of the history, see count_message_tokens
+    """
+    __slots__ = ("max_messages", "max_tokens", "_messages", "_encoded", "_tokens", "_total", "_joined")
+
+    def __init__(self, messages: Optional[Iterable[dict]] = None, max_messages: Optional[int] = None,
+                 max_tokens: Optional[int] = None):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self._messages: List[dict] = []
+        self._encoded: List[bytes] = []
+        self._tokens: List[int] = []
+        self._total = 0
+        self._joined = None
+        if messages:
+            self.extend(messages)
+
+    def append(self, message: dict) -> "Conversation":
+        message = dict(message)
+        tokens = count_message_tokens([message]) - REPLY_TOKENS
+        self._messages.append(message)
+        self._encoded.append(dumps(message))
+        self._tokens.append(tokens)
+        self._total += tokens
+        self._joined = None
+        self.trim()
+        return self
+
+    def extend(self, messages: Iterable[dict]) -> "Conversation":
+        for message in messages:
+            self.append(message)
+        return self
+
+    def system(self, content: str) -> "Conversation":
+        return self.append({"role": "system", "content": content})
+
+    def user(self, content: str, name: Optional[str] = None) -> "Conversation":
+        message = {"role": "user", "content": content}
+        if name is not None:
+            message["name"] = name
+        return self.append(message)
+
+    def assistant(self, content: Optional[str], function_call: Optional[dict] = None) -> "Conversation":
+        message = {"role": "assistant", "content": content}
+        if function_call is not None:
+            message["function_call"] = function_call
+        return self.append(message)
+
+    def function(self, name: str, content: str) -> "Conversation":
+        return self.append({"role": "function", "name": name, "content": content})
+
+    def append_response(self, response, index: int = 0) -> "Conversation":
+        """ Append the message of a choice of a chat completion returned by generate """
+        for choice in response["choices"]:
+            if choice.get("index", 0) == index:
+                return self.append(choice["message"])
+        raise KeyError(f"No choice with index {index} in the response.")
+
+    async def append_stream(self, deltas: AsyncIterator[ChatCompletionDelta],
+                            index: int = 0) -> AsyncIterator[ChatCompletionDelta]:
+        """  Pass a stream of generate_stream_deltas through and append the message of one of its choices when it ends
+
+        Args:
+            deltas (AsyncIterator[ChatCompletionDelta]): The stream of the reply
+            index (int, optional): The choice appended. Defaults to 0
+        """
+        accumulator = ChatStreamAccumulator()
+        async for delta in deltas:
+            accumulator.add(delta)
+            yield delta
+        self.append(accumulator.message(index))
+
+    def trim(self, max_messages: Optional[int] = None, max_tokens: Optional[int] = None) -> int:
+        """  Drop the oldest messages after the leading system ones until the history fits
+
+        Args:
+            max_messages (int, optional): Defaults to the max_messages of the conversation
+            max_tokens (int, optional): Defaults to the max_tokens of the conversation
+
+        Returns:
+            The number of messages dropped
+        """
+        max_messages = max_messages if max_messages is not None else self.max_messages
+        max_tokens = max_tokens if max_tokens is not None else self.max_tokens
+        if max_messages is None and max_tokens is None:
+            return 0
+        system = 0
+        while system < len(self._messages) - 1 and self._messages[system].get("role") == "system":
+            system += 1
+        end = system
+        count, total = len(self._messages), self._total
+        while end < len(self._messages) - 1 and ((max_messages is not None and count > max_messages)
+                                                 or (max_tokens is not None and REPLY_TOKENS + total > max_tokens)):
+            total -= self._tokens[end]
+            count -= 1
+            end += 1
+        dropped = end - system
+        if dropped:
+            # a single slice deletion, whatever the number of messages dropped
+            del self._messages[system:end]
+            del self._encoded[system:end]
+            del self._tokens[system:end]
+            self._total = total
+            self._joined = None
+        return dropped
+
+    def _select(self, messages: List[dict]) -> "Conversation":
+        # the messages kept by fit_messages are the dicts of this conversation, their encodings are reused
+        positions = {id(message): i for i, message in enumerate(self._messages)}
+        selected = Conversation()
+        for message in messages:
+            i = positions[id(message)]
+            selected._messages.append(message)
+            selected._encoded.append(self._encoded[i])
+            selected._tokens.append(self._tokens[i])
+        selected._total = sum(selected._tokens)
+        return selected
+
+    @property
+    def messages(self) -> List[dict]:
+        """ The messages of the history, which must not be modified """
+        return self._messages
+
+    @property
+    def message_tokens(self) -> List[int]:
+        """ The estimated tokens of each message, format overhead included """
+        return self._tokens
+
+    @property
+    def tokens(self) -> int:
+        """ The estimated prompt tokens of the history, as count_message_tokens counts them """
+        return REPLY_TOKENS + self._total
+
+    def json_bytes(self) -> bytes:
+        if self._joined is None:
+            self._joined = b"[" + b",".join(self._encoded) + b"]"
+        return self._joined
+
+    def to_list(self) -> List[dict]:
+        return list(self._messages)
+
+    def __len__(self):
+        return len(self._messages)
+
+    def __iter__(self):
+        return iter(self._messages)
+
+    def __getitem__(self, index):
+        return self._messages[index]
+
+    def __repr__(self):
+        return f"Conversation({self._messages!r})"
@@ -0,0 +1,53 @@
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# monotonic time by which the requests of the current context must be done
+_deadline = contextvars.ContextVar("semantix_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """ Raised by a request still waiting, connecting or reading when the deadline set around it passes """
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """  Bound the time of every request made inside the block, retries and rate limiter waits included
+
+    The deadline is shared by the whole block, so it bounds a sequence of calls as a whole. It reaches
+    the sync methods, the tasks the block starts and the streams it reads, a stream past it raises
+    DeadlineExceeded. A nested deadline can only shorten the one around it.
+
+        with deadline(10):
+            response = client.generate(messages)
+
+    Args:
+        seconds (float): Time left for the requests of the block
+
+    Returns:
+        The deadline, as a time.monotonic() value
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        at = min(at, current)
+    token = _deadline.set(at)
+    try:
+        yield at
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """ Seconds left before the deadline of the current context, None when there is no deadline """
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def without_deadline() -> contextvars.Context:
+    """ A copy of the current context with no deadline, for the work shared by callers with deadlines of their own """
+    context = contextvars.copy_context()
+    context.run(_deadline.set, None)
+    return context
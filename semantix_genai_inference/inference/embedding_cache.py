@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+from .embeddings import import_numpy
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "memory_hits", "disk_hits", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return (f"CacheStats(hits={self.hits}, misses={self.misses}, memory_hits={self.memory_hits}, "
+                f"disk_hits={self.disk_hits}, evictions={self.evictions})")
+
+
+class EmbeddingCache:
+    """  Content addressed cache of embedding vectors, with an in-process LRU tier in front of an optional SQLite file
+
+    Args:
+        path (str, optional): Path of the SQLite database persisting the vectors across runs, None keeps them only in memory
+        max_memory_bytes (int, optional): Size of the vectors kept in the in-process tier before the least recently used are evicted. Defaults to 256MB
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_bytes: Optional[int] = 256 * 1024 * 1024):
+        self._np = import_numpy()
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.stats = CacheStats()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build an EmbeddingCache from the `embeddingCache` section of a provider in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys path and maxMemoryBytes
+        """
+        config = config or {}
+        kwargs = {}
+        if "path" in config:
+            kwargs["path"] = config["path"]
+        if "maxMemoryBytes" in config:
+            kwargs["max_memory_bytes"] = config["maxMemoryBytes"]
+        return cls(**kwargs)
+
+    @staticmethod
+    def make_key(provider: str, model: str, text: str) -> str:
+        normalized = unicodedata.normalize("NFC", text).strip()
+        return hashlib.sha256(f"{provider}\0{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> list:
+        """ Return the cached vector of each key, or None for the misses """
+        results = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                    results[i] = vector
+                else:
+                    missing.append(i)
+            if missing and self._db is not None:
+                found = {}
+                unique = list({keys[i] for i in missing})
+                # stay below the SQLite limit of host parameters
+                for start in range(0, len(unique), 500):
+                    chunk = unique[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                    for key, blob in rows:
+                        found[key] = self._np.frombuffer(blob, dtype="<f4")
+                for key, vector in found.items():
+                    self._remember(key, vector)
+                still_missing = []
+                for i in missing:
+                    vector = found.get(keys[i])
+                    if vector is not None:
+                        self.stats.disk_hits += 1
+                        results[i] = vector
+                    else:
+                        still_missing.append(i)
+                missing = still_missing
+            self.stats.misses += len(missing)
+            self.stats.hits += len(keys) - len(missing)
+        return results
+
+    async def aget_many(self, keys: List[str]) -> list:
+        """ get_many for the event loop, with a SQLite file the lookup runs in the default executor """
+        if self._db is None:
+            return self.get_many(keys)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get_many, keys)
+
+    async def aput_many(self, keys: List[str], vectors) -> None:
+        """ put_many for the event loop, with a SQLite file the writes and the commit run in the default executor """
+        if self._db is None:
+            return self.put_many(keys, vectors)
+        await asyncio.get_running_loop().run_in_executor(None, self.put_many, keys, vectors)
+
+    def put_many(self, keys: List[str], vectors) -> None:
+        with self._lock:
+            rows = []
+            for key, vector in zip(keys, vectors):
+                vector = self._np.ascontiguousarray(vector, dtype="<f4")
+                self._remember(key, vector)
+                rows.append((key, vector.tobytes()))
+            if self._db is not None and rows:
+                self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                self._db.commit()
+
+    def _remember(self, key: str, vector) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+            self.stats.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            if self._db is not None:
+                return self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return len(self._memory)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,42 @@
+import base64
+from typing import List, Tuple
+from .tokens import count_tokens
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required to build embedding matrices, install it with `pip install semantix-genai-inference[numpy]`.")
+    return numpy
+
+
+def pack_batches(texts: List[str], max_batch_size: int, max_batch_tokens: int) -> List[Tuple[int, int]]:
+    """ Split texts into contiguous (start, end) ranges respecting the item count and token budget of a request """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = count_tokens(text)
+        if i > start and (i - start >= max_batch_size or tokens + text_tokens > max_batch_tokens):
+            batches.append((start, i))
+            start = i
+            tokens = 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def parse_embeddings(response: dict, size: int):
+    """ Read the vectors of an embeddings API response as a float32 matrix ordered by input index """
+    np = import_numpy()
+    if "data" not in response:
+        raise Exception(f"Embeddings request failed: {response.get('error', response)}")
+    data = sorted(response["data"], key=lambda item: item["index"])
+    if len(data) != size:
+        raise Exception(f"Expected {size} embeddings but the API returned {len(data)}.")
+    if data and isinstance(data[0]["embedding"], str):
+        # base64 encoding_format, little endian float32
+        return np.stack([np.frombuffer(base64.b64decode(item["embedding"]), dtype="<f4") for item in data])
+    return np.array([item["embedding"] for item in data], dtype=np.float32)
@@ -0,0 +1,174 @@
+import asyncio
+import bisect
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+
+class HedgingConfig:
+    """  Hedged request settings of the OpenAI and Azure OpenAI clients
+
+    Args:
+        delay (float, optional): Seconds to wait before sending the duplicate request, None derives it from the observed latency. Defaults to None
+        percentile (float, optional): Latency percentile used as delay when no fixed delay is set. Defaults to 95
+        min_samples (int, optional): Latencies observed before a percentile delay is trusted, no request is hedged until then. Defaults to 20
+        window (int, optional): Number of recent latencies the percentile is computed from. Defaults to 1000
+        max_hedge_ratio (float, optional): Maximum fraction of requests that are hedged. Defaults to 0.05
+    """
+
+    def __init__(self, delay: Optional[float] = None, percentile: Optional[float] = 95,
+                 min_samples: Optional[int] = 20, window: Optional[int] = 1000,
+                 max_hedge_ratio: Optional[float] = 0.05):
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be between 0 and 100.")
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.max_hedge_ratio = max_hedge_ratio
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a HedgingConfig from the `hedging` section of a provider in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys delayMs, percentile, minSamples, window and maxHedgeRatio
+        """
+        config = config or {}
+        kwargs = {}
+        if "delayMs" in config:
+            kwargs["delay"] = config["delayMs"] / 1000
+        if "percentile" in config:
+            kwargs["percentile"] = config["percentile"]
+        if "minSamples" in config:
+            kwargs["min_samples"] = config["minSamples"]
+        if "window" in config:
+            kwargs["window"] = config["window"]
+        if "maxHedgeRatio" in config:
+            kwargs["max_hedge_ratio"] = config["maxHedgeRatio"]
+        return cls(**kwargs)
+
+
+class HedgingStats:
+    __slots__ = ("requests", "hedges", "hedge_wins", "budget_exhausted")
+
+    def __init__(self):
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.budget_exhausted = 0
+
+    @property
+    def hedge_ratio(self) -> float:
+        return self.hedges / self.requests if self.requests else 0.0
+
+    def __repr__(self):
+        return (f"HedgingStats(requests={self.requests}, hedges={self.hedges}, hedge_wins={self.hedge_wins}, "
+                f"budget_exhausted={self.budget_exhausted})")
+
+
+class Hedger:
+    """ Sends a duplicate of a request that has not completed after a delay and keeps the first to succeed.
+
+    Every request earns max_hedge_ratio of a hedge credit and a hedge spends a whole one, so hedges
+    never exceed that fraction of the traffic, even while the upstream is slow for every request.
+    """
+
+    # credits saved while the upstream is fast, bounds the burst of hedges when it slows down
+    MAX_CREDITS = 10
+
+    def __init__(self, config: Optional[HedgingConfig] = None):
+        self.config = config or HedgingConfig()
+        self.stats = HedgingStats()
+        self._latencies = deque()
+        # the same latencies kept sorted, so the percentile is read without sorting the window
+        self._sorted = []
+        self._credits = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            if len(self._latencies) >= self.config.window:
+                oldest = self._latencies.popleft()
+                del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+            self._latencies.append(latency)
+            bisect.insort(self._sorted, latency)
+
+    def hedge_delay(self) -> Optional[float]:
+        """ Return the seconds after which a request is hedged, or None when there are too few samples yet """
+        if self.config.delay is not None:
+            return self.config.delay
+        with self._lock:
+            count = len(self._sorted)
+            if count < self.config.min_samples:
+                return None
+            return self._sorted[min(count - 1, int(count * self.config.percentile / 100))]
+
+    def _deposit(self) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            self._credits = min(self.MAX_CREDITS, self._credits + self.config.max_hedge_ratio)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._credits < 1:
+                self.stats.budget_exhausted += 1
+                return False
+            self._credits -= 1
+            self.stats.hedges += 1
+            return True
+
+    async def _timed(self, request: Callable[[], Awaitable]):
+        start = time.monotonic()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            # the attempt lost to the other one, its time so far is a lower bound of its latency, and leaving
+            # it out would pull the percentile towards the fast attempts and hedge more and more requests
+            self.record(time.monotonic() - start)
+            raise
+        self.record(time.monotonic() - start)
+        return result
+
+    async def run(self, primary: Callable[[], Awaitable], hedge: Callable[[], Awaitable],
+                  failed: Optional[Callable[[object], bool]] = None):
+        """  Await primary, sending hedge if it is still running after the hedge delay
+
+        Args:
+            primary: Starts the request
+            hedge: Starts the duplicate request, possibly to another deployment
+            failed (optional): Tells whether a result is an error, such as an error body returned instead of raised, so the other request is awaited instead
+
+        Returns:
+            The result of whichever request succeeds first, the other one is cancelled
+        """
+        self._deposit()
+        first = asyncio.ensure_future(self._timed(primary))
+        delay = self.hedge_delay()
+        if delay is None:
+            return await first
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+        except BaseException:
+            first.cancel()
+            raise
+        if done or not self._withdraw():
+            return await first
+        second = asyncio.ensure_future(self._timed(hedge))
+        pending = {first, second}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and (failed is None or not failed(task.result())):
+                        if task is second:
+                            with self._lock:
+                                self.stats.hedge_wins += 1
+                        return task.result()
+                if not pending:
+                    # both failed, report the error or the error body of the original request
+                    return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
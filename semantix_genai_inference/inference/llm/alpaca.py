@@ -1,27 +1,44 @@
-from typing import Optional
-import aiohttp
-import asyncio
-from .. import SemantixGenClient
+from typing import List, Optional
+from ..clients import SemantixGenClient
 
 
 class AlpacaInferenceClient(SemantixGenClient):
-    def __init__(self, inference_server_id: str, api_secret: str, version: Optional[str]):
-        super().__init__(inference_server_id, api_secret, version=version)
+    def __init__(self, inference_server_id: str, api_secret: str, version: Optional[str], **kwargs):
+        super().__init__(inference_server_id, api_secret, version=version, **kwargs)
         self._type = "alpaca"
 
     def generate(self, prompt: str, temperature: Optional[float] = 0.1, top_k: Optional[int] = 80, 
+                      top_p: Optional[int] = 40, num_beams: Optional[int] = 4, max_new_tokens: Optional[int] = 1024,
+                      cache: Optional[bool] = True):
+        return self._run_sync(self.agenerate(prompt, temperature, top_k, top_p, num_beams, max_new_tokens, cache))
+
+    async def agenerate(self, prompt: str, temperature: Optional[float] = 0.1, top_k: Optional[int] = 80, 
+                      top_p: Optional[int] = 40, num_beams: Optional[int] = 4, max_new_tokens: Optional[int] = 1024,
+                      cache: Optional[bool] = True):
+        body = self._build_body([prompt], temperature, top_k, top_p, num_beams, max_new_tokens)
+        cache_key = self._response_cache_key(self.url, body, cache)
+        if self._batcher is not None:
+            return await self._submit_batched(prompt, dict(temperature=temperature, top_k=top_k, top_p=top_p,
+                                                           num_beams=num_beams, max_new_tokens=max_new_tokens), cache_key)
+        return await self._post_json(self.url, body, cache_key)
+
+    def generate_batch(self, prompts: List[str], temperature: Optional[float] = 0.1, top_k: Optional[int] = 80, 
                       top_p: Optional[int] = 40, num_beams: Optional[int] = 4, max_new_tokens: Optional[int] = 1024):
-        return asyncio.run(self._complete_async(prompt, temperature, top_k, top_p, num_beams, max_new_tokens))
+        return self._run_sync(self.agenerate_batch(prompts, temperature, top_k, top_p, num_beams, max_new_tokens))
+
+    async def agenerate_batch(self, prompts: List[str], temperature: Optional[float] = 0.1, top_k: Optional[int] = 80, 
+                      top_p: Optional[int] = 40, num_beams: Optional[int] = 4, max_new_tokens: Optional[int] = 1024):
+        return await self._complete_async(prompts, temperature, top_k, top_p, num_beams, max_new_tokens)
+
+    async def _complete_async(self, prompts, temperature, top_k, top_p, num_beams, max_new_tokens):
+        return await self._post_json(self.url, self._build_body(prompts, temperature, top_k, top_p, num_beams, max_new_tokens))
 
-    async def _complete_async(self, prompt, temperature, top_k, top_p, num_beams, max_new_tokens):
-        body = {
-            "prompt": [prompt],
+    def _build_body(self, prompts, temperature, top_k, top_p, num_beams, max_new_tokens):
+        return {
+            "prompt": prompts,
             "max_new_tokens": max_new_tokens,
             "top_p": top_p,
             "top_k": top_k,
             "num_beams": num_beams,
             "temperature": temperature,
         }
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(self.url, json=body) as response:
-                return await response.json()
\ No newline at end of file
@@ -1,20 +1,30 @@
-from .. import OpenAIClient
-import aiohttp
-import asyncio
+from ..clients import OpenAIClient
+from ..responses import Embeddings
+from ..tokens import context_window as model_context_window
 from typing import List, Optional, Union
 
 class AzureOpenAIInferenceClient(OpenAIClient):
     def __init__(self, host: str, deployment_id: str, api_version: str,  *args, **kwargs):
         super().__init__(*args, **kwargs)
+        if self.semantic_cache is not None and self.embeddings_client is None:
+            # the deployment of the client serves chat completions, not embeddings
+            raise Exception("The semantic cache of an Azure OpenAI client requires an embeddings_client of an embeddings deployment.")
         self._host = host
         self._deployment_id = deployment_id
+        self._embeddings_id = f"{host}/{deployment_id}"
         self._api_version = api_version
+        if self.context_window is None:
+            # deployments are usually named after their model
+            self.context_window = model_context_window(deployment_id)
         self._type = "azure-openai"
         self.headers = {
             "api-key": f"{self._api_key}",
         }
     
-    async def _generate_async(self, messages, 
+    def _model_label(self):
+        return self._deployment_id
+
+    def _chat_request(self, messages, 
                                 functions=None,
                                 function_call=None,
                                 temperature=None,
@@ -25,21 +35,39 @@ class AzureOpenAIInferenceClient(OpenAIClient):
                                 presence_penalty=None,
                                 frequency_penalty=None,
                                 logit_bias=None,
-                                user=None):
+                                user=None,
+                                stream=False):
+        messages, max_tokens = self._fit_messages(messages, max_tokens)
         body = {
             "messages": messages,
         }
-        # iterate over all optional arguments and add them to the body if they are not None
-        for key, value in locals().items():
-            if key == "self" or key == "messages" \
-                or value is None or key == "body":
-                continue
-            body[key] = value
+        if stream:
+            body["stream"] = True
+        # the optional arguments are sent only when they are set
+        for key, value in (("functions", functions), ("function_call", function_call), ("temperature", temperature),
+                           ("top_p", top_p), ("n", n), ("stop", stop), ("max_tokens", max_tokens),
+                           ("presence_penalty", presence_penalty), ("frequency_penalty", frequency_penalty),
+                           ("logit_bias", logit_bias), ("user", user)):
+            if value is not None:
+                body[key] = value
         url = f"{self._host}/openai/deployments/{self._deployment_id}/chat/completions?api-version={self._api_version}"
+        return url, body
 
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(url, json=body) as response:
-                yield await response.json()
+    async def _generate_async(self, messages, 
+                                functions=None,
+                                function_call=None,
+                                temperature=None,
+                                top_p=None,
+                                n=None,
+                                stop=None,
+                                max_tokens=None,
+                                presence_penalty=None,
+                                frequency_penalty=None,
+                                logit_bias=None,
+                                user=None,
+                                cache=True):
+        return await self._complete_chat((messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                          presence_penalty, frequency_penalty, logit_bias, user), cache)
 
     def generate(self, messages: List[dict], functions: Optional[List[dict]]=None, 
                     function_call: Optional[str]=None,
@@ -51,9 +79,25 @@ class AzureOpenAIInferenceClient(OpenAIClient):
                     presence_penalty: Optional[float]=None, 
                     frequency_penalty: Optional[float]=None, 
                     logit_bias: Optional[dict]=None, 
-                    user: Optional[str]=None):
-        return asyncio.run(self._generate_async(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
-                                                presence_penalty, frequency_penalty, logit_bias, user))
+                    user: Optional[str]=None,
+                    cache: Optional[bool]=True):
+        return self._run_sync(self.agenerate(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                             presence_penalty, frequency_penalty, logit_bias, user, cache))
+
+    async def agenerate(self, messages: List[dict], functions: Optional[List[dict]]=None, 
+                    function_call: Optional[str]=None,
+                    temperature: Optional[float]=None, 
+                    top_p: Optional[float]=None, 
+                    n: Optional[int]=None, 
+                    stop: Optional[Union[str, List[str]]]=None, 
+                    max_tokens: Optional[int]=None, 
+                    presence_penalty: Optional[float]=None, 
+                    frequency_penalty: Optional[float]=None, 
+                    logit_bias: Optional[dict]=None, 
+                    user: Optional[str]=None,
+                    cache: Optional[bool]=True):
+        return await self._generate_async(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                          presence_penalty, frequency_penalty, logit_bias, user, cache)
 
     async def generate_stream(self, messages: List[dict], functions: Optional[List[dict]]=None, 
                     function_call: Optional[str]=None,
@@ -66,27 +110,16 @@ class AzureOpenAIInferenceClient(OpenAIClient):
                     frequency_penalty: Optional[float]=None, 
                     logit_bias: Optional[dict]=None, 
                     user: Optional[str]=None):
-        body = {
-            "messages": messages,
-            "stream": True,
-        }
-        # iterate over all optional arguments and add them to the body if they are not None
-        for key, value in locals().items():
-            if key == "self" or key == "messages" \
-                or value is None or key == "body":
-                continue
-            body[key] = value
-        url = f"{self._host}/openai/deployments/{self._deployment_id}/chat/completions?api-version={self._api_version}"
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.post(url, json=body) as response:
-                    async for line in response.content:
-                        yield line
+        url, body = self._chat_request(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                       presence_penalty, frequency_penalty, logit_bias, user, stream=True)
+        async for line in self._shared_stream(url, body, "lines", lambda: self._stream_lines(url, body)):
+            yield line
 
-    async def _embeddings_async(self, text, user=None):
-        # check if text is a list of dicts
-        if isinstance(text, list):
+    async def _embeddings_async(self, text, user=None, encoding_format=None):
+        # a list of strings is embedded in a single request, otherwise check if text is a list of dicts
+        if isinstance(text, list) and not all(isinstance(item, str) for item in text):
             if not isinstance(text[0], dict):
-                raise ValueError("If text is a list, it must be a list of dicts with keys 'role' and 'content'.")
+                raise ValueError("If text is a list, it must be a list of strings or a list of dicts with keys 'role' and 'content'.")
             else:
                 # transform the dicts into a single string
                 text = " ".join([str(message) for message in text])
@@ -96,10 +129,13 @@ class AzureOpenAIInferenceClient(OpenAIClient):
         }
         if user:
             body["user"] = user
+        if encoding_format:
+            body["encoding_format"] = encoding_format
         url = f"{self._host}/openai/deployments/{self._deployment_id}/embeddings?api-version={self._api_version}"
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(url, json=body) as response:
-                return await response.json()
+        return await self._post_json(url, body, response_class=Embeddings)
                     
-    def embeddings(self, text: Union[str, List[dict]], user: Optional[str]=None):
-        return asyncio.run(self._embeddings_async(text, user))
\ No newline at end of file
+    def embeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str]=None):
+        return self._run_sync(self.aembeddings(text, user))
+
+    async def aembeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str]=None):
+        return await self._cached_embeddings_async(text, user)
@@ -1,13 +1,14 @@
-from .. import CohereClient
-import aiohttp
-import asyncio
+from ..clients import CohereClient
+from ..responses import Generation
+from ..session import ResponseError
+from ..streaming import iter_generation_deltas
 from typing import List, Optional
 
 class CohereInferenceClient(CohereClient):
     def __init__(self, api_key: Optional[str]=None, 
                  generate_model: Optional[str] = "command",
-                 version: Optional[str] = "v1"):
-        super().__init__(api_key, generate_model, version)
+                 version: Optional[str] = "v1", **kwargs):
+        super().__init__(api_key, generate_model, version, **kwargs)
         self._type = "cohere"
 
     def generate(self, prompt: str, 
@@ -23,8 +24,36 @@ class CohereInferenceClient(CohereClient):
                     frequency_penalty: Optional[float]=None, 
                     presence_penalty: Optional[float]=None, 
                     return_likelihoods: Optional[str]=None, 
-                    logit_bias: Optional[dict]=None):
-        return asyncio.run(self._generate_async(prompt, 
+                    logit_bias: Optional[dict]=None,
+                    cache: Optional[bool]=True):
+        return self._run_sync(self.agenerate(prompt, 
+                                                num_generations, 
+                                                stream, max_tokens, 
+                                                truncate, 
+                                                temperature, preset, 
+                                                end_sequences, 
+                                                stop_sequences, 
+                                                k, p, frequency_penalty, 
+                                                presence_penalty, 
+                                                return_likelihoods, 
+                                                logit_bias, cache))
+
+    async def agenerate(self, prompt: str, 
+                    num_generations: Optional[int]=None, 
+                    stream: Optional[bool]=None,
+                    max_tokens: Optional[int]=None, 
+                    truncate: Optional[str]=None, 
+                    temperature: Optional[float]=None, 
+                    preset: Optional[str]=None, 
+                    end_sequences: Optional[List[str]]=None, 
+                    stop_sequences: Optional[List[str]]=None, 
+                    k: Optional[int]=None, p: Optional[float]=None, 
+                    frequency_penalty: Optional[float]=None, 
+                    presence_penalty: Optional[float]=None, 
+                    return_likelihoods: Optional[str]=None, 
+                    logit_bias: Optional[dict]=None,
+                    cache: Optional[bool]=True):
+        return await self._generate_async(prompt, 
                                                 num_generations, 
                                                 stream, max_tokens, 
                                                 truncate, 
@@ -34,24 +63,71 @@ class CohereInferenceClient(CohereClient):
                                                 k, p, frequency_penalty, 
                                                 presence_penalty, 
                                                 return_likelihoods, 
-                                                logit_bias))
+                                                logit_bias, cache)
         
-    async def _generate_async(self, prompt, num_generations,
+    async def generate_stream(self, prompt: str, 
+                    num_generations: Optional[int]=None, 
+                    max_tokens: Optional[int]=None, 
+                    truncate: Optional[str]=None, 
+                    temperature: Optional[float]=None, 
+                    preset: Optional[str]=None, 
+                    end_sequences: Optional[List[str]]=None, 
+                    stop_sequences: Optional[List[str]]=None, 
+                    k: Optional[int]=None, p: Optional[float]=None, 
+                    frequency_penalty: Optional[float]=None, 
+                    presence_penalty: Optional[float]=None, 
+                    return_likelihoods: Optional[str]=None, 
+                    logit_bias: Optional[dict]=None):
+        url, body = self._generate_request(prompt, num_generations, True, max_tokens, truncate, temperature,
+                                           preset, end_sequences, stop_sequences, k, p, frequency_penalty,
+                                           presence_penalty, return_likelihoods, logit_bias)
+        async for delta in self._shared_stream(url, body, "generations", lambda: self._stream_generations(url, body)):
+            yield delta
+
+    async def _stream_generations(self, url: str, body: dict):
+        async with self._post_stream(url, body) as response:
+            if response.status >= 400:
+                text = await response.text()
+                raise ResponseError(response.status, text,
+                                    f"Cohere generate stream failed with status {response.status}: {text}")
+            async for delta in iter_generation_deltas(response.content):
+                yield delta
+
+    def _generate_request(self, prompt, num_generations,
                         stream, max_tokens, truncate, 
                         temperature, preset, end_sequences,
                         stop_sequences, k, p, frequency_penalty,
                         presence_penalty, return_likelihoods, logit_bias):
+        prompt, max_tokens = self._fit_prompt(prompt, max_tokens)
         body = {
             "prompt": prompt,
         }
-        # iterate over all optional arguments and add them to the body if they are not None
-        for key, value in locals().items():
-            if key == "self" or key == "prompt" \
-                or value is None or key == "body":
-                continue
-            body[key] = value
+        # the optional arguments are sent only when they are set
+        for key, value in (("num_generations", num_generations), ("stream", stream), ("max_tokens", max_tokens),
+                           ("truncate", truncate), ("temperature", temperature), ("preset", preset),
+                           ("end_sequences", end_sequences), ("stop_sequences", stop_sequences), ("k", k), ("p", p),
+                           ("frequency_penalty", frequency_penalty), ("presence_penalty", presence_penalty),
+                           ("return_likelihoods", return_likelihoods), ("logit_bias", logit_bias)):
+            if value is not None:
+                body[key] = value
         url = f"{self._host}/{self._version}/generate"
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(url, json=body) as response:
-                return await response.json()
+        return url, body
 
+    async def _generate_async(self, prompt, num_generations,
+                        stream, max_tokens, truncate, 
+                        temperature, preset, end_sequences,
+                        stop_sequences, k, p, frequency_penalty,
+                        presence_penalty, return_likelihoods, logit_bias, cache=True):
+        url, body = self._generate_request(prompt, num_generations, stream, max_tokens, truncate, temperature,
+                                           preset, end_sequences, stop_sequences, k, p, frequency_penalty,
+                                           presence_penalty, return_likelihoods, logit_bias)
+        if stream:
+            # the stream is a sequence of json events, the last one carries the full response
+            async with self._post_stream(url, body) as response:
+                if response.status >= 400:
+                    return Generation(await response.read())
+                async for delta in iter_generation_deltas(response.content):
+                    if delta.is_finished:
+                        return Generation.from_data(delta.response)
+                raise ResponseError(response.status, "", "Cohere generate stream ended without a final event")
+        return await self._post_json(url, body, self._response_cache_key(url, body, cache), Generation)
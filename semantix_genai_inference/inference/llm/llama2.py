@@ -1,22 +1,43 @@
-from typing import Optional
-import aiohttp
-import asyncio
-from .. import SemantixGenClient
+from typing import List, Optional
+from ..clients import SemantixGenClient
 
 
 class Llama2InferenceClient(SemantixGenClient):
-    def __init__(self, inference_server_id: str, api_secret: str, version: Optional[str]):
-        super().__init__(inference_server_id, api_secret, version=version)
+    def __init__(self, inference_server_id: str, api_secret: str, version: Optional[str], **kwargs):
+        super().__init__(inference_server_id, api_secret, version=version, **kwargs)
         self._type = "llama2"
 
     def generate(self, prompt: str, temperature: Optional[float] = None, top_p: Optional[int] = None, 
+                      top_k: Optional[int] = None, max_new_tokens: Optional[int] = None, 
+                      num_beams: Optional[int] = None, cache: Optional[bool] = True):
+        return self._run_sync(self.agenerate(prompt, temperature, top_p, top_k, max_new_tokens, num_beams, cache))
+
+    async def agenerate(self, prompt: str, temperature: Optional[float] = None, top_p: Optional[int] = None, 
+                      top_k: Optional[int] = None, max_new_tokens: Optional[int] = None, 
+                      num_beams: Optional[int] = None, cache: Optional[bool] = True):
+        body = self._build_body([prompt], temperature, top_p, top_k, max_new_tokens, num_beams)
+        cache_key = self._response_cache_key(self.url, body, cache)
+        if self._batcher is not None:
+            return await self._submit_batched(prompt, dict(temperature=temperature, top_p=top_p, top_k=top_k,
+                                                           max_new_tokens=max_new_tokens, num_beams=num_beams), cache_key)
+        return await self._post_json(self.url, body, cache_key)
+
+    def generate_batch(self, prompts: List[str], temperature: Optional[float] = None, top_p: Optional[int] = None, 
                       top_k: Optional[int] = None, max_new_tokens: Optional[int] = None, 
                       num_beams: Optional[int] = None):
-        return asyncio.run(self._complete_async(prompt, temperature, top_p, top_k, max_new_tokens, num_beams))    
+        return self._run_sync(self.agenerate_batch(prompts, temperature, top_p, top_k, max_new_tokens, num_beams))
+
+    async def agenerate_batch(self, prompts: List[str], temperature: Optional[float] = None, top_p: Optional[int] = None, 
+                      top_k: Optional[int] = None, max_new_tokens: Optional[int] = None, 
+                      num_beams: Optional[int] = None):
+        return await self._complete_async(prompts, temperature, top_p, top_k, max_new_tokens, num_beams)
+
+    async def _complete_async(self, prompts, temperature, top_p, top_k, max_new_tokens, num_beams):
+        return await self._post_json(self.url, self._build_body(prompts, temperature, top_p, top_k, max_new_tokens, num_beams))
 
-    async def _complete_async(self, prompt, temperature, top_p, top_k, max_new_tokens, num_beams):
+    def _build_body(self, prompts, temperature, top_p, top_k, max_new_tokens, num_beams):
         body = {
-            "prompt": [prompt]
+            "prompt": prompts
         }
         if temperature is not None:
             body["temperature"] = temperature
@@ -28,6 +49,4 @@ class Llama2InferenceClient(SemantixGenClient):
             body["max_new_tokens"] = max_new_tokens
         if num_beams is not None:
             body["num_beams"] = num_beams
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(self.url, json=body) as response:
-                return await response.json()
\ No newline at end of file
+        return body
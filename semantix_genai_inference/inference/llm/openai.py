@@ -1,6 +1,5 @@
-from .. import OpenAIClient
-import aiohttp
-import asyncio
+from ..clients import OpenAIClient
+from ..responses import Embeddings
 from typing import List, Optional, Union
 
 class OpenAIInferenceClient(OpenAIClient):
@@ -8,7 +7,7 @@ class OpenAIInferenceClient(OpenAIClient):
         super().__init__(*args, **kwargs)
         self._type = "openai"
     
-    async def _generate_async(self, messages, 
+    def _chat_request(self, messages, 
                                 functions=None,
                                 function_call=None,
                                 temperature=None,
@@ -19,22 +18,40 @@ class OpenAIInferenceClient(OpenAIClient):
                                 presence_penalty=None,
                                 frequency_penalty=None,
                                 logit_bias=None,
-                                user=None):
+                                user=None,
+                                stream=False):
+        messages, max_tokens = self._fit_messages(messages, max_tokens)
         body = {
             "messages": messages,
             "model": self._model,
         }
-        # iterate over all optional arguments and add them to the body if they are not None
-        for key, value in locals().items():
-            if key == "self" or key == "messages" \
-                or value is None or key == "body":
-                continue
-            body[key] = value
+        if stream:
+            body["stream"] = True
+        # the optional arguments are sent only when they are set
+        for key, value in (("functions", functions), ("function_call", function_call), ("temperature", temperature),
+                           ("top_p", top_p), ("n", n), ("stop", stop), ("max_tokens", max_tokens),
+                           ("presence_penalty", presence_penalty), ("frequency_penalty", frequency_penalty),
+                           ("logit_bias", logit_bias), ("user", user)):
+            if value is not None:
+                body[key] = value
         url = f"{self._host}/{self._version}/chat/completions"
+        return url, body
 
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(url, json=body) as response:
-                yield await response.json()
+    async def _generate_async(self, messages, 
+                                functions=None,
+                                function_call=None,
+                                temperature=None,
+                                top_p=None,
+                                n=None,
+                                stop=None,
+                                max_tokens=None,
+                                presence_penalty=None,
+                                frequency_penalty=None,
+                                logit_bias=None,
+                                user=None,
+                                cache=True):
+        return await self._complete_chat((messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                          presence_penalty, frequency_penalty, logit_bias, user), cache)
 
     def generate(self, messages: List[dict], functions: Optional[List[dict]]=None, 
                     function_call: Optional[str]=None,
@@ -46,9 +63,25 @@ class OpenAIInferenceClient(OpenAIClient):
                     presence_penalty: Optional[float]=None, 
                     frequency_penalty: Optional[float]=None, 
                     logit_bias: Optional[dict]=None, 
-                    user: Optional[str]=None):
-        return asyncio.run(self._generate_async(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
-                                                presence_penalty, frequency_penalty, logit_bias, user))
+                    user: Optional[str]=None,
+                    cache: Optional[bool]=True):
+        return self._run_sync(self.agenerate(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                             presence_penalty, frequency_penalty, logit_bias, user, cache))
+
+    async def agenerate(self, messages: List[dict], functions: Optional[List[dict]]=None, 
+                    function_call: Optional[str]=None,
+                    temperature: Optional[float]=None, 
+                    top_p: Optional[float]=None, 
+                    n: Optional[int]=None, 
+                    stop: Optional[Union[str, List[str]]]=None, 
+                    max_tokens: Optional[int]=None, 
+                    presence_penalty: Optional[float]=None, 
+                    frequency_penalty: Optional[float]=None, 
+                    logit_bias: Optional[dict]=None, 
+                    user: Optional[str]=None,
+                    cache: Optional[bool]=True):
+        return await self._generate_async(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                          presence_penalty, frequency_penalty, logit_bias, user, cache)
 
     async def generate_stream(self, messages: List[dict], functions: Optional[List[dict]]=None, 
                     function_call: Optional[str]=None,
@@ -61,28 +94,16 @@ class OpenAIInferenceClient(OpenAIClient):
                     frequency_penalty: Optional[float]=None, 
                     logit_bias: Optional[dict]=None, 
                     user: Optional[str]=None):
-        body = {
-            "messages": messages,
-            "stream": True,
-            "model": self._model,
-        }
-        # iterate over all optional arguments and add them to the body if they are not None
-        for key, value in locals().items():
-            if key == "self" or key == "messages" \
-                or value is None or key == "body":
-                continue
-            body[key] = value
-        url = f"{self._host}/{self._version}/chat/completions"
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-                async with session.post(url, json=body) as response:
-                    async for line in response.content:
-                        yield line
+        url, body = self._chat_request(messages, functions, function_call, temperature, top_p, n, stop, max_tokens,
+                                       presence_penalty, frequency_penalty, logit_bias, user, stream=True)
+        async for line in self._shared_stream(url, body, "lines", lambda: self._stream_lines(url, body)):
+            yield line
 
-    async def _embeddings_async(self, text, user=None):
-        # check if text is a list of dicts
-        if isinstance(text, list):
+    async def _embeddings_async(self, text, user=None, encoding_format=None):
+        # a list of strings is embedded in a single request, otherwise check if text is a list of dicts
+        if isinstance(text, list) and not all(isinstance(item, str) for item in text):
             if not isinstance(text[0], dict):
-                raise ValueError("If text is a list, it must be a list of dicts with keys 'role' and 'content'.")
+                raise ValueError("If text is a list, it must be a list of strings or a list of dicts with keys 'role' and 'content'.")
             else:
                 # transform the dicts into a single string
                 text = " ".join([str(message) for message in text])
@@ -93,10 +114,13 @@ class OpenAIInferenceClient(OpenAIClient):
         }
         if user:
             body["user"] = user
+        if encoding_format:
+            body["encoding_format"] = encoding_format
         url = f"{self._host}/{self._version}/embeddings"
-        async with aiohttp.ClientSession(headers=self.headers) as session:
-            async with session.post(url, json=body) as response:
-                return await response.json()
+        return await self._post_json(url, body, response_class=Embeddings)
                     
-    def embeddings(self, text: Union[str, List[dict]], user: Optional[str]=None):
-        return asyncio.run(self._embeddings_async(text, user))
\ No newline at end of file
+    def embeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str]=None):
+        return self._run_sync(self.aembeddings(text, user))
+
+    async def aembeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str]=None):
+        return await self._cached_embeddings_async(text, user)
@@ -0,0 +1,79 @@
+import asyncio
+from typing import List, Optional, Union
+from ..loop import iterate_sync, run_sync
+from ..routing import Backend, Router, RoutingConfig
+from ..streaming import ChoiceStreams
+
+
+class RouterInferenceClient:
+    """  Chat and embeddings client spreading requests over several OpenAIClient backends
+
+    Error statuses of the backends raise ResponseError inside the router, so throttled or failing backends are
+    failed over and ejected by their circuit breaker, and errors the client itself caused are raised to the
+    caller. The clients are left as they are, their other callers still get the error bodies.
+
+    Args:
+        backends (List[Backend]): The backends, each wrapping an OpenAIInferenceClient or AzureOpenAIInferenceClient
+        config (RoutingConfig, optional): Selection policy and circuit breaker settings
+    """
+
+    def __init__(self, backends: List[Backend], config: Optional[RoutingConfig] = None):
+        self._router = Router(backends, config)
+        self._type = "router"
+
+    @property
+    def backends(self) -> List[Backend]:
+        return self._router.backends
+
+    def generate(self, messages: List[dict], **kwargs):
+        """  Create a chat completion on the selected backend, takes the same arguments of OpenAIInferenceClient.generate """
+        return run_sync(self.agenerate(messages, **kwargs))
+
+    async def agenerate(self, messages: List[dict], **kwargs):
+        """  Awaitable version of generate, takes the same arguments """
+        return await self._router.call(lambda client: client.agenerate(messages, **kwargs))
+
+    async def generate_stream(self, messages: List[dict], **kwargs):
+        """  Stream the raw lines of a chat completion, takes the same arguments of OpenAIInferenceClient.generate_stream """
+        async for line in self._router.stream(lambda client: client.generate_stream(messages, **kwargs)):
+            yield line
+
+    async def generate_stream_deltas(self, messages: List[dict], **kwargs):
+        """  Stream a chat completion as ChatCompletionDelta objects, takes the same arguments of generate_stream """
+        async for delta in self._router.stream(lambda client: client.generate_stream_deltas(messages, **kwargs)):
+            yield delta
+
+    def generate_stream_sync(self, messages: List[dict], deltas: Optional[bool] = False, max_buffer: Optional[int] = 16, **kwargs):
+        """  Sync version of generate_stream, takes the same arguments of OpenAIInferenceClient.generate_stream_sync """
+        stream = self.generate_stream_deltas if deltas else self.generate_stream
+        return iterate_sync(stream(messages, **kwargs), max_buffer)
+
+    def generate_stream_choices(self, messages: List[dict], n: int, max_buffer: Optional[int] = 64, **kwargs) -> ChoiceStreams:
+        """  Stream the n choices of a chat completion separately, takes the same arguments of OpenAIInferenceClient.generate_stream_choices """
+        return ChoiceStreams(self.generate_stream_deltas(messages, n=n, **kwargs), n, max_buffer)
+
+    def embeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str] = None):
+        return run_sync(self.aembeddings(text, user))
+
+    async def aembeddings(self, text: Union[str, List[str], List[dict]], user: Optional[str] = None):
+        """  Embed text on the selected backend, the backends must serve the same embedding model """
+        return await self._router.call(lambda client: client.aembeddings(text, user))
+
+    async def aclose(self):
+        """ Close the pooled sessions of every backend """
+        await asyncio.gather(*(backend.client.aclose() for backend in self.backends))
+
+    def close(self):
+        run_sync(self.aclose())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
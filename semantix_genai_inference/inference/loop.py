@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import os
+import threading
+from typing import AsyncIterable, Iterator
+
+# queued after the last item of a stream iterated by a sync caller
+_END = object()
+
+
+class BackgroundLoop:
+    """ An event loop running forever on a daemon thread, used to run the sync client methods.
+
+    Sharing one loop lets sync callers reuse the clients' pooled sessions, and many threads can
+    submit coroutines to it concurrently.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # a forked child inherits the loop object but not its thread
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name="semantix-genai-inference-loop", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro):
+        """ Run a coroutine on the background loop and block until it returns """
+        loop = self.get_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Sync methods can't be called from the client event loop, await the async methods instead.")
+        future = asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, aiterable: AsyncIterable, max_buffer: int = 16) -> Iterator:
+        """  Iterate an async iterable on the background loop and yield its items to a sync caller
+
+        A task on the loop reads ahead into a queue of max_buffer items and waits when it is full, so a
+        slow caller holds the stream back instead of buffering it. Stopping early, with break, close()
+        or an exception, cancels the task and closes the async iterable, which releases its response.
+        """
+        self.get_loop()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Sync methods can't be called from the client event loop, await the async methods instead.")
+        # the queue is created on the loop it is used from, Python 3.8 binds it at creation
+        buffer = self.run(_new_queue(max_buffer))
+        task = self.run(_start(_pump(aiterable, buffer)))
+        try:
+            while True:
+                item, error = self.run(buffer.get())
+                if error is not None:
+                    raise error
+                if item is _END:
+                    return
+                yield item
+        finally:
+            if not task.done():
+                self.run(_cancel(task))
+
+
+_background_loop = BackgroundLoop()
+
+
+def run_sync(coro):
+    """ Run a coroutine on the shared background loop and return its result """
+    return _background_loop.run(coro)
+
+
+def iterate_sync(aiterable: AsyncIterable, max_buffer: int = 16) -> Iterator:
+    """ Iterate an async iterable from sync code on the shared background loop, see BackgroundLoop.iterate """
+    return _background_loop.iterate(aiterable, max_buffer)
+
+
+async def _in_context(coro, context: contextvars.Context):
+    # the caller's context variables, such as a deadline, are set in the task running coro
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+async def _new_queue(max_buffer: int) -> asyncio.Queue:
+    return asyncio.Queue(max_buffer)
+
+
+async def _start(coro) -> asyncio.Task:
+    return asyncio.ensure_future(coro)
+
+
+async def _pump(aiterable: AsyncIterable, buffer: asyncio.Queue) -> None:
+    try:
+        async for item in aiterable:
+            await buffer.put((item, None))
+    except Exception as e:
+        await buffer.put((None, e))
+    else:
+        await buffer.put((_END, None))
+    finally:
+        # a task cancelled while waiting on the queue leaves the generator suspended
+        aclose = getattr(aiterable, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
@@ -0,0 +1,305 @@
+import bisect
+from collections.abc import Mapping
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name, help text and buckets of the histograms, each filled from the RequestRecord attribute of the same suffix
+HISTOGRAMS = (
+    ("semantix_request_dns_seconds", "Time resolving the host of the requests.", "dns", LATENCY_BUCKETS),
+    ("semantix_request_connect_seconds", "Time opening new connections, TCP and TLS handshakes included.", "connect", LATENCY_BUCKETS),
+    ("semantix_request_ttfb_seconds", "Time from sending a request to receiving its response headers.", "ttfb", LATENCY_BUCKETS),
+    ("semantix_request_ttft_seconds", "Time from the start of a streamed request to its first body chunk.", "ttft", LATENCY_BUCKETS),
+    ("semantix_request_latency_seconds", "Total time of the requests, retries and rate limiter waits included.", "latency", LATENCY_BUCKETS),
+    ("semantix_request_size_bytes", "Size of the request bodies as sent, after compression.", "request_bytes", SIZE_BUCKETS),
+    ("semantix_response_size_bytes", "Size of the response bodies after decompression.", "response_bytes", SIZE_BUCKETS),
+)
+
+
+class RequestRecord:
+    """ Timings and sizes of one request, durations are in seconds and None when the step did not happen """
+    __slots__ = ("provider", "model", "stream", "status", "error", "started", "dns", "connect", "ttfb", "ttft",
+                 "latency", "request_bytes", "response_bytes", "request_bytes_saved", "response_bytes_saved",
+                 "retries", "prompt_tokens", "completion_tokens", "_attempt_started")
+
+    def __init__(self, provider: str, model: Optional[str], stream: bool = False):
+        self.provider = provider
+        self.model = model
+        self.stream = stream
+        self.status = None
+        self.error = None
+        self.started = time.monotonic()
+        self.dns = None
+        self.connect = None
+        self.ttfb = None
+        self.ttft = None
+        self.latency = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        # bytes compression kept off the wire, the request and response bytes are the sizes sent and decoded
+        self.request_bytes_saved = 0
+        self.response_bytes_saved = 0
+        self.retries = 0
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self._attempt_started = self.started
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__ if not name.startswith("_")}
+
+    def __repr__(self):
+        return f"RequestRecord({', '.join(f'{key}={value!r}' for key, value in self.as_dict().items())})"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _add(record: RequestRecord, attribute: str, value: float) -> None:
+    current = getattr(record, attribute)
+    setattr(record, attribute, value if current is None else current + value)
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    """  Aggregates the timings of the requests of the clients it is passed to
+
+    DNS, connect, time to first byte and sizes come from an aiohttp trace config added to the client sessions,
+    so clients without metrics pay nothing. Histograms and counters are labelled by provider and model.
+
+    Args:
+        callback (Callable[[RequestRecord], None], optional): Called with the record of every finished request, on the event loop of the request
+    """
+
+    def __init__(self, callback: Optional[Callable[[RequestRecord], None]] = None):
+        self.callback = callback
+        self._histograms: Dict[tuple, Histogram] = {}
+        self._counters: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        self._trace_config = None
+
+    def start(self, provider: str, model: Optional[str], stream: bool = False) -> RequestRecord:
+        return RequestRecord(provider, model, stream)
+
+    def finish(self, record: RequestRecord) -> None:
+        """ Aggregate a finished request and push it to the callback """
+        record.latency = time.monotonic() - record.started
+        labels = (("provider", record.provider), ("model", record.model or ""))
+        with self._lock:
+            for name, _, attribute, buckets in HISTOGRAMS:
+                value = getattr(record, attribute)
+                if value is None or (attribute.endswith("_bytes") and not value):
+                    continue
+                key = (name, labels)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.observe(value)
+            # requests that got no response are counted by the name of their error
+            status = str(record.status) if record.status is not None else record.error
+            self._increment(("semantix_requests_total", labels + (("status", status),)), 1)
+            if record.retries:
+                self._increment(("semantix_request_retries_total", labels), record.retries)
+            if record.request_bytes_saved:
+                self._increment(("semantix_compression_saved_bytes_total", labels + (("direction", "request"),)),
+                                record.request_bytes_saved)
+            if record.response_bytes_saved:
+                self._increment(("semantix_compression_saved_bytes_total", labels + (("direction", "response"),)),
+                                record.response_bytes_saved)
+            if record.prompt_tokens:
+                self._increment(("semantix_tokens_total", labels + (("kind", "prompt"),)), record.prompt_tokens)
+            if record.completion_tokens:
+                self._increment(("semantix_tokens_total", labels + (("kind", "completion"),)), record.completion_tokens)
+        if self.callback is not None:
+            self.callback(record)
+
+    def _increment(self, key: tuple, amount: float) -> None:
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def histogram(self, name: str, provider: str, model: Optional[str] = None) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get((name, (("provider", provider), ("model", model or ""))))
+
+    def counter(self, name: str, **labels) -> float:
+        """ Sum of a counter over the series matching the given labels """
+        with self._lock:
+            return sum(value for (counter, series), value in self._counters.items()
+                       if counter == name and all(dict(series).get(key) == str(label) for key, label in labels.items()))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_prometheus(self) -> str:
+        """ Export the histograms and counters in the Prometheus text exposition format """
+        lines = []
+        with self._lock:
+            for name, help_text, _, _ in HISTOGRAMS:
+                series = [(labels, h) for (histogram, labels), h in self._histograms.items() if histogram == name]
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(series, key=lambda item: item[0]):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{_labels(labels + (("le", _number(bound)),))}}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{_labels(labels + (("le", "+Inf"),))}}} {histogram.count}')
+                    lines.append(f"{name}_sum{{{_labels(labels)}}} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{{{_labels(labels)}}} {histogram.count}")
+            counters = {}
+            for (name, labels), value in self._counters.items():
+                counters.setdefault(name, []).append((labels, value))
+            for name in sorted(counters):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(counters[name], key=lambda item: item[0]):
+                    lines.append(f"{name}{{{_labels(labels)}}} {_number(value)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def trace_config(self):
+        """ The aiohttp TraceConfig filling the records passed as trace_request_ctx """
+        if self._trace_config is None:
+            import aiohttp
+            trace_config = aiohttp.TraceConfig()
+
+            async def on_request_start(session, context, params):
+                record = context.trace_request_ctx
+                if record is not None:
+                    record._attempt_started = time.monotonic()
+
+            async def on_dns_start(session, context, params):
+                context.dns_started = time.monotonic()
+
+            async def on_dns_end(session, context, params):
+                if context.trace_request_ctx is not None:
+                    _add(context.trace_request_ctx, "dns", time.monotonic() - context.dns_started)
+
+            async def on_connection_start(session, context, params):
+                context.connection_started = time.monotonic()
+
+            async def on_connection_end(session, context, params):
+                if context.trace_request_ctx is not None:
+                    _add(context.trace_request_ctx, "connect", time.monotonic() - context.connection_started)
+
+            async def on_request_chunk_sent(session, context, params):
+                if context.trace_request_ctx is not None:
+                    context.trace_request_ctx.request_bytes += len(params.chunk)
+
+            async def on_request_end(session, context, params):
+                record = context.trace_request_ctx
+                if record is not None:
+                    record.ttfb = time.monotonic() - record._attempt_started
+
+            async def on_response_chunk_received(session, context, params):
+                # only sent by response.read(), streamed bodies are counted by RecordedContent
+                if context.trace_request_ctx is not None:
+                    context.trace_request_ctx.response_bytes += len(params.chunk)
+
+            trace_config.on_request_start.append(on_request_start)
+            trace_config.on_dns_resolvehost_start.append(on_dns_start)
+            trace_config.on_dns_resolvehost_end.append(on_dns_end)
+            trace_config.on_connection_create_start.append(on_connection_start)
+            trace_config.on_connection_create_end.append(on_connection_end)
+            trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+            trace_config.on_request_end.append(on_request_end)
+            trace_config.on_response_chunk_received.append(on_response_chunk_received)
+            trace_config.freeze()
+            self._trace_config = trace_config
+        return self._trace_config
+
+
+class RecordedContent:
+    """ Wraps the body of a streamed response to record its time to first chunk and size while it is read """
+
+    def __init__(self, content, record: RequestRecord):
+        self._content = content
+        self._record = record
+
+    def _observe(self, data: bytes) -> bytes:
+        record = self._record
+        if data:
+            if record.ttft is None:
+                record.ttft = time.monotonic() - record.started
+            record.response_bytes += len(data)
+        return data
+
+    async def __aiter__(self):
+        async for line in self._content:
+            yield self._observe(line)
+
+    async def iter_any(self):
+        async for chunk in self._content.iter_any():
+            yield self._observe(chunk)
+
+    async def iter_chunked(self, n: int):
+        async for chunk in self._content.iter_chunked(n):
+            yield self._observe(chunk)
+
+    async def readline(self) -> bytes:
+        return self._observe(await self._content.readline())
+
+    async def readany(self) -> bytes:
+        return self._observe(await self._content.readany())
+
+    async def read(self, n: int = -1) -> bytes:
+        return self._observe(await self._content.read(n))
+
+    def __getattr__(self, name):
+        return getattr(self._content, name)
+
+
+def record_usage(record: RequestRecord, response) -> None:
+    """ Copy the token usage reported in a response body to its record """
+    if not isinstance(response, Mapping):
+        return
+    usage = response.get("usage")
+    if isinstance(usage, dict):
+        record.prompt_tokens = usage.get("prompt_tokens")
+        record.completion_tokens = usage.get("completion_tokens")
+        return
+    # cohere reports the billed tokens in the response meta
+    meta = response.get("meta")
+    billed = meta.get("billed_units") if isinstance(meta, dict) else None
+    if isinstance(billed, dict):
+        record.prompt_tokens = billed.get("input_tokens")
+        record.completion_tokens = billed.get("output_tokens")
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """ Return the Metrics shared by the clients created by ModelClient with metrics enabled """
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics()
+        return _metrics
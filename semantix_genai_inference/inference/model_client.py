@@ -1,67 +1,130 @@
+import hashlib
+import json
 import os
-import yaml
-from semantix_genai_inference.inference.llm.alpaca import AlpacaInferenceClient
-from semantix_genai_inference.inference.llm.llama2 import Llama2InferenceClient
-from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
-from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
-from semantix_genai_inference.inference.llm.azure_openai import AzureOpenAIInferenceClient
+import threading
+from semantix_genai_inference.inference.registry import providers
+
+# environment variables filling the provider settings missing from semantix.yaml
+ENV_VARS = {
+    "semantixHub": {
+        "serverId": "SEMANTIX_SERVER_ID",
+        "apiSecret": "SEMANTIX_API_SECRET",
+        "version": "SEMANTIX_VERSION"
+    },
+    "cohere": {
+        "apiKey": "COHERE_API_KEY",
+        "generate": {
+            "model": "COHERE_GENERATE_MODEL",
+            "version": "COHERE_GENERATE_VERSION"
+        }
+    },
+    "openai": {
+        "apiKey": "OPENAI_API_KEY",
+        "chat": {
+            "model": "OPENAI_CHAT_MODEL",
+            "version": "OPENAI_CHAT_VERSION"
+        }
+    },
+    "azureOpenai": {
+        "apiKey": "AZURE_OPENAI_API_KEY",
+        "chat": {
+            "apiBase": "AZURE_OPENAI_CHAT_API_BASE",
+            "deploymentId": "AZURE_OPENAI_CHAT_DEPLOYMENT_ID",
+            "apiVersion": "AZURE_OPENAI_CHAT_API_VERSION"
+        }
+    }
+}
+
+
+def _env_var_names(env_vars):
+    for env_var in env_vars.values():
+        if isinstance(env_var, dict):
+            yield from _env_var_names(env_var)
+        else:
+            yield env_var
+
+
+_ENV_VAR_NAMES = ("SEMANTIX_CONFIG_FILE",) + tuple(_env_var_names(ENV_VARS))
 
 class ModelClient:
+    # the parsed configuration, reloaded when the file or the environment changes
+    _config_cache = None
+    # clients already created, keyed by client type and configuration fingerprint
+    _clients = {}
+    _lock = threading.Lock()
 
     @staticmethod
-    def create(client_type):
+    def create(client_type, reuse=True):
         """
         Create a client for a given model type and inference server id
         
         Args:
-            client_type (str): The type of model client to create. Valid options are "alpaca", "llama2", "cohere"
+            client_type (str): The type of model client to create. Built-in options are "alpaca", "llama2", "cohere", "openai", "azure-openai" and "router", more can be added with ModelClient.register
+            reuse (bool, optional): Return the client already created for the same type and configuration, sharing its connection pool. Defaults to True
         """
-        config = ModelClient()._load_config()
-        if client_type == "alpaca":
-            semantix = config["providers"]["semantixHub"]
-            inference_server_id = semantix["serverId"]
-            api_secret = semantix["apiSecret"] if "apiSecret" in semantix else None
-            version = semantix["version"]
-            return AlpacaInferenceClient(inference_server_id, api_secret, version=version)
-        elif client_type == "llama2":
-            semantix = config["providers"]["semantixHub"]
-            inference_server_id = semantix["serverId"]
-            api_secret = semantix["apiSecret"] if "apiSecret" in semantix else None
-            version = semantix["version"]
-            return Llama2InferenceClient(inference_server_id, api_secret, version=version)
-        elif client_type == "cohere":
-            cohere = config["providers"]["cohere"]
-            api_key = cohere["apiKey"] if "apiKey" in cohere else None
-            generate_model = cohere["generate"]["model"]
-            version = cohere["generate"]["version"]
-            return CohereInferenceClient(api_key, generate_model, version=version)
-        elif client_type == "openai":
-            openai = config["providers"]["openai"]
-            api_key = openai["apiKey"] if "apiKey" in openai else None
-            model = openai["chat"]["model"]
-            version = openai["chat"]["version"]
-            return OpenAIInferenceClient(api_key, model, version=version)
-        elif client_type == "azure-openai":
-            azure_openai = config["providers"]["azureOpenai"]
-            api_key = azure_openai["apiKey"] if "apiKey" in azure_openai else None
-            host = azure_openai["chat"]["apiBase"]
-            deployment_id = azure_openai["chat"]["deploymentId"]
-            api_version = azure_openai["chat"]["apiVersion"]
-            return AzureOpenAIInferenceClient(host, deployment_id, api_version, api_key=api_key)
-        else:
-            raise Exception(f"Invalid model client type: {client_type}")
-    
-    def _load_config(self):
+        config, fingerprint = ModelClient._cached_config()
+        if not reuse:
+            return ModelClient._create(config, client_type)
+        key = (client_type, fingerprint)
+        with ModelClient._lock:
+            client = ModelClient._clients.get(key)
+        if client is None:
+            # created outside the lock, a client built concurrently for the same key is dropped before any connection opens
+            client = ModelClient._create(config, client_type)
+            with ModelClient._lock:
+                client = ModelClient._clients.setdefault(key, client)
+        return client
+
+    @staticmethod
+    def register(client_type, factory):
         """
-        Load the semantix.yaml file from the same directory where the application was executed
+        Register a client type, its factory is called with the loaded semantix.yaml configuration and returns the client
+
+        Args:
+            client_type (str): The name passed to create
+            factory (Union[str, Callable]): The factory, or its "module:attribute" path imported on the first create
         """
-        # check if SEMANTIX_CONFIG_FILE env exists otherwise use default
-        config_file = "semantix.yaml"
-        if "SEMANTIX_CONFIG_FILE" in os.environ:
-            config_file = os.environ["SEMANTIX_CONFIG_FILE"]
-        # check if file exists
-        if not os.path.isfile(config_file):
-            raise Exception(f"No {config_file} file found. The model client factory will not work, you may work instantiating the models directly.")
+        providers.register(client_type, factory)
+        ModelClient.clear_cache()
+
+    @staticmethod
+    def clear_cache():
+        """
+        Forget the cached configuration and clients, the clients are not closed since they may still be in use
+        """
+        with ModelClient._lock:
+            ModelClient._config_cache = None
+            ModelClient._clients = {}
+
+    @staticmethod
+    def _create(config, client_type):
+        return providers.get(client_type)(config)
+
+    @staticmethod
+    def _cached_config():
+        """
+        Return the configuration and its fingerprint, parsing semantix.yaml again only when its mtime, its size or the environment changed
+        """
+        config_file = os.environ.get("SEMANTIX_CONFIG_FILE", "semantix.yaml")
+        try:
+            stat = os.stat(config_file)
+            file_signature = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_signature = None
+        signature = (config_file, file_signature, tuple(os.environ.get(name) for name in _ENV_VAR_NAMES))
+        with ModelClient._lock:
+            cached = ModelClient._config_cache
+        if cached is not None and cached[0] == signature:
+            return cached[1], cached[2]
+        config = ModelClient()._load_config()
+        canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+        fingerprint = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        with ModelClient._lock:
+            if cached is None or cached[2] != fingerprint:
+                # clients of the previous configuration stay usable by whoever holds them
+                ModelClient._clients = {}
+            ModelClient._config_cache = (signature, config, fingerprint)
+        return config, fingerprint
 
     def _update_config_with_env(self, config, env_vars):
         for provider, settings in env_vars.items():
@@ -75,44 +138,19 @@ class ModelClient:
                     config["providers"][provider].setdefault(key, os.environ.get(env_var))
 
     def _load_config(self):
+        """
+        Load the semantix.yaml file from the same directory where the application was executed, or from SEMANTIX_CONFIG_FILE
+        """
         config_file = "semantix.yaml"
         if "SEMANTIX_CONFIG_FILE" in os.environ:
             config_file = os.environ["SEMANTIX_CONFIG_FILE"]
 
         config = {}
         if os.path.isfile(config_file):
+            import yaml
             with open(config_file) as f:
-                config = yaml.safe_load(f)
+                config = yaml.safe_load(f) or {}
 
         config.setdefault("providers", {})
-        env_vars = {
-            "semantixHub": {
-                "serverId": "SEMANTIX_SERVER_ID",
-                "apiSecret": "SEMANTIX_API_SECRET",
-                "version": "SEMANTIX_VERSION"
-            },
-            "cohere": {
-                "apiKey": "COHERE_API_KEY",
-                "generate": {
-                    "model": "COHERE_GENERATE_MODEL",
-                    "version": "COHERE_GENERATE_VERSION"
-                }
-            },
-            "openai": {
-                "apiKey": "OPENAI_API_KEY",
-                "chat": {
-                    "model": "OPENAI_CHAT_MODEL",
-                    "version": "OPENAI_CHAT_VERSION"
-                }
-            },
-            "azureOpenai": {
-                "apiKey": "AZURE_OPENAI_API_KEY",
-                "chat": {
-                    "apiBase": "AZURE_OPENAI_CHAT_API_BASE",
-                    "deploymentId": "AZURE_OPENAI_CHAT_DEPLOYMENT_ID",
-                    "apiVersion": "AZURE_OPENAI_CHAT_API_VERSION"
-                }
-            }
-        }
-        self._update_config_with_env(config, env_vars)
+        self._update_config_with_env(config, ENV_VARS)
         return config
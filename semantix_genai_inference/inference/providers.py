@@ -0,0 +1,191 @@
+from semantix_genai_inference.inference.session import SessionConfig
+from semantix_genai_inference.inference.batching import BatchingConfig
+from semantix_genai_inference.inference.embedding_cache import EmbeddingCache
+from semantix_genai_inference.inference.response_cache import ResponseCache
+from semantix_genai_inference.inference.semantic_cache import SemanticCache
+from semantix_genai_inference.inference.ratelimit import RateLimitConfig, get_rate_limiter
+from semantix_genai_inference.inference.hedging import HedgingConfig
+from semantix_genai_inference.inference.metrics import get_metrics
+from semantix_genai_inference.inference.single_flight import SingleFlight
+from semantix_genai_inference.inference.registry import providers
+
+# provider section of semantix.yaml read by each client type a router backend may have
+ROUTER_BACKEND_PROVIDERS = {"openai": "openai", "azure-openai": "azureOpenai"}
+
+
+def create_alpaca(config):
+    from semantix_genai_inference.inference.llm.alpaca import AlpacaInferenceClient
+    semantix = config["providers"]["semantixHub"]
+    inference_server_id = semantix["serverId"]
+    api_secret = semantix["apiSecret"] if "apiSecret" in semantix else None
+    version = semantix["version"]
+    options = client_options(config, "semantixHub")
+    batching = BatchingConfig.from_dict(semantix["batching"]) if semantix.get("batching") else None
+    return AlpacaInferenceClient(inference_server_id, api_secret, version=version, batching=batching, **options)
+
+
+def create_llama2(config):
+    from semantix_genai_inference.inference.llm.llama2 import Llama2InferenceClient
+    semantix = config["providers"]["semantixHub"]
+    inference_server_id = semantix["serverId"]
+    api_secret = semantix["apiSecret"] if "apiSecret" in semantix else None
+    version = semantix["version"]
+    options = client_options(config, "semantixHub")
+    batching = BatchingConfig.from_dict(semantix["batching"]) if semantix.get("batching") else None
+    return Llama2InferenceClient(inference_server_id, api_secret, version=version, batching=batching, **options)
+
+
+def create_cohere(config):
+    from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
+    cohere = config["providers"]["cohere"]
+    api_key = cohere["apiKey"] if "apiKey" in cohere else None
+    generate_model = cohere["generate"]["model"]
+    version = cohere["generate"]["version"]
+    options = client_options(config, "cohere")
+    rate_limiter = shared_rate_limiter(cohere, f"cohere:{generate_model}")
+    return CohereInferenceClient(api_key, generate_model, version=version, rate_limiter=rate_limiter,
+                                 **token_options(cohere), **options)
+
+
+def create_openai(config):
+    from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+    openai = config["providers"]["openai"]
+    api_key = openai["apiKey"] if "apiKey" in openai else None
+    model = openai["chat"]["model"]
+    version = openai["chat"]["version"]
+    options = client_options(config, "openai")
+    embedding_cache = EmbeddingCache.from_dict(openai["embeddingCache"]) if openai.get("embeddingCache") else None
+    if openai.get("semanticCache"):
+        semantic_cache = dict(openai["semanticCache"])
+        embeddings = semantic_cache.pop("embeddings", None)
+        options["semantic_cache"] = SemanticCache.from_dict(semantic_cache)
+        if embeddings:
+            # prompts are embedded with another model than the one of the client
+            options["embeddings_client"] = OpenAIInferenceClient(
+                api_key, model, embeddings_model=embeddings["model"], version=version, embedding_cache=embedding_cache,
+                session_config=options["session_config"], metrics=options["metrics"])
+    rate_limiter = shared_rate_limiter(openai, f"openai:{model}")
+    hedging = openai.get("hedging")
+    if hedging:
+        options["hedging"] = HedgingConfig.from_dict(hedging)
+        if hedging.get("alternate"):
+            # duplicates go to another model, e.g. a pinned snapshot with its own capacity
+            alternate_model = hedging["alternate"]["model"]
+            options["hedge_client"] = OpenAIInferenceClient(
+                api_key, alternate_model, version=version,
+                rate_limiter=shared_rate_limiter(openai, f"openai:{alternate_model}"),
+                session_config=options["session_config"], metrics=options["metrics"])
+    return OpenAIInferenceClient(api_key, model, version=version, embedding_cache=embedding_cache,
+                                 rate_limiter=rate_limiter, **token_options(openai), **options)
+
+
+def create_azure_openai(config):
+    from semantix_genai_inference.inference.llm.azure_openai import AzureOpenAIInferenceClient
+    azure_openai = config["providers"]["azureOpenai"]
+    api_key = azure_openai["apiKey"] if "apiKey" in azure_openai else None
+    host = azure_openai["chat"]["apiBase"]
+    deployment_id = azure_openai["chat"]["deploymentId"]
+    api_version = azure_openai["chat"]["apiVersion"]
+    options = client_options(config, "azureOpenai")
+    embedding_cache = EmbeddingCache.from_dict(azure_openai["embeddingCache"]) if azure_openai.get("embeddingCache") else None
+    if azure_openai.get("semanticCache"):
+        semantic_cache = dict(azure_openai["semanticCache"])
+        embeddings = semantic_cache.pop("embeddings", None)
+        if not embeddings or "deploymentId" not in embeddings:
+            raise Exception("The semantic cache of Azure OpenAI requires an embeddings section with the deploymentId of an embeddings deployment.")
+        options["semantic_cache"] = SemanticCache.from_dict(semantic_cache)
+        # the chat deployment can't embed the prompts
+        options["embeddings_client"] = AzureOpenAIInferenceClient(
+            embeddings.get("apiBase", host), embeddings["deploymentId"], embeddings.get("apiVersion", api_version),
+            api_key=embeddings.get("apiKey", api_key), embedding_cache=embedding_cache,
+            session_config=options["session_config"], metrics=options["metrics"])
+    rate_limiter = shared_rate_limiter(azure_openai, f"azure-openai:{host}/{deployment_id}")
+    hedging = azure_openai.get("hedging")
+    if hedging:
+        options["hedging"] = HedgingConfig.from_dict(hedging)
+        if hedging.get("alternate"):
+            # duplicates go to another deployment, usually in a different region
+            alternate = hedging["alternate"]
+            alternate_host = alternate.get("apiBase", host)
+            alternate_deployment = alternate.get("deploymentId", deployment_id)
+            options["hedge_client"] = AzureOpenAIInferenceClient(
+                alternate_host, alternate_deployment, alternate.get("apiVersion", api_version),
+                api_key=alternate.get("apiKey", api_key),
+                rate_limiter=shared_rate_limiter(azure_openai, f"azure-openai:{alternate_host}/{alternate_deployment}"),
+                session_config=options["session_config"], metrics=options["metrics"])
+    return AzureOpenAIInferenceClient(host, deployment_id, api_version, api_key=api_key,
+                                      embedding_cache=embedding_cache, rate_limiter=rate_limiter,
+                                      **token_options(azure_openai), **options)
+
+
+def create_router(config):
+    """
+    Create a router over the backends of the `router` section, each backend is a client type whose keys override its provider section
+    """
+    from semantix_genai_inference.inference.llm.router import RouterInferenceClient
+    from semantix_genai_inference.inference.routing import Backend, RoutingConfig
+    router = config.get("router")
+    if not router or not router.get("backends"):
+        raise Exception("The router client requires a router section with at least one backend in semantix.yaml.")
+    backends = []
+    for i, spec in enumerate(router["backends"]):
+        spec = dict(spec)
+        client_type = spec.pop("type")
+        if client_type not in ROUTER_BACKEND_PROVIDERS:
+            raise Exception(f"Invalid router backend type: {client_type}, valid options are {', '.join(ROUTER_BACKEND_PROVIDERS)}")
+        name = spec.pop("name", f"{client_type}-{i}")
+        weight = spec.pop("weight", 1)
+        provider = ROUTER_BACKEND_PROVIDERS[client_type]
+        settings = dict(config["providers"].get(provider) or {})
+        for key, value in spec.items():
+            if isinstance(value, dict) and isinstance(settings.get(key), dict):
+                value = {**settings[key], **value}
+            settings[key] = value
+        backend_config = dict(config)
+        backend_config["providers"] = {**config["providers"], provider: settings}
+        backends.append(Backend(providers.get(client_type)(backend_config), name, weight))
+    return RouterInferenceClient(backends, RoutingConfig.from_dict(router))
+
+
+def client_options(config, provider):
+    """
+    Build the keyword arguments shared by every client from the provider section
+    """
+    settings = config["providers"][provider]
+    return {
+        "session_config": session_config(config, provider),
+        "response_cache": ResponseCache.from_dict(settings["responseCache"]) if settings.get("responseCache") else None,
+        "metrics": get_metrics() if (config.get("metrics") or {}).get("enabled") else None,
+        "single_flight": SingleFlight.from_dict(settings["singleFlight"]) if settings.get("singleFlight") else None,
+    }
+
+
+def token_options(settings):
+    """
+    Read the context window checks of a provider, contextWindow overrides the size known for the model and overflow is error or truncate
+    """
+    options = {}
+    if "contextWindow" in settings:
+        options["context_window"] = settings["contextWindow"]
+    if "overflow" in settings:
+        options["overflow"] = settings["overflow"]
+    return options
+
+
+def shared_rate_limiter(settings, key):
+    """
+    Return the rate limiter shared by the clients of a deployment, None when the provider has no `rateLimit` section
+    """
+    if "rateLimit" not in settings:
+        return None
+    return get_rate_limiter(key, RateLimitConfig.from_dict(settings["rateLimit"]))
+
+
+def session_config(config, provider):
+    """
+    Build the connection pool settings of a provider, the provider `http` section overrides the top level one
+    """
+    http = dict(config.get("http") or {})
+    http.update(config["providers"][provider].get("http") or {})
+    return SessionConfig.from_dict(http)
+
@@ -0,0 +1,194 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Optional
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """ Parse the reset durations sent by OpenAI, such as 20ms, 1s or 6m0s, into seconds """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = _DURATION.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * _UNITS[unit] for amount, unit in matches)
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimitConfig:
+    """  Quota and retry settings of a RateLimiter
+
+    Args:
+        requests_per_minute (int, optional): Requests allowed per minute, None learns it from the rate limit headers
+        tokens_per_minute (int, optional): Tokens allowed per minute, None learns it from the rate limit headers
+        max_retries (int, optional): Times a throttled request is retried. Defaults to 5
+        base_delay (float, optional): First backoff delay in seconds, doubled on every retry. Defaults to 0.5
+        max_delay (float, optional): Maximum backoff delay in seconds. Defaults to 30
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None,
+                 max_retries: Optional[int] = 5, base_delay: Optional[float] = 0.5, max_delay: Optional[float] = 30):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a RateLimitConfig from the `rateLimit` section of a provider in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys requestsPerMinute, tokensPerMinute, maxRetries, baseDelay and maxDelay
+        """
+        config = config or {}
+        keys = {
+            "requestsPerMinute": "requests_per_minute",
+            "tokensPerMinute": "tokens_per_minute",
+            "maxRetries": "max_retries",
+            "baseDelay": "base_delay",
+            "maxDelay": "max_delay",
+        }
+        kwargs = {}
+        for key, value in config.items():
+            if key not in keys:
+                raise Exception(f"Invalid rateLimit configuration key: {key}")
+            kwargs[keys[key]] = value
+        return cls(**kwargs)
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        # a request larger than the bucket waits for a full bucket instead of forever
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def set_limit(self, per_minute: int) -> None:
+        if per_minute > 0 and per_minute != self.capacity:
+            self.capacity = float(per_minute)
+            self.rate = per_minute / 60
+            self.level = min(self.level, self.capacity)
+
+
+class RateLimiter:
+    """ Token buckets pacing the requests and tokens sent to one provider or deployment.
+
+    The buckets are seeded from the configuration and adjusted from the x-ratelimit-* headers of every
+    response, and a throttled request pauses every caller for a jittered exponential backoff.
+    The limiter is thread-safe and may be shared by clients running on different event loops.
+    """
+
+    def __init__(self, config: Optional[RateLimitConfig] = None):
+        self.config = config or RateLimitConfig()
+        self._requests = TokenBucket(self.config.requests_per_minute) if self.config.requests_per_minute else None
+        self._tokens = TokenBucket(self.config.tokens_per_minute) if self.config.tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """ Wait until the quota allows one more request of the given number of tokens """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    for bucket in (self._requests, self._tokens):
+                        if bucket is not None:
+                            bucket.refill(now)
+                    wait = max(self._requests.wait_time(1) if self._requests else 0.0,
+                               self._tokens.wait_time(tokens) if self._tokens else 0.0)
+                    if wait <= 0:
+                        if self._requests is not None:
+                            self._requests.level -= 1
+                        if self._tokens is not None:
+                            self._tokens.level -= min(tokens, self._tokens.capacity)
+                        return
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers) -> None:
+        """ Align the buckets with the quota reported by OpenAI and Azure OpenAI """
+        with self._lock:
+            now = time.monotonic()
+            for kind in ("requests", "tokens"):
+                limit = _parse_int(headers.get(f"x-ratelimit-limit-{kind}"))
+                remaining = _parse_int(headers.get(f"x-ratelimit-remaining-{kind}"))
+                bucket = self._requests if kind == "requests" else self._tokens
+                if bucket is None and limit:
+                    bucket = TokenBucket(limit)
+                    if kind == "requests":
+                        self._requests = bucket
+                    else:
+                        self._tokens = bucket
+                if bucket is None:
+                    continue
+                if limit:
+                    bucket.set_limit(limit)
+                if remaining is not None:
+                    bucket.refill(now)
+                    # the server also counts the requests of other processes sharing the quota
+                    bucket.level = min(bucket.level, float(remaining))
+                    if remaining == 0:
+                        reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                        if reset:
+                            self._paused_until = max(self._paused_until, now + reset)
+
+    def backoff(self, attempt: int, headers) -> float:
+        """ Pause every caller after a throttled response and return the delay """
+        retry_after = None
+        if headers.get("retry-after-ms"):
+            retry_after = _parse_int(headers.get("retry-after-ms"))
+            retry_after = retry_after / 1000 if retry_after is not None else None
+        if retry_after is None:
+            retry_after = parse_duration(headers.get("retry-after"))
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.config.base_delay)
+        else:
+            # full jitter keeps the retries of many workers from arriving at once
+            delay = random.uniform(0, min(self.config.max_delay, self.config.base_delay * 2 ** attempt))
+        with self._lock:
+            self.throttled += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, config: Optional[RateLimitConfig] = None) -> RateLimiter:
+    """ Return the rate limiter shared by every client of a provider or deployment """
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(config)
+        return limiter
@@ -0,0 +1,83 @@
+import importlib
+import threading
+from typing import Callable, Dict, List, Union
+
+# third-party packages register their providers under this entry point group, e.g. in pyproject.toml:
+# [tool.poetry.plugins."semantix_genai_inference.providers"]
+# my-model = "my_package.semantix:create_client"
+ENTRY_POINT_GROUP = "semantix_genai_inference.providers"
+
+
+def _entry_points(group: str) -> list:
+    from importlib import metadata
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, "select"):
+        return list(entry_points.select(group=group))
+    # python < 3.10 returns a dict of groups
+    return list(entry_points.get(group, ()))
+
+
+class ProviderRegistry:
+    """ Maps the client types accepted by ModelClient.create to the factories building them.
+
+    A factory takes the loaded semantix.yaml configuration and returns a client. It may be registered as
+    a "module:attribute" path, so the provider module and its dependencies are only imported when the
+    first client of that type is created. Entry points of the group `semantix_genai_inference.providers`
+    are discovered the first time an unknown type is requested, built-in types win on name clashes.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Union[str, Callable]] = {}
+        self._entry_points_loaded = False
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Union[str, Callable]) -> None:
+        """  Register the factory of a client type, replacing any previous one
+
+        Args:
+            name (str): The client type passed to ModelClient.create
+            factory (Union[str, Callable]): A callable taking the configuration and returning a client, or its "module:attribute" path
+        """
+        with self._lock:
+            self._factories[name] = factory
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._factories.pop(name, None)
+
+    def _load_entry_points(self) -> None:
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            self._entry_points_loaded = True
+            for entry_point in _entry_points(ENTRY_POINT_GROUP):
+                self._factories.setdefault(entry_point.name, entry_point.value)
+
+    def get(self, name: str) -> Callable:
+        """ Return the factory of a client type, importing its module on first use """
+        if name not in self._factories:
+            self._load_entry_points()
+        factory = self._factories.get(name)
+        if factory is None:
+            raise Exception(f"Invalid model client type: {name}, valid options are {', '.join(self.names())}")
+        if isinstance(factory, str):
+            module_name, _, attribute = factory.partition(":")
+            factory = importlib.import_module(module_name)
+            for part in attribute.split("."):
+                factory = getattr(factory, part)
+            with self._lock:
+                self._factories[name] = factory
+        return factory
+
+    def names(self) -> List[str]:
+        self._load_entry_points()
+        return sorted(self._factories)
+
+
+providers = ProviderRegistry()
+providers.register("alpaca", "semantix_genai_inference.inference.providers:create_alpaca")
+providers.register("llama2", "semantix_genai_inference.inference.providers:create_llama2")
+providers.register("cohere", "semantix_genai_inference.inference.providers:create_cohere")
+providers.register("openai", "semantix_genai_inference.inference.providers:create_openai")
+providers.register("azure-openai", "semantix_genai_inference.inference.providers:create_azure_openai")
+providers.register("router", "semantix_genai_inference.inference.providers:create_router")
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from .codec import dumps, loads, to_jsonable
+from .embedding_cache import CacheStats
+from .responses import JSONResponse
+
+
+class MemoryCacheBackend:
+    """  In-process LRU storage of cached responses
+
+    Args:
+        max_entries (int, optional): Maximum number of responses kept. Defaults to 1024
+        max_bytes (int, optional): Maximum size of the serialized responses kept. Defaults to 64MB
+    """
+
+    def __init__(self, max_entries: Optional[int] = 1024, max_bytes: Optional[int] = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (expires_at, value)
+            self._bytes += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats.evictions += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class DiskCacheBackend:
+    """  SQLite storage of cached responses, shared across runs
+
+    Args:
+        path (str): Path of the SQLite database
+        max_entries (int, optional): Maximum number of responses kept, the least recently used are evicted. Defaults to 100000
+        touch_interval (float, optional): Seconds within which repeated reads of a response do not write its access time again. Defaults to 60
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = 100000, touch_interval: Optional[float] = 60):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                         "expires_at REAL, accessed_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._db.commit()
+        # kept up to date by the writes of this process, counted again only when it passes max_entries
+        self._count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at, accessed_at FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            now = time.time()
+            if expires_at is not None and expires_at <= now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self._count -= 1
+                return None
+            # the eviction order only needs a coarse access time, so hot keys are not written on every read
+            if now - accessed_at >= self.touch_interval:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            return value
+
+    def set(self, key: str, value: bytes, expires_at: Optional[float]) -> None:
+        with self._lock:
+            replaced = self._db.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is not None
+            self._db.execute("INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                             (key, value, expires_at, time.time()))
+            if not replaced:
+                self._count += 1
+            if self._count > self.max_entries:
+                # other processes may share the file, the table is counted before evicting
+                self._count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if self._count > self.max_entries:
+                    self._db.execute("DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                                     "ORDER BY accessed_at LIMIT ?)", (self._count - self.max_entries,))
+                    self.stats.evictions += self._count - self.max_entries
+                    self._count = self.max_entries
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._count = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class ResponseCache:
+    """  Cache of generation responses keyed on the canonical request body
+
+    Only deterministic requests are cached by default: temperature 0, a single candidate and no streaming.
+    Passing cache=True to generate does not change this, it is the default and only allows the call to use
+    the cache, while cache=False bypasses it.
+
+    Args:
+        backend (optional): A MemoryCacheBackend or DiskCacheBackend. Defaults to a MemoryCacheBackend
+        ttl (float, optional): Seconds a response stays valid, None keeps it until evicted. Defaults to 3600
+        allow_nondeterministic (bool, optional): Also cache requests with sampling enabled. Defaults to False
+    """
+
+    def __init__(self, backend=None, ttl: Optional[float] = 3600, allow_nondeterministic: Optional[bool] = False):
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl = ttl
+        self.allow_nondeterministic = allow_nondeterministic
+        self.stats = self.backend.stats
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a ResponseCache from the `responseCache` section of a provider in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys backend (memory or disk), path, ttl, maxEntries, maxBytes, touchInterval and allowNondeterministic
+        """
+        config = config or {}
+        backend_kwargs = {}
+        if "maxEntries" in config:
+            backend_kwargs["max_entries"] = config["maxEntries"]
+        backend_type = config.get("backend", "memory")
+        if backend_type == "memory":
+            if "maxBytes" in config:
+                backend_kwargs["max_bytes"] = config["maxBytes"]
+            backend = MemoryCacheBackend(**backend_kwargs)
+        elif backend_type == "disk":
+            if "path" not in config:
+                raise Exception("The disk response cache backend requires a path.")
+            if "touchInterval" in config:
+                backend_kwargs["touch_interval"] = config["touchInterval"]
+            backend = DiskCacheBackend(config["path"], **backend_kwargs)
+        else:
+            raise Exception(f"Invalid response cache backend: {backend_type}")
+        kwargs = {}
+        if "ttl" in config:
+            kwargs["ttl"] = config["ttl"]
+        if "allowNondeterministic" in config:
+            kwargs["allow_nondeterministic"] = config["allowNondeterministic"]
+        return cls(backend, **kwargs)
+
+    @staticmethod
+    def is_deterministic(body: dict) -> bool:
+        return (body.get("temperature") == 0
+                and body.get("n") in (None, 1)
+                and body.get("num_generations") in (None, 1)
+                and not body.get("stream"))
+
+    def key_for(self, url: str, body: dict) -> Optional[str]:
+        """ Return the cache key of a request, or None if its response must not be cached """
+        if not self.allow_nondeterministic and not self.is_deterministic(body):
+            return None
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=to_jsonable)
+        return hashlib.sha256(f"{url}\0{canonical}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str, response_class=None):
+        """  Return the cached response of a key, None on a miss
+
+        Args:
+            key (str): The key returned by key_for
+            response_class (type, optional): A JSONResponse class built from the cached bytes. Defaults to the decoded response
+        """
+        value = self.backend.get(key)
+        if value is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        # decode on every hit so callers never share a mutable response
+        return loads(value) if response_class is None else response_class(value)
+
+    def set(self, key: str, response) -> None:
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        # responses received as bytes are stored as they are
+        value = response.raw if isinstance(response, JSONResponse) else dumps(response)
+        self.backend.set(key, value, expires_at)
+
+    async def aget(self, key: str, response_class=None):
+        """ get for the event loop, the backends other than the in-memory one are read in the default executor """
+        if isinstance(self.backend, MemoryCacheBackend):
+            return self.get(key, response_class)
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key, response_class)
+
+    async def aset(self, key: str, response) -> None:
+        """ set for the event loop, the backends other than the in-memory one are written in the default executor """
+        if isinstance(self.backend, MemoryCacheBackend):
+            return self.set(key, response)
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, response)
+
+    def clear(self) -> None:
+        self.backend.clear()
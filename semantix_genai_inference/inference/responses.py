@@ -0,0 +1,87 @@
+from typing import Any, List, Optional
+from .codec import dumps, loads
+
+
+class JSONResponse(dict):
+    """ A JSON object returned by an API, the dict it decodes to with the bytes it was received as.
+
+    The response is a dict, so it can be indexed, modified and encoded like one. `raw` returns the body as
+    it was received so it can be stored or forwarded without encoding it again, it does not follow later
+    changes to the dict. `to_dict` returns a plain dict copy.
+    """
+    __slots__ = ("_raw",)
+
+    def __init__(self, raw: Optional[bytes] = None, data: Optional[dict] = None):
+        super().__init__(loads(raw) if data is None else data)
+        self._raw = raw
+
+    @classmethod
+    def from_data(cls, data: dict):
+        return cls(data=data)
+
+    @property
+    def raw(self) -> bytes:
+        if self._raw is None:
+            self._raw = dumps(dict(self))
+        return self._raw
+
+    def to_dict(self) -> dict:
+        return dict(self)
+
+    @property
+    def error(self) -> Optional[Any]:
+        """ The error reported by the API, None for successful responses """
+        return self.get("error")
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict.__repr__(self)})"
+
+
+class ChatCompletion(JSONResponse):
+    """ Response of the OpenAI and Azure OpenAI chat completion APIs """
+    __slots__ = ()
+
+    @property
+    def choices(self) -> List[dict]:
+        return self.get("choices") or []
+
+    @property
+    def content(self) -> Optional[str]:
+        """ The message content of the first choice """
+        choices = self.choices
+        return choices[0].get("message", {}).get("content") if choices else None
+
+    @property
+    def usage(self) -> Optional[dict]:
+        return self.get("usage")
+
+
+class Embeddings(JSONResponse):
+    """ Response of the OpenAI and Azure OpenAI embeddings APIs """
+    __slots__ = ()
+
+    @property
+    def embedding(self) -> Optional[List[float]]:
+        """ The vector of the first input """
+        data = self.get("data")
+        return data[0]["embedding"] if data else None
+
+    def vectors(self):
+        """ The vectors as a float32 numpy matrix ordered by input index, requires numpy """
+        from .embeddings import parse_embeddings
+        return parse_embeddings(self, len(self.get("data") or ()))
+
+
+class Generation(JSONResponse):
+    """ Response of the Cohere generate API """
+    __slots__ = ()
+
+    @property
+    def generations(self) -> List[dict]:
+        return self.get("generations") or []
+
+    @property
+    def text(self) -> Optional[str]:
+        """ The text of the first generation """
+        generations = self.generations
+        return generations[0].get("text") if generations else None
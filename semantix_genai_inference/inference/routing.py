@@ -0,0 +1,273 @@
+import asyncio
+import random
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+import aiohttp
+from .session import ResponseError, raising_for_status
+
+POLICIES = ("weighted", "least-outstanding", "ewma")
+
+
+class RoutingConfig:
+    """  Backend selection and health settings of the router client
+
+    Args:
+        policy (str, optional): weighted picks backends at random in proportion to their weight, least-outstanding picks the one with the fewest requests in flight per weight and ewma the one with the lowest expected latency given its requests in flight. Defaults to least-outstanding
+        failure_threshold (int, optional): Consecutive failures that eject a backend. Defaults to 5
+        reset_timeout (float, optional): Seconds an ejected backend waits before a trial request is sent to it. Defaults to 30
+        ewma_alpha (float, optional): Weight of the latest latency in the moving average. Defaults to 0.3
+        max_attempts (int, optional): Backends tried by one request before its error is raised, None tries each healthy backend once. Defaults to None
+    """
+
+    def __init__(self, policy: Optional[str] = "least-outstanding", failure_threshold: Optional[int] = 5,
+                 reset_timeout: Optional[float] = 30, ewma_alpha: Optional[float] = 0.3,
+                 max_attempts: Optional[int] = None):
+        if policy not in POLICIES:
+            raise Exception(f"Invalid routing policy: {policy}, valid options are {', '.join(POLICIES)}")
+        self.policy = policy
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.ewma_alpha = ewma_alpha
+        self.max_attempts = max_attempts
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a RoutingConfig from the `router` section of semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys policy, failureThreshold, resetTimeout, ewmaAlpha and maxAttempts
+        """
+        config = config or {}
+        kwargs = {}
+        if "policy" in config:
+            kwargs["policy"] = config["policy"]
+        if "failureThreshold" in config:
+            kwargs["failure_threshold"] = config["failureThreshold"]
+        if "resetTimeout" in config:
+            kwargs["reset_timeout"] = config["resetTimeout"]
+        if "ewmaAlpha" in config:
+            kwargs["ewma_alpha"] = config["ewmaAlpha"]
+        if "maxAttempts" in config:
+            kwargs["max_attempts"] = config["maxAttempts"]
+        return cls(**kwargs)
+
+
+class CircuitBreaker:
+    """ Ejects a backend after consecutive failures and lets a single trial request through once the reset timeout passes """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+
+    def available(self, now: float) -> bool:
+        if self.state == self.OPEN:
+            return now - self._opened_at >= self.reset_timeout
+        # a half-open breaker already has its trial request in flight
+        return self.state == self.CLOSED
+
+    def on_dispatch(self) -> None:
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+
+    def on_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def on_abandon(self) -> None:
+        # a cancelled trial request proves nothing, the next request may try again
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+
+    def on_failure(self, now: float) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = now
+
+
+class Backend:
+    """  A client the router sends requests to
+
+    Args:
+        client: An OpenAIClient implementation
+        name (str, optional): Name of the backend in the stats. Defaults to the index of the backend
+        weight (float, optional): Share of the traffic of the backend relative to the others. Defaults to 1
+    """
+
+    def __init__(self, client, name: Optional[str] = None, weight: Optional[float] = 1):
+        if weight <= 0:
+            raise ValueError("weight must be positive.")
+        self.client = client
+        self.name = name
+        self.weight = weight
+        self.outstanding = 0
+        self.ewma = None
+        self.requests = 0
+        self.failures = 0
+        self.breaker = None
+
+    def __repr__(self):
+        state = self.breaker.state if self.breaker else None
+        return (f"Backend(name={self.name!r}, weight={self.weight}, outstanding={self.outstanding}, ewma={self.ewma}, "
+                f"requests={self.requests}, failures={self.failures}, state={state!r})")
+
+
+def is_retryable(error: Exception) -> bool:
+    """ Whether another backend may succeed where this one failed: throttling, server errors, timeouts and connection errors """
+    if isinstance(error, ResponseError):
+        return error.status in (408, 409, 429) or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+async def _raising_on_first(items: AsyncIterator) -> AsyncIterator:
+    """ Iterate items, whose request is sent and checked by the first step, raising on its error status """
+    # set and reset within one step, a value set across a yield would leak into the context of the consumer
+    with raising_for_status():
+        try:
+            first = await items.__anext__()
+        except StopAsyncIteration:
+            return
+    yield first
+    async for item in items:
+        yield item
+
+
+class Router:
+    """ Spreads requests over several backends and fails over to another one on retryable errors.
+
+    The requests are made inside raising_for_status(), so the error statuses of the backends raise ResponseError
+    while the clients keep returning error bodies to their other callers.
+
+    A request that fails after a streamed response has started is not retried, its error is raised.
+    """
+
+    def __init__(self, backends: List[Backend], config: Optional[RoutingConfig] = None):
+        if not backends:
+            raise Exception("The router needs at least one backend.")
+        self.config = config or RoutingConfig()
+        self.backends = backends
+        for i, backend in enumerate(backends):
+            if backend.name is None:
+                backend.name = str(i)
+            backend.breaker = CircuitBreaker(self.config.failure_threshold, self.config.reset_timeout)
+        self._lock = threading.Lock()
+
+    def _score(self, backend: Backend, prior: float) -> float:
+        if self.config.policy == "ewma":
+            # backends without samples yet are expected to be as fast as the others, not infinitely fast
+            latency = prior if backend.ewma is None else backend.ewma
+            return latency * (backend.outstanding + 1) / backend.weight
+        return backend.outstanding / backend.weight
+
+    def _acquire(self, tried: set) -> Optional[Backend]:
+        with self._lock:
+            now = time.monotonic()
+            candidates = [backend for backend in self.backends
+                          if backend.name not in tried and backend.breaker.available(now)]
+            if not candidates:
+                return None
+            if self.config.policy == "weighted":
+                backend = random.choices(candidates, weights=[b.weight for b in candidates])[0]
+            else:
+                sampled = [b.ewma for b in candidates if b.ewma is not None]
+                prior = sum(sampled) / len(sampled) if sampled else 1.0
+                scores = [self._score(b, prior) for b in candidates]
+                best = min(scores)
+                tied = [b for b, score in zip(candidates, scores) if score == best]
+                # on ties the backends without samples are tried first, to get them sampled
+                backend = random.choice([b for b in tied if b.ewma is None] or tied)
+            backend.breaker.on_dispatch()
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def _release(self, backend: Backend, outcome: str, latency: Optional[float] = None) -> None:
+        with self._lock:
+            backend.outstanding -= 1
+            if outcome == "failure":
+                backend.failures += 1
+                backend.breaker.on_failure(time.monotonic())
+            elif outcome == "abandoned":
+                backend.breaker.on_abandon()
+            else:
+                if latency is not None:
+                    alpha = self.config.ewma_alpha
+                    backend.ewma = latency if backend.ewma is None else alpha * latency + (1 - alpha) * backend.ewma
+                backend.breaker.on_success()
+
+    def _max_attempts(self) -> int:
+        return self.config.max_attempts or len(self.backends)
+
+    def _no_backend(self, error: Optional[Exception]):
+        if error is not None:
+            return error
+        return Exception("No healthy backend available, every circuit breaker is open.")
+
+    async def call(self, request: Callable[[object], Awaitable]):
+        """ Run request(client) on the selected backend, failing over to the next one on retryable errors """
+        tried = set()
+        error = None
+        for _ in range(self._max_attempts()):
+            backend = self._acquire(tried)
+            if backend is None:
+                break
+            tried.add(backend.name)
+            start = time.monotonic()
+            try:
+                with raising_for_status():
+                    result = await request(backend.client)
+            except Exception as e:
+                if not is_retryable(e):
+                    # the request itself is wrong, the backend is healthy
+                    self._release(backend, "success")
+                    raise
+                self._release(backend, "failure")
+                error = e
+                continue
+            except BaseException:
+                self._release(backend, "abandoned")
+                raise
+            self._release(backend, "success", time.monotonic() - start)
+            return result
+        raise self._no_backend(error)
+
+    async def stream(self, request: Callable[[object], AsyncIterator]) -> AsyncIterator:
+        """ Iterate request(client) on the selected backend, failing over only until the first item arrives """
+        tried = set()
+        error = None
+        for _ in range(self._max_attempts()):
+            backend = self._acquire(tried)
+            if backend is None:
+                break
+            tried.add(backend.name)
+            start = time.monotonic()
+            first_item = None
+            items = request(backend.client)
+            try:
+                async for item in _raising_on_first(items):
+                    if first_item is None:
+                        first_item = time.monotonic() - start
+                    yield item
+            except Exception as e:
+                retryable = is_retryable(e)
+                self._release(backend, "failure" if retryable else "success")
+                if first_item is not None or not retryable:
+                    raise
+                error = e
+                continue
+            except BaseException:
+                self._release(backend, "abandoned")
+                raise
+            finally:
+                await items.aclose()
+            # the time to the first item is the latency that matters for streams
+            self._release(backend, "success", first_item)
+            return
+        raise self._no_backend(error)
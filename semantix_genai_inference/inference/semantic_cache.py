@@ -0,0 +1,281 @@
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import threading
+from typing import Optional, Tuple
+from .codec import dumps, loads, to_jsonable
+from .embedding_cache import CacheStats
+from .embeddings import import_numpy
+from .response_cache import ResponseCache
+from .responses import JSONResponse
+
+
+class SemanticCache:
+    """  Cache of chat completions looked up by the meaning of the prompt, so rephrased questions reuse an answer
+
+    The last user message of a request is embedded by the embeddings_client of the chat client, or by the
+    client itself, and compared by cosine similarity with the prompts of the cached responses. The most
+    similar one is returned when it reaches threshold and the rest of the request, the earlier messages, the
+    model and the parameters, is identical. A prompt that can't be embedded is a miss. When the cache is
+    full the least recently used response is evicted.
+
+    The search is a matrix product over the normalized prompt vectors. From approximate_from entries on, the
+    vectors are clustered and a lookup only scores the ones in the probes clusters closest to the prompt,
+    which may miss a match in another cluster. The clusters are rebuilt each time the cache doubles.
+
+    Args:
+        threshold (float, optional): Minimum cosine similarity of a hit. Defaults to 0.95
+        max_entries (int, optional): Maximum number of responses kept. Defaults to 10000
+        path (str, optional): File the cache is loaded from, and saved to by save() and at exit. Defaults to None, kept only in memory
+        approximate_from (int, optional): Number of entries from which the approximate index is used, None always scores all of them. Defaults to 50000
+        probes (int, optional): Clusters scored by a lookup of the approximate index. Defaults to 8
+        allow_nondeterministic (bool, optional): Also cache the requests sampled with a temperature other than 0 or with several choices. Defaults to False
+    """
+
+    def __init__(self, threshold: Optional[float] = 0.95, max_entries: Optional[int] = 10000, path: Optional[str] = None,
+                 approximate_from: Optional[int] = 50000, probes: Optional[int] = 8,
+                 allow_nondeterministic: Optional[bool] = False):
+        self._np = import_numpy()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.path = path
+        self.approximate_from = approximate_from
+        self.probes = probes
+        self.allow_nondeterministic = allow_nondeterministic
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._clock = 0
+        # one row per entry, the slot of an evicted entry is reused by the next one
+        self._vectors = None
+        self._partitions = None
+        self._used = None
+        self._entries = []
+        # the code of each partition with cached entries and their number, a partition left empty is forgotten
+        self._codes = {}
+        self._counts = {}
+        self._next_code = 0
+        self._centroids = None
+        self._clusters = None
+        self._clustered_at = 0
+        if path:
+            if os.path.exists(path):
+                self._load(path)
+            atexit.register(self.save)
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a SemanticCache from the `semanticCache` section of a provider in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the keys threshold, maxEntries, path, approximateFrom, probes and allowNondeterministic
+        """
+        config = config or {}
+        keys = {
+            "threshold": "threshold",
+            "maxEntries": "max_entries",
+            "path": "path",
+            "approximateFrom": "approximate_from",
+            "probes": "probes",
+            "allowNondeterministic": "allow_nondeterministic",
+        }
+        kwargs = {}
+        for key, value in config.items():
+            if key not in keys:
+                raise Exception(f"Invalid semantic cache configuration key: {key}")
+            kwargs[keys[key]] = value
+        return cls(**kwargs)
+
+    def query_for(self, url: str, body: dict) -> Optional[Tuple[str, str]]:
+        """ Return the partition and the prompt a request is looked up with, or None if it must not be cached """
+        if not self.allow_nondeterministic and not ResponseCache.is_deterministic(body):
+            return None
+        messages = list(body.get("messages") or ())
+        if not messages or messages[-1].get("role") != "user" or not isinstance(messages[-1].get("content"), str):
+            return None
+        # everything but the content of the prompt must match
+        rest = dict(body)
+        rest["messages"] = messages[:-1] + [{key: value for key, value in messages[-1].items() if key != "content"}]
+        canonical = json.dumps(rest, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=to_jsonable)
+        partition = hashlib.sha256(f"{url}\0{canonical}".encode("utf-8")).hexdigest()
+        return partition, messages[-1]["content"]
+
+    def get(self, partition: str, vector, response_class=None):
+        """  Return the response cached for the most similar prompt of the partition, None on a miss
+
+        Args:
+            partition (str): The partition returned by query_for
+            vector: The embedding of the prompt
+            response_class (type, optional): A JSONResponse class built from the cached bytes. Defaults to the decoded response
+        """
+        np = self._np
+        query = self._normalize(vector)
+        with self._lock:
+            code = self._codes.get(partition)
+            slot = None
+            if code is not None and self._size:
+                candidates = np.flatnonzero(self._partitions[:self._size] == code)
+                if self._centroids is not None and candidates.size:
+                    probed = np.argsort(self._centroids @ query)[-self.probes:]
+                    candidates = candidates[np.isin(self._clusters[candidates], probed)]
+                if candidates.size:
+                    scores = self._vectors[candidates] @ query
+                    best = int(np.argmax(scores))
+                    if scores[best] >= self.threshold:
+                        slot = int(candidates[best])
+            if slot is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            self._clock += 1
+            self._used[slot] = self._clock
+            raw = self._entries[slot][2]
+        return loads(raw) if response_class is None else response_class(raw)
+
+    def set(self, partition: str, vector, prompt: str, response) -> None:
+        """ Cache the response of a prompt, a JSONResponse, a dict or the raw JSON bytes, evicting the least recently used one when the cache is full """
+        if isinstance(response, bytes):
+            raw = response
+        else:
+            raw = response.raw if isinstance(response, JSONResponse) else dumps(response)
+        vector = self._normalize(vector)
+        with self._lock:
+            self._reserve(vector.shape[0])
+            if self._size < self.max_entries:
+                slot = self._size
+                self._size += 1
+                self._entries.append(None)
+            else:
+                slot = int(self._np.argmin(self._used[:self._size]))
+                self.stats.evictions += 1
+                self._release(self._entries[slot][0])
+            code = self._codes.get(partition)
+            if code is None:
+                code = self._codes[partition] = self._next_code
+                self._next_code += 1
+            self._counts[partition] = self._counts.get(partition, 0) + 1
+            self._vectors[slot] = vector
+            self._partitions[slot] = code
+            self._clock += 1
+            self._used[slot] = self._clock
+            self._entries[slot] = (partition, prompt, raw)
+            if self.approximate_from is not None and self._size >= self.approximate_from \
+                    and self._size >= 2 * self._clustered_at:
+                self._cluster()
+            elif self._centroids is not None:
+                self._clusters[slot] = int(self._np.argmax(self._centroids @ vector))
+
+    async def aget(self, partition: str, vector, response_class=None):
+        """ get for the event loop, the scan of the vectors runs in the default executor """
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, partition, vector, response_class)
+
+    async def aset(self, partition: str, vector, prompt: str, response) -> None:
+        """ set for the event loop, the insert and the clustering it may trigger run in the default executor """
+        await asyncio.get_running_loop().run_in_executor(None, self.set, partition, vector, prompt, response)
+
+    def _release(self, partition: str) -> None:
+        self._counts[partition] -= 1
+        if not self._counts[partition]:
+            del self._counts[partition]
+            del self._codes[partition]
+
+    def _normalize(self, vector):
+        vector = self._np.asarray(vector, dtype=self._np.float32).ravel()
+        norm = float(self._np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _reserve(self, dimensions: int) -> None:
+        np = self._np
+        if self._vectors is None:
+            capacity = min(self.max_entries, 1024)
+            self._vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+            self._partitions = np.zeros(capacity, dtype=np.int64)
+            self._used = np.zeros(capacity, dtype=np.int64)
+            self._clusters = np.zeros(capacity, dtype=np.int32)
+            return
+        if self._vectors.shape[1] != dimensions:
+            raise Exception(f"Expected embeddings of {self._vectors.shape[1]} dimensions, got {dimensions}.")
+        capacity = len(self._vectors)
+        if self._size == capacity and capacity < self.max_entries:
+            # grown by doubling, the copies are amortized over the appends
+            grown = min(capacity * 2, self.max_entries)
+            self._vectors = np.concatenate([self._vectors, np.zeros((grown - capacity, dimensions), dtype=np.float32)])
+            for name in ("_partitions", "_used", "_clusters"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros(grown - capacity, dtype=array.dtype)]))
+
+    def _cluster(self, iterations: int = 5) -> None:
+        """ Spherical k-means over a sample of the vectors, then every vector is assigned to its closest centroid """
+        np = self._np
+        vectors = self._vectors[:self._size]
+        count = max(int(np.sqrt(self._size)), 1)
+        random = np.random.default_rng(0)
+        sample = vectors[random.choice(self._size, min(self._size, count * 64), replace=False)]
+        centroids = sample[random.choice(len(sample), count, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            # an empty cluster keeps its centroid
+            filled = norms > 0
+            centroids[filled] = sums[filled] / norms[filled, None]
+        for start in range(0, self._size, 8192):
+            end = min(start + 8192, self._size)
+            self._clusters[start:end] = np.argmax(vectors[start:end] @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._clustered_at = self._size
+
+    def save(self, path: Optional[str] = None) -> None:
+        """ Write the cache to path, the path of the cache by default, replacing the file at once """
+        path = path or self.path
+        if not path:
+            raise Exception("The semantic cache has no path to be saved to.")
+        np = self._np
+        with self._lock:
+            size = self._size
+            names = list(self._codes)
+            # the codes of forgotten partitions leave gaps, the file numbers the partitions from 0
+            numbers = np.zeros(self._next_code, dtype=np.int64)
+            numbers[[self._codes[name] for name in names]] = np.arange(len(names))
+            meta = {
+                "partitions": names,
+                "entries": [[prompt, raw.decode("utf-8")] for _, prompt, raw in self._entries],
+            }
+            arrays = {
+                "vectors": self._vectors[:size] if size else np.zeros((0, 0), dtype=np.float32),
+                "partitions": numbers[self._partitions[:size]] if size else np.zeros(0, dtype=np.int64),
+                "used": self._used[:size] if size else np.zeros(0, dtype=np.int64),
+                "meta": np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+            }
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            np.savez(file, **arrays)
+        os.replace(temporary, path)
+
+    def _load(self, path: str) -> None:
+        np = self._np
+        with np.load(path, allow_pickle=False) as data:
+            vectors, partitions, used = data["vectors"], data["partitions"], data["used"]
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        names = meta["partitions"]
+        # added from the least to the most recently used, the most recent are kept when max_entries is lower
+        for i in np.argsort(used, kind="stable")[-self.max_entries:]:
+            partition = names[int(partitions[i])]
+            prompt, raw = meta["entries"][i]
+            self.set(partition, vectors[i], prompt, raw.encode("utf-8"))
+
+    def __len__(self):
+        return self._size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._entries = []
+            self._codes = {}
+            self._counts = {}
+            self._next_code = 0
+            self._centroids = None
+            self._clustered_at = 0
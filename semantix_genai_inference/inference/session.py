@@ -0,0 +1,348 @@
+import asyncio
+import contextvars
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, Optional
+from .loop import iterate_sync, run_sync
+from .tokens import count_tokens
+from .codec import JSON_HEADERS, dumps, loads
+from .compression import CompressionConfig, compress_body, decompress_response
+from .conversation import Conversation
+from .deadline import DeadlineExceeded, time_left
+from .metrics import RecordedContent, record_usage
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+class SessionConfig:
+    """  Connection pool settings used to build the aiohttp session owned by each client
+
+    Args:
+        limit (int, optional): Maximum number of simultaneous connections in the pool. Defaults to 100
+        limit_per_host (int, optional): Maximum number of simultaneous connections to the same endpoint, 0 means no limit. Defaults to 0
+        keepalive_timeout (float, optional): Seconds an idle connection is kept open to be reused. Defaults to 30
+        dns_cache_ttl (int, optional): Seconds a resolved host is cached, None caches forever. Defaults to 300
+        timeout (float, optional): Total timeout in seconds of a request, None disables it. Defaults to 300
+        connect_timeout (float, optional): Timeout in seconds to acquire a connection and connect to the peer. Defaults to None
+        read_timeout (float, optional): Timeout in seconds between two reads from the peer. Defaults to None
+        compression (CompressionConfig, optional): Compression of the request and response bodies. Defaults to None, the responses are still decompressed by aiohttp
+    """
+
+    def __init__(self, limit: Optional[int] = 100,
+                 limit_per_host: Optional[int] = 0,
+                 keepalive_timeout: Optional[float] = 30,
+                 dns_cache_ttl: Optional[int] = 300,
+                 timeout: Optional[float] = 300,
+                 connect_timeout: Optional[float] = None,
+                 read_timeout: Optional[float] = None,
+                 compression: Optional[CompressionConfig] = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.compression = compression
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a SessionConfig from the `http` section of semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with any of the keys limit, limitPerHost, keepaliveTimeout, dnsCacheTtl, timeout, connectTimeout, readTimeout and compression
+        """
+        config = config or {}
+        keys = {
+            "limit": "limit",
+            "limitPerHost": "limit_per_host",
+            "keepaliveTimeout": "keepalive_timeout",
+            "dnsCacheTtl": "dns_cache_ttl",
+            "timeout": "timeout",
+            "connectTimeout": "connect_timeout",
+            "readTimeout": "read_timeout",
+        }
+        kwargs = {}
+        for key, value in config.items():
+            if key == "compression":
+                kwargs["compression"] = CompressionConfig.from_dict(value) if value else None
+                continue
+            if key not in keys:
+                raise Exception(f"Invalid http configuration key: {key}")
+            kwargs[keys[key]] = value
+        return cls(**kwargs)
+
+    def create_session(self, trace_configs: Optional[list] = None) -> "aiohttp.ClientSession":
+        # imported on first use, it is the slowest import of the package
+        import aiohttp
+        connector = aiohttp.TCPConnector(limit=self.limit,
+                                         limit_per_host=self.limit_per_host,
+                                         keepalive_timeout=self.keepalive_timeout,
+                                         ttl_dns_cache=self.dns_cache_ttl,
+                                         use_dns_cache=True)
+        timeout = aiohttp.ClientTimeout(total=self.timeout,
+                                        sock_connect=self.connect_timeout,
+                                        sock_read=self.read_timeout)
+        # compressed responses are decompressed by the clients, which count the bytes saved
+        auto_decompress = self.compression is None or not self.compression.response
+        return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs,
+                                     auto_decompress=auto_decompress)
+
+
+# set around the calls of the router, so error statuses raise without changing the clients it was given
+_raise_for_status = contextvars.ContextVar("semantix_raise_for_status", default=False)
+
+
+@contextmanager
+def raising_for_status():
+    """ Raise ResponseError on the error statuses of the requests made inside the block, whatever raise_for_status is """
+    token = _raise_for_status.set(True)
+    try:
+        yield
+    finally:
+        _raise_for_status.reset(token)
+
+
+class ResponseError(Exception):
+    """ Error status returned by a provider, raised by the clients that raise instead of returning the error body """
+
+    def __init__(self, status: int, body: str, message: Optional[str] = None):
+        super().__init__(message or f"Request failed with status {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class PooledHttpClient:
+    """ Base class of the inference clients, owns one long-lived aiohttp session per event loop.
+
+    The session is created on first use and kept open so connections are reused across calls,
+    use the client as an (async) context manager or call `aclose()` / `close()` to release it.
+    Sync methods run on a shared background loop, so they reuse the pool too.
+    When a rate limiter is set, requests are paced by it and throttled (429) responses are retried.
+    Error statuses are returned as the response body unless `raise_for_status` is set, or the request is made
+    inside raising_for_status(), then ResponseError is raised.
+    When metrics are set, the timings, sizes, retries and token usage of every request are recorded.
+    When single_flight is set, identical requests in flight at the same time share one upstream request.
+    """
+
+    raise_for_status = False
+
+    def __init__(self, session_config: Optional[SessionConfig] = None, response_cache=None, rate_limiter=None,
+                 metrics=None, single_flight=None):
+        self.session_config = session_config or SessionConfig()
+        self.response_cache = response_cache
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.single_flight = single_flight
+        # aiohttp sessions are bound to the loop they were created on
+        self._sessions = weakref.WeakKeyDictionary()
+        self._sessions_lock = threading.Lock()
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                trace_configs = [self.metrics.trace_config()] if self.metrics is not None else None
+                session = self.session_config.create_session(trace_configs)
+                self._sessions[loop] = session
+        return session
+
+    def _response_cache_key(self, url: str, body: dict, cache: bool = True) -> Optional[str]:
+        if not cache or self.response_cache is None:
+            return None
+        return self.response_cache.key_for(url, body)
+
+    async def _post_json(self, url: str, body: dict, cache_key: Optional[str] = None, response_class=None,
+                         flight: Optional[str] = None):
+        """ Post a request and return its decoded JSON body, or the body as a response_class when it is set
+
+        flight tells apart the requests that must not share the identical ones in flight, such as hedged duplicates.
+        """
+        if cache_key is not None:
+            cached = await self.response_cache.aget(cache_key, response_class)
+            if cached is not None:
+                return cached
+        if self.single_flight is not None:
+            key = self.single_flight.key_for(url, body)
+            if key is not None:
+                if flight is not None:
+                    key = f"{flight}:{key}"
+                if _raise_for_status.get():
+                    # the callers expecting error bodies must not get the error raised for another one
+                    key = f"raise:{key}"
+                return await self.single_flight.call(key, lambda: self._fetch_json(url, body, cache_key, response_class))
+        return await self._fetch_json(url, body, cache_key, response_class)
+
+    async def _fetch_json(self, url: str, body: dict, cache_key: Optional[str], response_class):
+        record = self._start_record(body)
+        async with self._post(url, body, record) as response:
+            raw = await response.read()
+            data = loads(raw) if response_class is None else response_class(raw)
+            if cache_key is not None and response.status < 400:
+                await self.response_cache.aset(cache_key, data)
+            if record is not None:
+                record_usage(record, data)
+            return data
+
+    def _shared_stream(self, url: str, body: dict, kind: str, open_stream):
+        """ The stream returned by open_stream(), shared with the identical streams in flight when single_flight is set
+
+        kind tells apart the streams of the same request parsed differently, such as raw lines and deltas.
+        """
+        if self.single_flight is not None:
+            key = self.single_flight.key_for(url, body)
+            if key is not None:
+                if _raise_for_status.get():
+                    kind = f"raise:{kind}"
+                return self.single_flight.stream(f"{kind}:{key}", open_stream)
+        return open_stream()
+
+    @asynccontextmanager
+    async def _post_stream(self, url: str, body: dict):
+        record = self._start_record(body)
+        async with self._post(url, body, record) as response:
+            if record is not None:
+                response.content = RecordedContent(response.content, record)
+            yield response
+
+    def _start_record(self, body: dict):
+        if self.metrics is None:
+            return None
+        return self.metrics.start(getattr(self, "_type", type(self).__name__), self._model_label(),
+                                  bool(body.get("stream")))
+
+    def _model_label(self) -> Optional[str]:
+        """ Model label of the metrics of this client """
+        return None
+
+    @asynccontextmanager
+    async def _post(self, url: str, body: dict, record=None):
+        session = await self._get_session()
+        limiter = self.rate_limiter
+        tokens = self._request_tokens(body) if limiter is not None else 0
+        # serialized and compressed once, retries send the same bytes
+        payload = dumps(body)
+        headers = {**self.headers, **JSON_HEADERS}
+        compression = self.session_config.compression
+        if compression is not None:
+            size = len(payload)
+            payload, encoding = await compress_body(payload, compression)
+            if encoding is not None:
+                headers["Content-Encoding"] = encoding
+                if record is not None:
+                    record.request_bytes_saved = size - len(payload)
+            if compression.response:
+                headers["Accept-Encoding"] = compression.accept_encoding()
+        attempt = 0
+        try:
+            while True:
+                if limiter is not None:
+                    left = time_left()
+                    if left is None:
+                        await limiter.acquire(tokens)
+                    else:
+                        await asyncio.wait_for(limiter.acquire(tokens), max(left, 0))
+                options = self._request_options()
+                async with session.post(url, data=payload, headers=headers, trace_request_ctx=record,
+                                        **options) as response:
+                    if compression is not None and compression.response:
+                        decompress_response(response, record)
+                    if limiter is not None:
+                        limiter.update_from_headers(response.headers)
+                    if limiter is None or response.status != 429 or attempt >= limiter.config.max_retries:
+                        if record is not None:
+                            record.status = response.status
+                        await self._check_status(response)
+                        yield response
+                        return
+                    # the connection goes back to the pool before waiting
+                    limiter.backoff(attempt, response.headers)
+                attempt += 1
+                if record is not None:
+                    record.retries += 1
+        except Exception as e:
+            error = e
+            if isinstance(e, asyncio.TimeoutError) and not isinstance(e, DeadlineExceeded):
+                left = time_left()
+                # the timeout of aiohttp or of the rate limiter wait was the deadline
+                if left is not None and left <= 0:
+                    error = DeadlineExceeded(f"Deadline exceeded by {-left:.3f}s: {url}")
+            if record is not None:
+                record.error = type(error).__name__
+            if error is not e:
+                raise error from e
+            raise
+        finally:
+            if record is not None:
+                self.metrics.finish(record)
+
+    def _request_options(self) -> dict:
+        """ The timeout of the next attempt when a deadline is set, the remaining time caps the total one """
+        left = time_left()
+        if left is None:
+            return {}
+        if left <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded by {-left:.3f}s")
+        import aiohttp
+        config = self.session_config
+        total = left if config.timeout is None else min(left, config.timeout)
+        return {"timeout": aiohttp.ClientTimeout(total=total, sock_connect=config.connect_timeout,
+                                                 sock_read=config.read_timeout)}
+
+    async def _check_status(self, response) -> None:
+        if (self.raise_for_status or _raise_for_status.get()) and response.status >= 400:
+            raise ResponseError(response.status, await response.text())
+
+    @staticmethod
+    def _request_tokens(body: dict) -> int:
+        """ Estimate the tokens a request counts against the quota: its input plus the tokens it may generate """
+        messages = body.get("messages")
+        if isinstance(messages, Conversation):
+            # the tokens of each message were counted when it was appended
+            return messages.tokens + (body.get("max_tokens") or 0) * (body.get("n") or 1)
+        if messages is not None:
+            text = "".join(str(message.get("content") or "") for message in messages)
+        else:
+            text = body.get("prompt") or body.get("input") or ""
+            if not isinstance(text, str):
+                text = "".join(text)
+        return count_tokens(text) + (body.get("max_tokens") or 0) * (body.get("n") or body.get("num_generations") or 1)
+
+    def _run_sync(self, coro):
+        return run_sync(coro)
+
+    def _iter_sync(self, aiterable, max_buffer: int = 16):
+        return iterate_sync(aiterable, max_buffer)
+
+    async def aclose(self):
+        """ Close the pooled sessions of this client """
+        current = asyncio.get_running_loop()
+        with self._sessions_lock:
+            sessions = list(self._sessions.items())
+            self._sessions.clear()
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            if loop is current:
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+
+    def close(self):
+        """ Close the pooled sessions of this client from sync code """
+        run_sync(self.aclose())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
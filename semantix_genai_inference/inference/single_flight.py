@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from .codec import to_jsonable
+from .deadline import DeadlineExceeded, time_left, without_deadline
+
+
+class SingleFlightStats:
+    """ Counters of a SingleFlight: the upstream requests made and the calls that joined one already in flight """
+    __slots__ = ("leaders", "shared")
+
+    def __init__(self):
+        self.leaders = 0
+        self.shared = 0
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class _Stream:
+    """ The events of an upstream stream, kept so subscribers joining late replay them from the start """
+    __slots__ = ("events", "end", "changed", "subscribers", "task")
+
+    def __init__(self):
+        self.events: List = []
+        self.end: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """  Shares one upstream request among the identical requests in flight at the same time
+
+    A call whose URL and body match a request still in flight awaits its result instead of sending its
+    own, and a stream subscribes to the events of the identical stream, replayed from the start. Nothing
+    is kept once the request completes, unlike a ResponseCache. The callers get the same response object,
+    which must not be modified. The upstream request is cancelled when every caller waiting on it is.
+    It is not bounded by the deadline of any caller, each one stops waiting when its own deadline passes.
+
+    Args:
+        allow_nondeterministic (bool, optional): Also share the requests sampled with a temperature other than 0 or with several choices, the callers then get the same sample. Defaults to False
+    """
+
+    def __init__(self, allow_nondeterministic: Optional[bool] = False):
+        self.allow_nondeterministic = allow_nondeterministic
+        self.stats = SingleFlightStats()
+        # futures are bound to a loop, so are the requests in flight
+        self._calls: Dict[Tuple[asyncio.AbstractEventLoop, str], _Call] = {}
+        self._streams: Dict[Tuple[asyncio.AbstractEventLoop, str], _Stream] = {}
+
+    @classmethod
+    def from_dict(cls, config):
+        """  Build a SingleFlight from the `singleFlight` section of a provider in semantix.yaml
+
+        Args:
+            config (dict, optional): A dict with the key allowNondeterministic, or true
+        """
+        config = config if isinstance(config, dict) else {}
+        kwargs = {}
+        for key, value in config.items():
+            if key != "allowNondeterministic":
+                raise Exception(f"Invalid single flight configuration key: {key}")
+            kwargs["allow_nondeterministic"] = value
+        return cls(**kwargs)
+
+    @staticmethod
+    def is_deterministic(body: dict) -> bool:
+        if "messages" not in body and "prompt" not in body:
+            # embeddings
+            return True
+        return (body.get("temperature") == 0
+                and body.get("n") in (None, 1)
+                and body.get("num_generations") in (None, 1))
+
+    def key_for(self, url: str, body: dict) -> Optional[str]:
+        """ Return the key identifying a request, or None if it must not be shared """
+        if not self.allow_nondeterministic and not self.is_deterministic(body):
+            return None
+        canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=to_jsonable)
+        return hashlib.sha256(f"{url}\0{canonical}".encode("utf-8")).hexdigest()
+
+    async def call(self, key: str, fetch: Callable[[], Awaitable]):
+        """ Return the result of the request of key in flight, or of fetch() which others may then join """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        call = self._calls.get(flight_key)
+        if call is None:
+            # the deadline of the first caller must not bound the request of the others, each one waits within its own
+            call = _Call(without_deadline().run(loop.create_task, fetch()))
+            self._calls[flight_key] = call
+            call.task.add_done_callback(lambda task: self._done(self._calls, flight_key, call))
+            self.stats.leaders += 1
+        else:
+            self.stats.shared += 1
+        call.waiters += 1
+        try:
+            left = time_left()
+            if left is None:
+                return await asyncio.shield(call.task)
+            try:
+                return await asyncio.wait_for(asyncio.shield(call.task), max(left, 0))
+            except asyncio.TimeoutError as e:
+                if isinstance(e, DeadlineExceeded) or time_left() > 0:
+                    # a timeout of the request itself
+                    raise
+                # the request goes on for the callers with more time
+                raise DeadlineExceeded(f"Deadline exceeded waiting for a shared request: {key}") from e
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # identical requests from now on start a new flight instead of joining the cancelled one
+                self._forget(self._calls, flight_key, call)
+                call.task.cancel()
+
+    async def stream(self, key: str, open_stream: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """ Yield the events of the stream of key in flight, or of open_stream() which others may then subscribe to """
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        flight = self._streams.get(flight_key)
+        if flight is None:
+            flight = _Stream()
+            flight.task = without_deadline().run(loop.create_task, self._pump(flight, open_stream()))
+            self._streams[flight_key] = flight
+            flight.task.add_done_callback(lambda task: self._done(self._streams, flight_key, flight))
+            self.stats.leaders += 1
+        else:
+            self.stats.shared += 1
+        flight.subscribers += 1
+        try:
+            position = 0
+            while True:
+                if position < len(flight.events):
+                    position += 1
+                    yield flight.events[position - 1]
+                elif flight.end is not None:
+                    if isinstance(flight.end, StopAsyncIteration):
+                        return
+                    raise flight.end
+                else:
+                    await self._wait_within_deadline(flight.changed.wait(), key)
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.task.done():
+                # nobody reads the stream anymore, closing it closes the connection
+                self._forget(self._streams, flight_key, flight)
+                flight.task.cancel()
+
+    @staticmethod
+    async def _wait_within_deadline(waiting: Awaitable, key: str) -> None:
+        left = time_left()
+        if left is None:
+            return await waiting
+        try:
+            await asyncio.wait_for(waiting, max(left, 0))
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded(f"Deadline exceeded reading a shared stream: {key}") from e
+
+    @staticmethod
+    async def _pump(flight: _Stream, events: AsyncIterator) -> None:
+        try:
+            async for event in events:
+                flight.events.append(event)
+                flight.notify()
+            flight.end = StopAsyncIteration()
+        except asyncio.CancelledError as e:
+            # the stream was cut, it must not look complete
+            flight.end = e
+            raise
+        except Exception as e:
+            flight.end = e
+        finally:
+            aclose = getattr(events, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            flight.notify()
+
+    @staticmethod
+    def _forget(flights: dict, flight_key, flight) -> None:
+        # a later identical request starts a new flight
+        if flights.get(flight_key) is flight:
+            del flights[flight_key]
+
+    @classmethod
+    def _done(cls, flights: dict, flight_key, flight) -> None:
+        cls._forget(flights, flight_key, flight)
+        task = flight.task
+        if not task.cancelled():
+            # retrieved, so an error nobody awaited anymore is not reported as never retrieved
+            task.exception()
@@ -0,0 +1,471 @@
+import asyncio
+import re
+from typing import AsyncIterator, Callable, Dict, List, Optional, Pattern, Union
+from .codec import loads
+
+
+class SSEParser:
+    """ Incremental Server-Sent Events parser, frames may be split anywhere across the fed chunks """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data = []
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """ Consume a chunk of the stream and return the data of the events it completed """
+        self._buffer.extend(chunk)
+        end = self._buffer.rfind(b"\n")
+        if end < 0:
+            return []
+        lines = bytes(self._buffer[:end]).split(b"\n")
+        del self._buffer[:end + 1]
+        events = []
+        for line in lines:
+            if line.endswith(b"\r"):
+                line = line[:-1]
+            if not line:
+                # a blank line dispatches the event
+                if self._data:
+                    events.append("\n".join(self._data))
+                    self._data = []
+                continue
+            if line[0] == 0x3A:
+                # comment line, used as keep-alive
+                continue
+            field, _, value = line.partition(b":")
+            if field == b"data":
+                if value[:1] == b" ":
+                    value = value[1:]
+                self._data.append(value.decode("utf-8"))
+        return events
+
+    def close(self) -> List[str]:
+        """ Flush the event left when the stream ends without a trailing blank line """
+        events = self.feed(b"\n\n") if self._buffer else []
+        if self._data:
+            events.append("\n".join(self._data))
+            self._data = []
+        return events
+
+
+class NDJSONParser:
+    """ Incremental newline delimited JSON parser, objects may be split anywhere across the fed chunks """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        self._buffer.extend(chunk)
+        end = self._buffer.rfind(b"\n")
+        if end < 0:
+            return []
+        lines = bytes(self._buffer[:end]).split(b"\n")
+        del self._buffer[:end + 1]
+        return [loads(line) for line in lines if line.strip()]
+
+    def close(self) -> List[dict]:
+        return self.feed(b"\n") if self._buffer else []
+
+
+class FunctionCallDelta:
+    __slots__ = ("name", "arguments")
+
+    def __init__(self, name: Optional[str] = None, arguments: Optional[str] = None):
+        self.name = name
+        self.arguments = arguments
+
+    def __repr__(self):
+        return f"FunctionCallDelta(name={self.name!r}, arguments={self.arguments!r})"
+
+
+class ChoiceDelta:
+    __slots__ = ("index", "role", "content", "function_call", "finish_reason")
+
+    def __init__(self, index: int, role: Optional[str] = None, content: Optional[str] = None,
+                 function_call: Optional[FunctionCallDelta] = None, finish_reason: Optional[str] = None):
+        self.index = index
+        self.role = role
+        self.content = content
+        self.function_call = function_call
+        self.finish_reason = finish_reason
+
+    def __repr__(self):
+        return (f"ChoiceDelta(index={self.index}, role={self.role!r}, content={self.content!r}, "
+                f"function_call={self.function_call!r}, finish_reason={self.finish_reason!r})")
+
+
+class ChatCompletionDelta:
+    """ One chunk of a streamed chat completion """
+    __slots__ = ("id", "model", "created", "choices")
+
+    def __init__(self, id: Optional[str], model: Optional[str], created: Optional[int], choices: List[ChoiceDelta]):
+        self.id = id
+        self.model = model
+        self.created = created
+        self.choices = choices
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        choices = []
+        for choice in data.get("choices") or ():
+            delta = choice.get("delta") or {}
+            function_call = delta.get("function_call")
+            if function_call is not None:
+                function_call = FunctionCallDelta(function_call.get("name"), function_call.get("arguments"))
+            choices.append(ChoiceDelta(choice.get("index", 0), delta.get("role"), delta.get("content"),
+                                       function_call, choice.get("finish_reason")))
+        return cls(data.get("id"), data.get("model"), data.get("created"), choices)
+
+    @property
+    def content(self) -> Optional[str]:
+        """ Content of the first choice """
+        return self.choices[0].content if self.choices else None
+
+    def __repr__(self):
+        return f"ChatCompletionDelta(id={self.id!r}, model={self.model!r}, choices={self.choices!r})"
+
+
+class _ChoiceState:
+    __slots__ = ("role", "content", "function_name", "function_arguments", "finish_reason")
+
+    def __init__(self):
+        self.role = None
+        self.content = []
+        self.function_name = []
+        self.function_arguments = []
+        self.finish_reason = None
+
+
+class ChatStreamAccumulator:
+    """ Rebuilds the final messages of a streamed chat completion, fragments are joined once at the end """
+
+    def __init__(self):
+        self._choices: Dict[int, _ChoiceState] = {}
+
+    def add(self, delta: ChatCompletionDelta) -> None:
+        for choice in delta.choices:
+            state = self._choices.get(choice.index)
+            if state is None:
+                state = self._choices[choice.index] = _ChoiceState()
+            if choice.role is not None:
+                state.role = choice.role
+            if choice.content:
+                state.content.append(choice.content)
+            if choice.function_call is not None:
+                if choice.function_call.name:
+                    state.function_name.append(choice.function_call.name)
+                if choice.function_call.arguments:
+                    state.function_arguments.append(choice.function_call.arguments)
+            if choice.finish_reason is not None:
+                state.finish_reason = choice.finish_reason
+
+    def choices(self) -> List[dict]:
+        """ Return the accumulated choices in the format of a non streamed chat completion """
+        choices = []
+        for index in sorted(self._choices):
+            state = self._choices[index]
+            message = {"role": state.role or "assistant",
+                       "content": "".join(state.content) if state.content else None}
+            if state.function_name or state.function_arguments:
+                message["function_call"] = {"name": "".join(state.function_name),
+                                            "arguments": "".join(state.function_arguments)}
+            choices.append({"index": index, "message": message, "finish_reason": state.finish_reason})
+        return choices
+
+    def message(self, index: int = 0) -> dict:
+        for choice in self.choices():
+            if choice["index"] == index:
+                return choice["message"]
+        raise KeyError(f"No choice with index {index} in the stream.")
+
+
+class GenerationDelta:
+    """ One event of a streamed Cohere generation """
+    __slots__ = ("text", "index", "is_finished", "finish_reason", "response")
+
+    def __init__(self, text: Optional[str], index: int = 0, is_finished: bool = False,
+                 finish_reason: Optional[str] = None, response: Optional[dict] = None):
+        self.text = text
+        self.index = index
+        self.is_finished = is_finished
+        self.finish_reason = finish_reason
+        self.response = response
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data.get("text"), data.get("index", 0), data.get("is_finished", False),
+                   data.get("finish_reason"), data.get("response"))
+
+    def __repr__(self):
+        return (f"GenerationDelta(text={self.text!r}, index={self.index}, is_finished={self.is_finished}, "
+                f"finish_reason={self.finish_reason!r})")
+
+
+async def iter_generation_deltas(content) -> AsyncIterator[GenerationDelta]:
+    """ Parse the newline delimited JSON body of a streamed Cohere generation into GenerationDelta objects """
+    parser = NDJSONParser()
+    async for chunk in content.iter_any():
+        for event in parser.feed(chunk):
+            yield GenerationDelta.from_dict(event)
+    for event in parser.close():
+        yield GenerationDelta.from_dict(event)
+
+
+async def iter_chat_deltas(content) -> AsyncIterator[ChatCompletionDelta]:
+    """ Parse the body of a streamed chat completion into ChatCompletionDelta objects """
+    parser = SSEParser()
+    async for chunk in content.iter_any():
+        for data in parser.feed(chunk):
+            if data == "[DONE]":
+                return
+            yield ChatCompletionDelta.from_dict(loads(data))
+    for data in parser.close():
+        if data == "[DONE]":
+            return
+        yield ChatCompletionDelta.from_dict(loads(data))
+
+
+async def accumulate(deltas: AsyncIterator[ChatCompletionDelta]) -> List[dict]:
+    """ Consume a delta stream and return the final choices """
+    accumulator = ChatStreamAccumulator()
+    async for delta in deltas:
+        accumulator.add(delta)
+    return accumulator.choices()
+
+
+class StoppableStream:
+    """  Stops a stream of ChatCompletionDelta or GenerationDelta objects on the client side as soon as the text of a choice meets a condition
+
+    The upstream stream is closed right away, which closes its connection and stops the generation
+    on the server. The delta that met the condition is yielded cut to the condition, then the iteration
+    ends, and the stream reports what was cut. With n > 1, the first choice meeting a condition stops
+    the whole stream.
+
+    Stop strings and max_chars only look at the end of the text each delta completes, so their cost does
+    not grow with the text. A pattern is searched in the whole text on every delta unless pattern_window
+    bounds how far before the delta its match may start, and a predicate is called with the whole text.
+
+        stream = StoppableStream(client.generate_stream_deltas(messages), max_chars=2000, stop="</answer>")
+        async for delta in stream:
+            print(delta.content or "", end="")
+        print(stream.stop_reason, repr(stream.cut))
+
+    Args:
+        deltas (AsyncIterator): The upstream stream, such as generate_stream_deltas
+        max_chars (int, optional): Stop once a choice has this many characters, the text past them is cut
+        stop (Union[str, List[str]], optional): Stop at the first of these strings in the text of a choice, the string and the text after it are cut
+        pattern (Union[str, Pattern], optional): Stop at the first match in the text of a choice, the match and the text after it are cut
+        pattern_window (int, optional): How many characters before each delta a match of the pattern may start, None to search the whole text
+        predicate (Callable[[str], bool], optional): Stop once it returns True for the text of a choice received so far, nothing is cut
+    """
+
+    def __init__(self, deltas: AsyncIterator, max_chars: Optional[int] = None,
+                 pattern: Optional[Union[str, Pattern]] = None, predicate: Optional[Callable[[str], bool]] = None,
+                 stop: Optional[Union[str, List[str]]] = None, pattern_window: Optional[int] = None):
+        self._deltas = deltas
+        self.max_chars = max_chars
+        self.stop = [stop] if isinstance(stop, str) else list(stop or ())
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.pattern_window = pattern_window
+        self.predicate = predicate
+        # how much of the text before a delta the conditions look at, None for all of it
+        if predicate is not None or (self.pattern is not None and pattern_window is None):
+            self._lookback = None
+        else:
+            self._lookback = max([len(stop) - 1 for stop in self.stop] +
+                                 [pattern_window if self.pattern is not None else 0] + [0])
+        self._pieces: Dict[int, List[str]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._tails: Dict[int, str] = {}
+        self._done = False
+        # the report, set when a condition stops the stream
+        self.stop_reason: Optional[str] = None
+        self.stop_index: Optional[int] = None
+        self.cut = ""
+
+    def text(self, index: int = 0) -> str:
+        """ The text of a choice yielded so far """
+        return "".join(self._pieces.get(index, ()))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._done:
+            raise StopAsyncIteration
+        try:
+            delta = await self._deltas.__anext__()
+        except StopAsyncIteration:
+            self._done = True
+            raise
+        chat = isinstance(delta, ChatCompletionDelta)
+        for position, part in enumerate(delta.choices if chat else (delta,)):
+            piece = part.content if chat else part.text
+            if not piece:
+                continue
+            before = self._lengths.get(part.index, 0)
+            tail = self._tails.get(part.index, "") + piece
+            # where the tail starts in the text of the choice
+            offset = before + len(piece) - len(tail)
+            end, reason = self._check(tail, offset, len(piece))
+            if reason is None:
+                self._append(part.index, piece, tail)
+                continue
+            # a match may start in text yielded before, which is cut from the text but was already yielded
+            kept = piece[:max(end - before, 0)]
+            self._append(part.index, kept, tail[:end - offset])
+            self.stop_reason, self.stop_index, self.cut = reason, part.index, tail[end - offset:]
+            await self.aclose()
+            # the deltas may be shared with other readers, the cut one is a copy
+            if not chat:
+                return GenerationDelta(kept, part.index, True, "stop", part.response)
+            cut = ChoiceDelta(part.index, part.role, kept, part.function_call, "stop")
+            return ChatCompletionDelta(delta.id, delta.model, delta.created, delta.choices[:position] + [cut])
+        return delta
+
+    def _append(self, index: int, piece: str, tail: str) -> None:
+        self._pieces.setdefault(index, []).append(piece)
+        self._lengths[index] = self._lengths.get(index, 0) + len(piece)
+        if self._lookback is not None:
+            tail = tail[max(len(tail) - self._lookback, 0):] if self._lookback else ""
+        self._tails[index] = tail
+
+    def _check(self, tail: str, offset: int, new: int):
+        """ Where to cut the text and why, a None reason when no condition is met
+
+        Args:
+            tail (str): The end of the text of the choice, the new piece and the lookback before it
+            offset (int): Where the tail starts in the text
+            new (int): How many characters of the tail are new
+        """
+        starts = []
+        for stop in self.stop:
+            # a stop string ending in the new piece starts at most len(stop) - 1 characters before it
+            start = tail.find(stop, max(len(tail) - new - len(stop) + 1, 0))
+            if start >= 0:
+                starts.append((offset + start, "stop"))
+        if self.pattern is not None:
+            window = 0 if self.pattern_window is None else max(len(tail) - new - self.pattern_window, 0)
+            match = self.pattern.search(tail, window)
+            if match is not None:
+                starts.append((offset + match.start(), "pattern"))
+        if starts:
+            start, reason = min(starts)
+            if self.max_chars is None or start <= self.max_chars:
+                return start, reason
+        length = offset + len(tail)
+        if self.max_chars is not None and length >= self.max_chars:
+            return self.max_chars, "max_chars"
+        if self.predicate is not None and self.predicate(tail):
+            return length, "predicate"
+        return length, None
+
+    async def aclose(self) -> None:
+        """ Close the upstream stream, and its connection with it """
+        self._done = True
+        aclose = getattr(self._deltas, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+# wakes up a consumer waiting on an empty buffer when the stream ends
+_WAKE = object()
+
+
+class ChoiceStream:
+    """ Async iterator over the ChoiceDelta objects of one choice of a ChoiceStreams """
+
+    def __init__(self, index: int, max_buffer: int):
+        self.index = index
+        self._buffer = asyncio.Queue(max_buffer)
+        self._end = None
+        self._closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChoiceDelta:
+        if self._closed:
+            raise StopAsyncIteration
+        if self._buffer.empty() and self._end is not None:
+            return self._finish()
+        item = await self._buffer.get()
+        if item is _WAKE:
+            return self._finish()
+        return item
+
+    def _finish(self):
+        self._closed = True
+        raise self._end
+
+    def _push_end(self, end) -> None:
+        self._end = end
+        if not self._buffer.full():
+            self._buffer.put_nowait(_WAKE)
+
+    def aclose(self) -> None:
+        """ Stop reading this choice, its deltas are dropped from then on so the other choices are not held back """
+        self._closed = True
+        while not self._buffer.empty():
+            self._buffer.get_nowait()
+
+
+class ChoiceStreams:
+    """  Splits a chat completion stream with n choices into one ChoiceStream per choice index
+
+    A single task reads the upstream connection and routes each choice delta to the buffer of its choice.
+    When a buffer is full the task waits, which stops reading the connection, so the slowest consumer sets
+    the pace and memory stays bounded. The choices must therefore be consumed concurrently, for example
+    one task each, or closed with ChoiceStream.aclose. Errors of the upstream stream are raised by every
+    choice. Use it as an async context manager, leaving it closes the upstream stream:
+
+        async with client.generate_stream_choices(messages, n=3) as choices:
+            await asyncio.gather(*(render(choice) for choice in choices))
+
+    Args:
+        deltas (AsyncIterator[ChatCompletionDelta]): The upstream stream, such as generate_stream_deltas
+        n (int): The number of choices
+        max_buffer (int, optional): Maximum number of deltas buffered per choice, 0 is unbounded. Defaults to 64
+    """
+
+    def __init__(self, deltas: AsyncIterator[ChatCompletionDelta], n: int, max_buffer: Optional[int] = 64):
+        self._deltas = deltas
+        self.choices = [ChoiceStream(i, max_buffer) for i in range(n)]
+        self._task = None
+
+    async def _pump(self) -> None:
+        end = StopAsyncIteration()
+        try:
+            async for delta in self._deltas:
+                for choice in delta.choices:
+                    if choice.index < len(self.choices):
+                        stream = self.choices[choice.index]
+                        if not stream._closed:
+                            await stream._buffer.put(choice)
+        except Exception as e:
+            end = e
+        finally:
+            for stream in self.choices:
+                stream._push_end(end)
+
+    def start(self) -> List[ChoiceStream]:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._pump())
+        return self.choices
+
+    async def aclose(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        aclose = getattr(self._deltas, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    async def __aenter__(self) -> List[ChoiceStream]:
+        return self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
@@ -0,0 +1,180 @@
+import json
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
+
+# context window of each model family, looked up by the longest prefix of the model or deployment name
+CONTEXT_WINDOWS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-vision": 128000,
+    "gpt-4o": 128000,
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-3.5-turbo-1106": 16385,
+    "gpt-3.5-turbo-0125": 16385,
+    "gpt-35-turbo": 4096,
+    "gpt-35-turbo-16k": 16384,
+    "command": 4096,
+    "command-light": 4096,
+    "text-embedding-ada-002": 8191,
+}
+
+# tokens added by the chat format around each message and before the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_TOKENS = 3
+
+OVERFLOW_MODES = ("error", "truncate")
+
+# approximates the pre-tokenization of BPE tokenizers: words with their leading space, groups of up to
+# three digits, and every other non blank character on its own
+_PIECES = re.compile(r" ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]|\s+")
+
+
+class ContextWindowExceeded(Exception):
+    """ Raised before sending a prompt that does not leave room for the completion in the context window """
+
+    def __init__(self, prompt_tokens: int, context_window: int, max_tokens: Optional[int]):
+        super().__init__(f"The prompt has about {prompt_tokens} tokens and the completion {max_tokens or 0}, "
+                         f"over the context window of {context_window} tokens.")
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+        self.max_tokens = max_tokens
+
+
+def _count(text: str) -> int:
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        length = len(piece) - (piece[0] == " ")
+        # short words are a single token, longer ones are split in pieces of about four letters
+        tokens += 1 if length <= 6 or not piece[-1].isalpha() else -(-length // 4)
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def _count_cached(text: str) -> int:
+    return _count(text)
+
+
+def count_tokens(text: str) -> int:
+    """ Estimate the number of tokens of a text offline, erring on the high side for english text.
+
+    Results are cached per string, so the messages repeated across the turns of a conversation are counted once.
+    """
+    if not text:
+        return 0
+    # huge strings are rarely repeated and would pin a lot of memory in the cache
+    if len(text) > 100000:
+        return _count(text)
+    return _count_cached(text)
+
+
+def count_message_tokens(messages: List[dict]) -> int:
+    """ Estimate the prompt tokens of a chat completion request, including the chat format overhead """
+    tokens = REPLY_TOKENS
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        for key, value in message.items():
+            if value is None:
+                continue
+            if not isinstance(value, str):
+                value = json.dumps(value, separators=(",", ":"))
+            tokens += count_tokens(value)
+            if key == "name":
+                tokens += TOKENS_PER_NAME
+    return tokens
+
+
+def context_window(model: Optional[str]) -> Optional[int]:
+    """ Return the context window of a model or deployment name, None when it is unknown """
+    if not model:
+        return None
+    best = None
+    for prefix, size in CONTEXT_WINDOWS.items():
+        if model.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, size)
+    return best[1] if best else None
+
+
+def _reserved(max_tokens: Optional[Union[int, str]]) -> int:
+    return max_tokens if isinstance(max_tokens, int) else 1
+
+
+def fit_messages(messages: List[dict], window: int, max_tokens: Optional[Union[int, str]],
+                 overflow: Optional[str], message_tokens: Optional[List[int]] = None) -> Tuple[List[dict], Optional[int]]:
+    """  Check a chat prompt against the context window before it is sent
+
+    Args:
+        messages (List[dict]): The messages of the request
+        window (int): The context window of the model
+        max_tokens (Union[int, str], optional): The completion tokens requested, "auto" uses what the prompt leaves
+        overflow (str, optional): error raises ContextWindowExceeded for a prompt that does not fit, truncate drops the oldest messages after the system ones until it fits, None sends it as is
+        message_tokens (List[int], optional): The tokens of each message, format overhead included, when they are already known
+
+    Returns:
+        The messages to send and the resolved max_tokens
+    """
+    if message_tokens is None:
+        prompt_tokens = count_message_tokens(messages)
+    else:
+        prompt_tokens = REPLY_TOKENS + sum(message_tokens)
+    reserved = _reserved(max_tokens)
+    if overflow is not None and prompt_tokens + reserved > window:
+        if overflow != "truncate":
+            raise ContextWindowExceeded(prompt_tokens, window, reserved)
+        system = 0
+        while system < len(messages) - 1 and messages[system].get("role") == "system":
+            system += 1
+        kept = list(messages)
+        counts = list(message_tokens) if message_tokens is not None else None
+        # the system prompt and the last message are always kept
+        while prompt_tokens + reserved > window and len(kept) > system + 1:
+            dropped = kept.pop(system)
+            prompt_tokens -= counts.pop(system) if counts is not None else count_message_tokens([dropped]) - REPLY_TOKENS
+        if prompt_tokens + reserved > window:
+            raise ContextWindowExceeded(prompt_tokens, window, reserved)
+        messages = kept
+    if max_tokens == "auto":
+        max_tokens = window - prompt_tokens
+        if max_tokens <= 0:
+            raise ContextWindowExceeded(prompt_tokens, window, None)
+    return messages, max_tokens
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """ Keep the end of a text that fits in max_tokens """
+    if count_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    # smallest start offset whose suffix fits
+    while low < high:
+        middle = (low + high) // 2
+        if _count(text[middle:]) <= max_tokens:
+            high = middle
+        else:
+            low = middle + 1
+    return text[low:]
+
+
+def fit_prompt(prompt: str, window: int, max_tokens: Optional[Union[int, str]],
+               overflow: Optional[str]) -> Tuple[str, Optional[int]]:
+    """  Check a completion prompt against the context window before it is sent, takes the arguments of fit_messages
+
+    truncate keeps the end of the prompt, the text closest to the completion.
+    """
+    prompt_tokens = count_tokens(prompt)
+    reserved = _reserved(max_tokens)
+    if overflow is not None and prompt_tokens + reserved > window:
+        if overflow != "truncate" or reserved >= window:
+            raise ContextWindowExceeded(prompt_tokens, window, reserved)
+        prompt = truncate_text(prompt, window - reserved)
+        prompt_tokens = count_tokens(prompt)
+    if max_tokens == "auto":
+        max_tokens = window - prompt_tokens
+        if max_tokens <= 0:
+            raise ContextWindowExceeded(prompt_tokens, window, None)
+    return prompt, max_tokens
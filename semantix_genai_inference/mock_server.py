@@ -0,0 +1,261 @@
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from typing import Optional
+from aiohttp import web
+from semantix_genai_inference.inference.tokens import count_message_tokens, count_tokens
+
+WORDS = ("the", "model", "answered", "with", "a", "short", "story", "about", "semantix", "and", "its", "clients")
+
+
+class MockConfig:
+    """  Behaviour of a MockServer
+
+    Args:
+        latency (float, optional): Seconds before the response headers are sent. Defaults to 0
+        jitter (float, optional): Maximum seconds added to or removed from the latency at random. Defaults to 0
+        chunk_delay (float, optional): Seconds between the chunks of a streamed response. Defaults to 0
+        tokens (int, optional): Words of each completion, max_tokens lowers it. Defaults to 16
+        throttle_rate (float, optional): Fraction of requests answered with 429. Defaults to 0
+        error_rate (float, optional): Fraction of requests answered with 500. Defaults to 0
+        retry_after (float, optional): Seconds sent in the retry-after-ms header of throttled responses. Defaults to 0.05
+        embedding_size (int, optional): Dimensions of the embeddings. Defaults to 1536
+        compress (bool, optional): Compress the responses that are not streamed when the client accepts it. Defaults to False
+        seed (int, optional): Seed of the latency jitter and of the faults, for reproducible runs
+    """
+
+    def __init__(self, latency: Optional[float] = 0.0, jitter: Optional[float] = 0.0, chunk_delay: Optional[float] = 0.0,
+                 tokens: Optional[int] = 16, throttle_rate: Optional[float] = 0.0, error_rate: Optional[float] = 0.0,
+                 retry_after: Optional[float] = 0.05, embedding_size: Optional[int] = 1536,
+                 compress: Optional[bool] = False, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.tokens = tokens
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.embedding_size = embedding_size
+        self.compress = compress
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, config: Optional[dict]):
+        """  Build a MockConfig from a dict with the keys latency, jitter, chunkDelay, tokens, throttleRate, errorRate, retryAfter, embeddingSize, compress and seed """
+        config = config or {}
+        keys = {
+            "latency": "latency",
+            "jitter": "jitter",
+            "chunkDelay": "chunk_delay",
+            "tokens": "tokens",
+            "throttleRate": "throttle_rate",
+            "errorRate": "error_rate",
+            "retryAfter": "retry_after",
+            "embeddingSize": "embedding_size",
+            "compress": "compress",
+            "seed": "seed",
+        }
+        kwargs = {}
+        for key, value in config.items():
+            if key not in keys:
+                raise Exception(f"Invalid mock server configuration key: {key}")
+            kwargs[keys[key]] = value
+        return cls(**kwargs)
+
+
+class MockServer:
+    """ Stand-in for the Semantix Hub, Cohere, OpenAI and Azure OpenAI APIs, served offline from a background thread.
+
+    Completions are made of canned words and embeddings are derived from a hash of their input, so responses
+    are cheap to produce and the server is rarely the bottleneck of a benchmark. Every request waits for the
+    configured latency, then may be throttled or failed, and streamed responses send one chunk per word.
+
+    Routes:
+        POST /{version}/inference: Semantix Hub inference servers, alpaca and llama2
+        POST /v1/generate: Cohere generate, streamed as newline delimited JSON
+        POST /v1/chat/completions and /v1/embeddings: OpenAI
+        POST /openai/deployments/{deployment}/chat/completions and /embeddings: Azure OpenAI
+
+    Args:
+        config (MockConfig, optional): Latency, faults and response sizes
+        host (str, optional): Interface to listen on. Defaults to 127.0.0.1
+        port (int, optional): Port to listen on, 0 picks a free one. Defaults to 0
+        app (web.Application, optional): Application served instead of the mock APIs, such as the handlers of a test. Defaults to None
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: Optional[str] = "127.0.0.1", port: Optional[int] = 0,
+                 app: Optional[web.Application] = None):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self._app = app
+        self.url = None
+        self.requests = 0
+        self._random = random.Random(self.config.seed)
+        self._loop = None
+        self._thread = None
+        self._runner = None
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._compress] if self.config.compress else [])
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        app.router.add_post("/v1/generate", self._generate)
+        app.router.add_post("/openai/deployments/{deployment}/chat/completions", self._chat_completions)
+        app.router.add_post("/openai/deployments/{deployment}/embeddings", self._embeddings)
+        app.router.add_post("/{version}/inference", self._inference)
+        return app
+
+    @web.middleware
+    async def _compress(self, request: web.Request, handler) -> web.StreamResponse:
+        response = await handler(request)
+        # streams are left uncompressed, aiohttp would hold their chunks back in the compressor
+        if not response.prepared:
+            response.enable_compression()
+        return response
+
+    async def start(self) -> str:
+        """ Serve on the running event loop and return the base url of the server """
+        self._runner = web.AppRunner(self._app if self._app is not None else self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{self.host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def __enter__(self):
+        # a loop of its own keeps the server from competing with the clients under test
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="semantix-mock-server", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.start(), self._loop).result()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _begin(self) -> Optional[web.Response]:
+        """ Wait for the latency of a request, then return the fault response it gets, if any """
+        self.requests += 1
+        config = self.config
+        delay = config.latency
+        if config.jitter:
+            delay += self._random.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < config.throttle_rate:
+            return web.json_response({"error": {"message": "Rate limit reached.", "type": "requests"}}, status=429,
+                                     headers={"retry-after-ms": str(int(config.retry_after * 1000))})
+        if roll < config.throttle_rate + config.error_rate:
+            return web.json_response({"error": {"message": "The server had an error.", "type": "server_error"}},
+                                     status=500)
+        return None
+
+    def _words(self, max_tokens) -> list:
+        count = self.config.tokens
+        if isinstance(max_tokens, int) and max_tokens > 0:
+            count = min(count, max_tokens)
+        return [("" if i == 0 else " ") + WORDS[i % len(WORDS)] for i in range(count)]
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        fault = await self._begin()
+        if fault is not None:
+            return fault
+        words = self._words(body.get("max_tokens"))
+        n = body.get("n") or 1
+        model = body.get("model") or request.match_info.get("deployment")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if not body.get("stream"):
+            prompt_tokens = count_message_tokens(body.get("messages") or [])
+            return web.json_response({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": i, "message": {"role": "assistant", "content": "".join(words)},
+                             "finish_reason": "stop"} for i in range(n)],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(words) * n,
+                          "total_tokens": prompt_tokens + len(words) * n},
+            })
+
+        def event(index, delta, finish_reason=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                     "choices": [{"index": index, "delta": delta, "finish_reason": finish_reason}]}
+            return b"data: " + json.dumps(chunk).encode() + b"\n\n"
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b"".join(event(i, {"role": "assistant", "content": ""}) for i in range(n)))
+        for word in words:
+            if self.config.chunk_delay:
+                await asyncio.sleep(self.config.chunk_delay)
+            await response.write(b"".join(event(i, {"content": word}) for i in range(n)))
+        await response.write(b"".join(event(i, {}, "stop") for i in range(n)) + b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        fault = await self._begin()
+        if fault is not None:
+            return fault
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        data = [{"object": "embedding", "index": i, "embedding": self._embedding(text)} for i, text in enumerate(inputs)]
+        tokens = sum(count_tokens(text) for text in inputs)
+        return web.json_response({"object": "list", "data": data, "model": body.get("model"),
+                                  "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def _embedding(self, text: str) -> list:
+        # the same text always gets the same vector
+        generator = random.Random(zlib.crc32(text.encode()))
+        return [round(generator.uniform(-1, 1), 6) for _ in range(self.config.embedding_size)]
+
+    async def _generate(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        fault = await self._begin()
+        if fault is not None:
+            return fault
+        words = self._words(body.get("max_tokens"))
+        result = {
+            "id": str(uuid.uuid4()),
+            "generations": [{"id": str(uuid.uuid4()), "text": "".join(words)}
+                            for _ in range(body.get("num_generations") or 1)],
+            "prompt": body.get("prompt"),
+            "meta": {"billed_units": {"input_tokens": count_tokens(body.get("prompt") or ""),
+                                      "output_tokens": len(words)}},
+        }
+        if not body.get("stream"):
+            return web.json_response(result)
+        response = web.StreamResponse(headers={"Content-Type": "application/stream+json"})
+        await response.prepare(request)
+        for word in words:
+            if self.config.chunk_delay:
+                await asyncio.sleep(self.config.chunk_delay)
+            await response.write(json.dumps({"text": word, "is_finished": False}).encode() + b"\n")
+        final = {"is_finished": True, "finish_reason": "COMPLETE", "response": result}
+        await response.write(json.dumps(final).encode() + b"\n")
+        await response.write_eof()
+        return response
+
+    async def _inference(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        fault = await self._begin()
+        if fault is not None:
+            return fault
+        words = self._words(body.get("max_new_tokens"))
+        return web.json_response({"generated_text": [prompt + " " + "".join(words) for prompt in body.get("prompt") or []]})
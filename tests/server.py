@@ -0,0 +1,9 @@
+from aiohttp import web
+from semantix_genai_inference.mock_server import MockServer
+
+
+class LocalServer(MockServer):
+    """ Serves the aiohttp application of a test from the background thread of a MockServer """
+
+    def __init__(self, app: web.Application):
+        super().__init__(app=app)
@@ -1,22 +1,33 @@
 import asyncio
-from semantix_genai_inference import ModelClient
+from semantix_genai_inference.inference.llm.azure_openai import AzureOpenAIInferenceClient
+from semantix_genai_inference.inference.streaming import accumulate
+from semantix_genai_inference.mock_server import MockConfig, MockServer
 
-class OpenAIInferenceClientTests:
+
+class TestAzureOpenAIInferenceClient:
 
     def test_generate_async_with_streaming(self):
-        client = ModelClient.create("azure-openai")
         prompt = [{"role": "user", "content": "Once upon a time"}]
         temperature = 0.5
         top_p = 1.0
-        n = 1
+        n = 2
         presence_penalty = 0.0
         frequency_penalty = 0.0
-        async def test():
-            async for line in client.generate_stream(prompt, temperature=temperature, top_p=top_p, n=n,
-                                                presence_penalty=presence_penalty, frequency_penalty=frequency_penalty):
-                print(line)
-        asyncio.run(test())
+        with MockServer(MockConfig(tokens=4)) as server:
+            async def test():
+                async with AzureOpenAIInferenceClient(server.url, "gpt-35-turbo", "2023-05-15", api_key="test") as client:
+                    return await accumulate(client.generate_stream_deltas(prompt, temperature=temperature, top_p=top_p, n=n,
+                                                presence_penalty=presence_penalty, frequency_penalty=frequency_penalty))
+            choices = asyncio.run(test())
+        assert [choice["message"]["content"] for choice in choices] == ["the model answered with"] * 2
 
-if __name__ == "__main__":
-    OpenAIInferenceClientTests().test_generate_async_with_streaming()
-    print("Done!")
\ No newline at end of file
+    def test_embeddings(self):
+        with MockServer(MockConfig(embedding_size=8)) as server:
+            async def test():
+                async with AzureOpenAIInferenceClient(server.url, "text-embedding-ada-002", "2023-05-15",
+                                                      api_key="test") as client:
+                    return await client.aembeddings(["a", "b", "a"])
+            response = asyncio.run(test())
+        vectors = [item["embedding"] for item in response["data"]]
+        assert len(vectors) == 3 and len(vectors[0]) == 8
+        assert vectors[0] == vectors[2] != vectors[1]
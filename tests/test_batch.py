@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+from semantix_genai_inference.batch import BatchCheckpoint, run_batch
+
+
+class FakeClient:
+    def __init__(self, interrupt_at=None, recovered=False):
+        self.calls = []
+        self.interrupt_at = interrupt_at
+        self.recovered = recovered
+        self.run_task = None
+
+    async def agenerate(self, prompt, temperature=None):
+        self.calls.append(prompt)
+        if prompt == self.interrupt_at:
+            # simulates the process being stopped while requests are in flight
+            self.run_task.cancel()
+            await asyncio.sleep(1)
+        if prompt == "bad" and not self.recovered:
+            raise Exception("boom")
+        if prompt == "throttled" and not self.recovered:
+            return {"error": {"code": "429"}}
+        # finish out of order
+        await asyncio.sleep(0.001 * (len(prompt) % 3))
+        return {"text": prompt.upper()}
+
+    async def aembeddings(self, text, user=None):
+        return {"data": []}
+
+
+def write_rows(path, prompts):
+    with open(path, "w") as f:
+        for i, prompt in enumerate(prompts):
+            f.write(json.dumps({"id": f"row-{i}", "prompt": prompt}) + "\n")
+        f.write("\n")
+        f.write("not json\n")
+
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_run_batch_writes_every_result(tmp_path):
+    input_path, output_path = str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl")
+    prompts = [f"p{i}" * (i % 4 + 1) for i in range(30)] + ["bad"]
+    write_rows(input_path, prompts)
+    stats = asyncio.run(run_batch(FakeClient(), input_path, output_path, concurrency=4, checkpoint_every=5))
+    assert stats == {"succeeded": 30, "failed": 2, "skipped": 0}
+    results = {result["id"]: result for result in read_results(output_path)}
+    assert results["row-3"]["response"] == {"text": prompts[3].upper()}
+    assert results["row-30"]["error"] == "boom"
+    assert "Invalid row" in results[32]["error"]
+
+
+def test_interrupted_run_resumes(tmp_path):
+    input_path, output_path = str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl")
+    prompts = [f"p{i}" for i in range(40)]
+    write_rows(input_path, prompts)
+    first = FakeClient(interrupt_at="p25")
+
+    async def interrupted():
+        first.run_task = asyncio.ensure_future(run_batch(first, input_path, output_path, concurrency=3, checkpoint_every=4))
+        await first.run_task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(interrupted())
+
+    second = FakeClient()
+    stats = asyncio.run(run_batch(second, input_path, output_path, concurrency=3))
+    ids = [result["id"] for result in read_results(output_path)]
+    # every row is written exactly once across both runs
+    assert sorted(ids, key=str) == sorted([f"row-{i}" for i in range(40)] + [41], key=str)
+    assert stats["skipped"] > 0
+    assert len(first.calls) + len(second.calls) < 2 * 40
+
+
+def test_failed_rows_are_retried_on_resume(tmp_path):
+    input_path, output_path = str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl")
+    write_rows(input_path, ["throttled", "a", "bad", "b"])
+    stats = asyncio.run(run_batch(FakeClient(), input_path, output_path))
+    assert stats == {"succeeded": 2, "failed": 3, "skipped": 0}
+    results = {result["id"]: result for result in read_results(output_path)}
+    assert results["row-0"] == {"id": "row-0", "error": {"code": "429"}}
+    # the checkpoint moves past the failed rows
+    checkpoint = BatchCheckpoint(f"{output_path}.checkpoint")
+    assert checkpoint.load()
+    assert (checkpoint.next_line, checkpoint.done, checkpoint.failed) == (6, set(), {0: "row-0", 2: "row-2"})
+
+    second = FakeClient(recovered=True)
+    stats = asyncio.run(run_batch(second, input_path, output_path))
+    assert sorted(second.calls) == ["bad", "throttled"]
+    assert stats == {"succeeded": 2, "failed": 0, "skipped": 4}
+    results = read_results(output_path)
+    # one result per row, the errors were replaced
+    assert sorted(result["id"] for result in results if result["id"] != 5) == ["row-0", "row-1", "row-2", "row-3"]
+    assert not any("error" in result for result in results if result["id"] != 5)
+    assert checkpoint.load() and checkpoint.failed == {}
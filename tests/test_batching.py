@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from aiohttp import web
+from semantix_genai_inference.inference.batching import BatchingConfig, split_batch_response
+from semantix_genai_inference.inference.llm.llama2 import Llama2InferenceClient
+from semantix_genai_inference.inference.response_cache import ResponseCache
+from tests.server import LocalServer
+
+
+def make_app(requests):
+    async def inference(request):
+        body = await request.json()
+        requests.append(body)
+        return web.json_response({"generated_text": [prompt.upper() for prompt in body["prompt"]]})
+
+    app = web.Application()
+    app.router.add_post("/v0/inference", inference)
+    return app
+
+
+def make_client(url, batching=None):
+    client = Llama2InferenceClient("test", "secret", version="v0", batching=batching)
+    client.url = f"{url}/v0/inference"
+    return client
+
+
+def test_split_batch_response():
+    assert split_batch_response([1, 2], 2) == [[1], [2]]
+    assert split_batch_response({"text": ["a", "b"], "model": "x"}, 2) == [{"text": ["a"], "model": "x"},
+                                                                           {"text": ["b"], "model": "x"}]
+    with pytest.raises(Exception):
+        split_batch_response({"text": "a"}, 2)
+
+
+def test_generate_batch_sends_one_request():
+    requests = []
+    with LocalServer(make_app(requests)) as server:
+        with make_client(server.url) as client:
+            response = client.generate_batch(["a", "b", "c"], temperature=0.5)
+    assert response == {"generated_text": ["A", "B", "C"]}
+    assert requests == [{"prompt": ["a", "b", "c"], "temperature": 0.5}]
+
+
+def test_concurrent_generate_calls_are_coalesced():
+    requests = []
+    with LocalServer(make_app(requests)) as server:
+        client = make_client(server.url, BatchingConfig(max_batch_size=4, max_wait=0.05))
+
+        async def run():
+            async with client:
+                prompts = [str(i) for i in range(6)]
+                cold = [client.agenerate(prompt, temperature=0.1) for prompt in prompts]
+                hot = [client.agenerate("x", temperature=0.9)]
+                return await asyncio.gather(*cold, *hot)
+
+        responses = asyncio.run(run())
+    assert responses[:6] == [{"generated_text": [str(i)]} for i in range(6)]
+    assert responses[6] == {"generated_text": ["X"]}
+    assert sorted(len(request["prompt"]) for request in requests) == [1, 2, 4]
+
+
+def test_batches_in_flight_are_kept_and_awaited_on_close():
+    requests = []
+    with LocalServer(make_app(requests)) as server:
+        client = make_client(server.url, BatchingConfig(max_batch_size=4, max_wait=10))
+
+        async def run():
+            async with client:
+                calls = [asyncio.ensure_future(client.agenerate(str(i), temperature=0.1)) for i in range(6)]
+                await asyncio.sleep(0)
+                # the full batch is in flight and held by the batcher, the other one waits for its timer
+                assert len(client._batcher._tasks) == 1
+            # closing sent the pending batch and waited for both
+            assert not client._batcher._tasks
+            return await asyncio.gather(*calls)
+
+        responses = asyncio.run(run())
+    assert responses == [{"generated_text": [str(i)]} for i in range(6)]
+    assert sorted(len(request["prompt"]) for request in requests) == [2, 4]
+
+
+def test_batched_errors_are_not_cached():
+    requests = []
+
+    async def inference(request):
+        body = await request.json()
+        requests.append(body)
+        if len(requests) == 1:
+            return web.json_response({"error": ["The server is overloaded."]}, status=503)
+        return web.json_response({"generated_text": [prompt.upper() for prompt in body["prompt"]]})
+
+    app = web.Application()
+    app.router.add_post("/v0/inference", inference)
+    with LocalServer(app) as server:
+        client = Llama2InferenceClient("test", "secret", version="v0", response_cache=ResponseCache(),
+                                       batching=BatchingConfig(max_batch_size=4, max_wait=0.01))
+        client.url = f"{server.url}/v0/inference"
+
+        async def run():
+            async with client:
+                return [await client.agenerate("a", temperature=0) for _ in range(3)]
+
+        responses = asyncio.run(run())
+    assert responses == [{"error": ["The server is overloaded."]}, {"generated_text": ["A"]}, {"generated_text": ["A"]}]
+    assert len(requests) == 2
@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from semantix_genai_inference.benchmark import create_mock_client, format_results, percentile, run_benchmark
+from semantix_genai_inference.inference.ratelimit import RateLimitConfig, RateLimiter
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile(list(range(101)), 95) == 95
+
+
+def test_mock_config_from_dict():
+    config = MockConfig.from_dict({"latency": 0.1, "throttleRate": 0.2, "chunkDelay": 0.01})
+    assert (config.latency, config.throttle_rate, config.chunk_delay) == (0.1, 0.2, 0.01)
+    with pytest.raises(Exception, match="rate"):
+        MockConfig.from_dict({"rate": 1})
+
+
+@pytest.mark.parametrize("client_type", ["alpaca", "llama2", "cohere", "openai", "azure-openai", "router"])
+def test_every_client_runs_against_the_mock_server(client_type):
+    with MockServer() as server:
+        async def run():
+            async with create_mock_client(client_type, server.url) as client:
+                return await run_benchmark(client, concurrency=(1, 4), requests=8, warmup=2)
+        results = asyncio.run(run())
+    assert [result.concurrency for result in results] == [1, 4]
+    assert all(result.errors == 0 and len(result.latencies) == 8 for result in results)
+    assert "concurrency" in format_results(results)
+
+
+@pytest.mark.parametrize("client_type", ["cohere", "openai"])
+def test_streams_report_time_to_first_token(client_type):
+    with MockServer(MockConfig(tokens=5, chunk_delay=0.01)) as server:
+        async def run():
+            async with create_mock_client(client_type, server.url) as client:
+                return await run_benchmark(client, concurrency=(2,), requests=4, stream=True, warmup=0,
+                                           trace_memory=True)
+        result = asyncio.run(run())[0]
+    assert len(result.ttfts) == 4
+    # the first token comes before the four chunk delays of the rest of the stream
+    assert result.ttft(50) + 0.03 < result.latency(50)
+    assert result.peak_traced > 0
+
+
+def test_faults_are_counted_as_errors_or_retried():
+    config = MockConfig(throttle_rate=0.3, error_rate=0.2, retry_after=0.001, seed=7)
+    with MockServer(config) as server:
+        async def run(rate_limiter=None):
+            async with create_mock_client("openai", server.url, rate_limiter=rate_limiter) as client:
+                return (await run_benchmark(client, concurrency=(4,), requests=40, warmup=0))[0]
+        plain = asyncio.run(run())
+        limited = asyncio.run(run(RateLimiter(RateLimitConfig(max_retries=20, base_delay=0.001))))
+    assert 10 <= plain.errors <= 30
+    # the rate limiter retries the throttled requests, only the server errors are left
+    assert limited.errors < plain.errors
+
+
+def test_latency_and_jitter():
+    with MockServer(MockConfig(latency=0.05, jitter=0.02, seed=1)) as server:
+        async def run():
+            async with create_mock_client("openai", server.url) as client:
+                return (await run_benchmark(client, concurrency=(8,), requests=16, warmup=0))[0]
+        result = asyncio.run(run())
+    assert 0.03 <= result.latency(50) < 0.2
+    assert result.throughput > 0
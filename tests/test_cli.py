@@ -1,3 +1,6 @@
+import json
+import subprocess
+import sys
 import pytest
 from click.testing import CliRunner
 from semantix_genai_inference import cli
@@ -9,21 +12,32 @@ def runner():
 
 
 def test_cli(runner):
-    result = runner.invoke(cli.main)
+    result = runner.invoke(cli.cli, ['--help'])
     assert result.exit_code == 0
     assert not result.exception
-    assert result.output.strip() == 'Hello, world.'
+    for command in ('inference', 'batch', 'benchmark'):
+        assert command in result.output
 
 
-def test_cli_with_option(runner):
-    result = runner.invoke(cli.main, ['--as-cowboy'])
+def test_cli_inference_with_option(runner):
+    result = runner.invoke(cli.cli, ['inference', '--prompt', 'Once upon a time'])
     assert not result.exception
     assert result.exit_code == 0
-    assert result.output.strip() == 'Howdy, world.'
+    assert result.output.strip() == 'CLI is being developed, use this as a module. Your prompt Once upon a time.'
 
 
-def test_cli_with_arg(runner):
-    result = runner.invoke(cli.main, ['Semantix'])
-    assert result.exit_code == 0
+def test_cli_benchmark_against_mock_server(runner):
+    result = runner.invoke(cli.cli, ['benchmark', '-m', 'openai', '-c', '1,4', '-n', '8', '--warmup', '2',
+                                     '--latency', '0', '--stream', '--json'])
     assert not result.exception
-    assert result.output.strip() == 'Hello, Semantix.'
+    assert result.exit_code == 0
+    levels = [json.loads(line) for line in result.output.splitlines()]
+    assert [level["concurrency"] for level in levels] == [1, 4]
+    assert all(level["errors"] == 0 and level["ttftP50"] is not None for level in levels)
+
+
+def test_the_mock_server_is_imported_on_demand():
+    # a fresh interpreter, the tests themselves import the mock server
+    code = ("import sys, semantix_genai_inference.cli, semantix_genai_inference.inference.model_client; "
+            "print('semantix_genai_inference.mock_server' in sys.modules)")
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip() == "False"
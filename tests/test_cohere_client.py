@@ -0,0 +1,63 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
+from semantix_genai_inference.inference.session import ResponseError
+from tests.server import LocalServer
+
+EVENTS = [
+    {"text": " Once", "is_finished": False},
+    {"text": " upon", "is_finished": False},
+    {"text": " a time", "is_finished": False},
+    {"is_finished": True, "finish_reason": "COMPLETE",
+     "response": {"id": "1", "generations": [{"id": "g", "text": " Once upon a time"}]}},
+]
+
+
+def make_app(events=EVENTS):
+    async def generate(request):
+        body = await request.json()
+        if not body.get("stream"):
+            return web.json_response(EVENTS[-1]["response"])
+        response = web.StreamResponse(headers={"Content-Type": "application/stream+json"})
+        await response.prepare(request)
+        stream = b"".join(json.dumps(event).encode() + b"\n" for event in events)
+        for i in range(0, len(stream), 7):
+            await response.write(stream[i:i + 7])
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/generate", generate)
+    return app
+
+
+def make_client(url):
+    client = CohereInferenceClient(api_key="test")
+    client._host = url
+    return client
+
+
+def test_generate_stream_yields_text_deltas():
+    with LocalServer(make_app()) as server:
+        async def run():
+            async with make_client(server.url) as client:
+                return [delta async for delta in client.generate_stream("Once", max_tokens=5)]
+
+        deltas = asyncio.run(run())
+    assert "".join(delta.text for delta in deltas if delta.text) == " Once upon a time"
+    assert deltas[-1].is_finished
+    assert deltas[-1].finish_reason == "COMPLETE"
+
+
+def test_generate_with_stream_returns_the_full_response():
+    with LocalServer(make_app()) as server:
+        with make_client(server.url) as client:
+            assert client.generate("Once", stream=True) == client.generate("Once")
+
+
+def test_stream_cut_before_the_final_event_raises():
+    with LocalServer(make_app(EVENTS[:-1])) as server:
+        with make_client(server.url) as client:
+            with pytest.raises(ResponseError, match="final event"):
+                client.generate("Once", stream=True)
@@ -0,0 +1,109 @@
+import asyncio
+import gzip
+import json
+import zlib
+import pytest
+from aiohttp import web
+from semantix_genai_inference.benchmark import create_mock_client
+from semantix_genai_inference.inference.compression import CompressionConfig, compress, has_zstandard
+from semantix_genai_inference.inference.llm.alpaca import AlpacaInferenceClient
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.metrics import Metrics
+from semantix_genai_inference.inference.session import SessionConfig
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+from tests.server import LocalServer
+
+
+def test_config_from_dict():
+    config = SessionConfig.from_dict({"limit": 10, "compression": {"request": "gzip", "minSize": 10}}).compression
+    assert (config.request, config.min_size, config.response) == ("gzip", 10, True)
+    with pytest.raises(Exception, match="brotli"):
+        CompressionConfig(request="brotli")
+    with pytest.raises(Exception, match="size"):
+        CompressionConfig.from_dict({"size": 1})
+    if not has_zstandard():
+        with pytest.raises(ImportError):
+            CompressionConfig(request="zstd")
+
+
+def test_large_request_bodies_are_compressed():
+    received = []
+
+    async def inference(request):
+        # aiohttp decompresses the body before handing it over
+        received.append((request.headers.get("Content-Encoding"), await request.json()))
+        return web.json_response({"generated_text": ["ok"]})
+
+    app = web.Application()
+    app.router.add_post("/v0/inference", inference)
+    metrics = Metrics()
+    with LocalServer(app) as server:
+        async def run():
+            config = SessionConfig(compression=CompressionConfig(request="gzip", min_size=1000))
+            client = AlpacaInferenceClient("test", "test", version="v0", session_config=config, metrics=metrics)
+            client.url = f"{server.url}/v0/inference"
+            async with client:
+                await client.agenerate("short", cache=False)
+                await client.agenerate("context " * 1000, cache=False)
+        asyncio.run(run())
+    assert [encoding for encoding, _ in received] == [None, "gzip"]
+    assert received[1][1]["prompt"] == ["context " * 1000]
+    assert metrics.counter("semantix_compression_saved_bytes_total", direction="request") > 7000
+
+
+def test_responses_are_negotiated_and_decompressed():
+    metrics = Metrics()
+    with MockServer(MockConfig(compress=True, embedding_size=64)) as server:
+        async def run():
+            config = SessionConfig(compression=CompressionConfig())
+            async with create_mock_client("openai", server.url, session_config=config, metrics=metrics) as client:
+                embeddings = await client.aembeddings([f"text {i}" for i in range(20)])
+                completion = await client.agenerate([{"role": "user", "content": "hi"}], max_tokens=3)
+                return embeddings, completion
+        embeddings, completion = asyncio.run(run())
+    assert len(embeddings["data"]) == 20 and len(embeddings.embedding) == 64
+    assert completion.content == "the model answered"
+    assert metrics.counter("semantix_compression_saved_bytes_total", direction="response") > 0
+
+
+def sse_app(encoding):
+    events = [{"choices": [{"index": 0, "delta": {"content": word}}]} for word in ("Once", " upon", " a", " time")]
+
+    async def chat(request):
+        assert encoding in request.headers["Accept-Encoding"]
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Content-Encoding": encoding})
+        await response.prepare(request)
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        for event in events:
+            # every event is flushed so it can be decoded as soon as it arrives
+            await response.write(compressor.compress(f"data: {json.dumps(event)}\n\n".encode()) +
+                                 compressor.flush(zlib.Z_SYNC_FLUSH))
+            await asyncio.sleep(0.01)
+        await response.write(compressor.compress(b"data: [DONE]\n\n") + compressor.flush())
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_streams_are_decompressed_as_they_arrive(encoding):
+    with LocalServer(sse_app(encoding)) as server:
+        async def run():
+            config = SessionConfig(compression=CompressionConfig())
+            async with OpenAIInferenceClient(api_key="test", host=server.url, session_config=config) as client:
+                deltas = [delta.content async for delta in client.generate_stream_deltas([{"role": "user", "content": "hi"}])]
+                lines = [line async for line in client.generate_stream([{"role": "user", "content": "hi"}])]
+                return deltas, lines
+        deltas, lines = asyncio.run(run())
+    assert deltas == ["Once", " upon", " a", " time"]
+    assert lines[-2:] == [b"data: [DONE]\n", b"\n"]
+
+
+def test_compress():
+    data = b'{"prompt": "' + b"a" * 5000 + b'"}'
+    assert gzip.decompress(compress(data, "gzip")) == data
+    if has_zstandard():
+        import zstandard
+        assert zstandard.ZstdDecompressor().decompress(compress(data, "zstd")) == data
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import pytest
+from semantix_genai_inference.inference import codec
+from semantix_genai_inference.inference.conversation import Conversation
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.ratelimit import RateLimiter
+from semantix_genai_inference.inference.tokens import count_message_tokens
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+
+
+def test_body_splices_the_cached_encodings():
+    conversation = Conversation().system("Be brief.").user("Hi, how are you?", name="ana")
+    body = {"model": "gpt-4", "messages": conversation, "temperature": 0}
+    encoded = codec.dumps(body)
+    assert json.loads(encoded) == {"model": "gpt-4", "temperature": 0, "messages": conversation.to_list()}
+    assert codec.dumps({"messages": conversation}) == b'{"messages":' + conversation.json_bytes() + b"}"
+    # nested conversations are encoded through the default hook
+    assert json.loads(codec.dumps([conversation])) == [conversation.to_list()]
+
+
+def test_messages_are_encoded_once(monkeypatch):
+    conversation = Conversation([{"role": "user", "content": str(i)} for i in range(50)])
+    encoded = []
+    monkeypatch.setattr("semantix_genai_inference.inference.conversation.dumps",
+                        lambda message: encoded.append(message) or json.dumps(message).encode())
+    conversation.assistant("ok")
+    codec.dumps({"messages": conversation})
+    assert encoded == [{"role": "assistant", "content": "ok"}]
+
+
+def test_tokens_match_count_message_tokens():
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Tell me a story.", "name": "ana"}]
+    conversation = Conversation(messages)
+    assert conversation.tokens == count_message_tokens(messages)
+    assert OpenAIInferenceClient._request_tokens({"messages": conversation, "max_tokens": 10}) == conversation.tokens + 10
+
+
+def test_sliding_window_keeps_the_system_messages():
+    conversation = Conversation(max_messages=3).system("Be brief.")
+    for i in range(5):
+        conversation.user(str(i))
+    assert [message["content"] for message in conversation] == ["Be brief.", "3", "4"]
+    assert conversation.tokens == count_message_tokens(conversation.messages)
+    assert conversation.trim(max_messages=2) == 1
+    assert [message["content"] for message in conversation] == ["Be brief.", "4"]
+    assert json.loads(conversation.json_bytes()) == conversation.to_list()
+
+
+def test_token_budget():
+    conversation = Conversation(max_tokens=40)
+    for i in range(20):
+        conversation.user(f"message number {i}")
+    assert conversation.tokens <= 40
+    assert conversation[-1]["content"] == "message number 19"
+    assert conversation.tokens == count_message_tokens(conversation.messages)
+
+
+def test_turns_against_the_mock_server():
+    with MockServer(MockConfig(tokens=3)) as server:
+        async def run():
+            conversation = Conversation().system("Be brief.")
+            async with OpenAIInferenceClient(api_key="test", host=server.url, rate_limiter=RateLimiter(),
+                                             overflow="truncate", context_window=60) as client:
+                for i in range(6):
+                    conversation.user(f"Tell me about the turn number {i} of this long conversation.")
+                    if i % 2:
+                        conversation.append_response(await client.agenerate(conversation, max_tokens=10))
+                    else:
+                        async for _ in conversation.append_stream(client.generate_stream_deltas(conversation)):
+                            pass
+            return conversation
+        conversation = asyncio.run(run())
+    assert len(conversation) == 13
+    assert [message["role"] for message in conversation][-2:] == ["user", "assistant"]
+    assert conversation[-1]["content"] == "the model answered"
+
+
+def test_pre_encoded_values_must_encode_themselves():
+    class Partial(codec.PreEncoded):
+        def to_list(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert isinstance(Conversation(), codec.PreEncoded)
@@ -0,0 +1,71 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from semantix_genai_inference.inference.deadline import DeadlineExceeded, deadline, time_left
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.ratelimit import RateLimitConfig, RateLimiter
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+from tests.server import LocalServer
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_nested_deadlines_keep_the_earliest():
+    assert time_left() is None
+    with deadline(10):
+        with deadline(60) as at:
+            assert at <= time.monotonic() + 10
+            assert 9 < time_left() <= 10
+        with deadline(1):
+            assert time_left() <= 1
+    assert time_left() is None
+
+
+def test_sync_calls_past_the_deadline():
+    with MockServer(MockConfig(latency=1.0)) as server:
+        with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+            start = time.monotonic()
+            with pytest.raises(DeadlineExceeded):
+                with deadline(0.2):
+                    client.generate(MESSAGES)
+            assert time.monotonic() - start < 0.8
+            # a timeout error, for the callers that already handle them
+            assert issubclass(DeadlineExceeded, asyncio.TimeoutError)
+
+
+def test_streams_past_the_deadline():
+    with MockServer(MockConfig(tokens=100, chunk_delay=0.05)) as server:
+        async def run():
+            received = []
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                with pytest.raises(DeadlineExceeded):
+                    with deadline(0.3):
+                        async for delta in client.generate_stream_deltas(MESSAGES):
+                            received.append(delta)
+                # the client keeps working once the deadline is gone
+                assert (await client.agenerate(MESSAGES, max_tokens=2)).content == "the model"
+            return received
+
+        received = asyncio.run(run())
+    assert 0 < len(received) < 20
+
+
+def test_rate_limiter_waits_count_against_the_deadline():
+    async def chat(request):
+        return web.json_response({"choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    with LocalServer(app) as server:
+        async def run():
+            limiter = RateLimiter(RateLimitConfig(requests_per_minute=1))
+            async with OpenAIInferenceClient(api_key="test", host=server.url, rate_limiter=limiter) as client:
+                with deadline(0.2):
+                    await client.agenerate(MESSAGES, cache=False)
+                    start = time.monotonic()
+                    with pytest.raises(DeadlineExceeded):
+                        await client.agenerate(MESSAGES, cache=False)
+                    return time.monotonic() - start
+
+        assert asyncio.run(run()) < 0.5
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import numpy as np
+from aiohttp import web
+from semantix_genai_inference.inference.embedding_cache import EmbeddingCache
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from tests.server import LocalServer
+
+
+def make_app(inputs):
+    async def embeddings(request):
+        body = await request.json()
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        inputs.extend(texts)
+        data = [{"object": "embedding", "index": i, "embedding": [float(len(text)), 0.5]} for i, text in enumerate(texts)]
+        usage = {"prompt_tokens": len(texts), "total_tokens": len(texts)}
+        return web.json_response({"object": "list", "data": data, "model": "embedder-1", "usage": usage})
+
+    app = web.Application()
+    app.router.add_post("/v1/embeddings", embeddings)
+    return app
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = EmbeddingCache(max_memory_bytes=16)
+    vector = np.ones(2, dtype=np.float32)
+    cache.put_many(["a", "b"], [vector, vector])
+    cache.get_many(["a"])
+    cache.put_many(["c"], [vector])
+    assert [v is not None for v in cache.get_many(["a", "b", "c"])] == [True, False, True]
+    assert cache.stats.evictions == 1
+
+
+def test_only_misses_are_sent_and_vectors_persist(tmp_path):
+    inputs = []
+    path = str(tmp_path / "embeddings.sqlite")
+    with LocalServer(make_app(inputs)) as server:
+        cache = EmbeddingCache(path=path)
+        with OpenAIInferenceClient(api_key="test", host=server.url, embedding_cache=cache) as client:
+            client.embed_many(["one", "three"])
+            matrix = client.embed_many(["one", "fourty", "three", " one "])
+            response = client.embeddings("fourty")
+        cache.close()
+        assert inputs == ["one", "three", "fourty"]
+        assert matrix[:, 0].tolist() == [3.0, 6.0, 5.0, 3.0]
+        assert response["data"][0]["embedding"] == [6.0, 0.5]
+        # a full hit reports the configured model and no usage
+        assert (response["model"], response["usage"]["total_tokens"]) == ("text-embedding-ada-002", 0)
+        assert cache.stats.hits == 4
+
+        # a new process reads the vectors back from disk
+        cache = EmbeddingCache(path=path)
+        with OpenAIInferenceClient(api_key="test", host=server.url, embedding_cache=cache) as client:
+            client.embed_many(["three", "fourty"])
+            response = client.embeddings(["three", "five"])
+        assert cache.stats.disk_hits == 2
+        assert (response["model"], response["usage"]["total_tokens"]) == ("embedder-1", 1)
+        assert inputs == ["one", "three", "fourty", "five"]
+
+
+def test_async_paths_keep_sqlite_off_the_event_loop(tmp_path):
+    inputs = []
+    cache = EmbeddingCache(path=str(tmp_path / "embeddings.sqlite"))
+    loop_threads = []
+    get_many, put_many = cache.get_many, cache.put_many
+
+    def checked(method):
+        def call(*args):
+            assert threading.current_thread() not in loop_threads, "SQLite called on the event loop"
+            return method(*args)
+        return call
+
+    cache.get_many, cache.put_many = checked(get_many), checked(put_many)
+    with LocalServer(make_app(inputs)) as server:
+        async def run():
+            loop_threads.append(threading.current_thread())
+            async with OpenAIInferenceClient(api_key="test", host=server.url, embedding_cache=cache) as client:
+                first = await client.aembed_many(["one", "three"])
+                second = await client.aembed_many(["one", "three", "five"])
+                await client.aembeddings(["five", "seven"])
+                return first, second
+
+        first, second = asyncio.run(run())
+    cache.close()
+    assert second[:2].tolist() == first.tolist()
+    assert inputs == ["one", "three", "five", "seven"]
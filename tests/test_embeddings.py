@@ -0,0 +1,50 @@
+import base64
+import numpy as np
+from aiohttp import web
+from semantix_genai_inference.inference.embeddings import pack_batches
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from tests.server import LocalServer
+
+
+def vector(text):
+    return [float(len(text)), float(ord(text[0])), 1.0]
+
+
+def make_app(requests):
+    async def embeddings(request):
+        body = await request.json()
+        requests.append(body)
+        data = []
+        # answer out of order, the client must sort by index
+        for i, text in reversed(list(enumerate(body["input"]))):
+            embedding = vector(text)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(np.array(embedding, dtype="<f4").tobytes()).decode()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return web.json_response({"object": "list", "data": data})
+
+    app = web.Application()
+    app.router.add_post("/v1/embeddings", embeddings)
+    return app
+
+
+def test_pack_batches():
+    texts = ["a" * 40] * 5
+    assert pack_batches(texts, max_batch_size=2, max_batch_tokens=1000) == [(0, 2), (2, 4), (4, 5)]
+    assert pack_batches(texts, max_batch_size=10, max_batch_tokens=25) == [(0, 2), (2, 4), (4, 5)]
+    # a text over the token budget is still sent alone
+    assert pack_batches(["a" * 400], max_batch_size=10, max_batch_tokens=25) == [(0, 1)]
+
+
+def test_embed_many_preserves_order():
+    requests = []
+    texts = [chr(ord("a") + i % 26) * (i + 1) for i in range(50)]
+    with LocalServer(make_app(requests)) as server:
+        with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+            matrix = client.embed_many(texts, max_batch_size=8, concurrency=3)
+            encoded = client.embed_many(texts, max_batch_size=8, encoding_format="base64")
+    assert matrix.dtype == np.float32
+    assert matrix.flags["C_CONTIGUOUS"]
+    assert np.array_equal(matrix, np.array([vector(text) for text in texts], dtype=np.float32))
+    assert np.array_equal(encoded, matrix)
+    assert len(requests) == 14
@@ -0,0 +1,171 @@
+import asyncio
+from aiohttp import web
+from semantix_genai_inference.inference.hedging import Hedger, HedgingConfig
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.single_flight import SingleFlight
+from tests.server import LocalServer
+
+
+def completion(content):
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+def test_config_from_dict():
+    config = HedgingConfig.from_dict({"delayMs": 250, "maxHedgeRatio": 0.1})
+    assert config.delay == 0.25
+    assert config.max_hedge_ratio == 0.1
+    assert config.percentile == 95
+
+
+def test_percentile_delay_needs_enough_samples():
+    hedger = Hedger(HedgingConfig(percentile=90, min_samples=10))
+    assert hedger.hedge_delay() is None
+    for i in range(1, 11):
+        hedger.record(i / 10)
+    assert hedger.hedge_delay() == 1.0
+    hedger.record(0.05)
+    assert hedger.hedge_delay() == 0.9
+    # the oldest latencies leave the window
+    windowed = Hedger(HedgingConfig(percentile=50, min_samples=1, window=3))
+    for latency in (9, 8, 1, 2, 3):
+        windowed.record(latency)
+    assert windowed._sorted == [1, 2, 3] and windowed.hedge_delay() == 2
+
+
+def test_fast_requests_are_not_hedged():
+    hedger = Hedger(HedgingConfig(delay=0.5, max_hedge_ratio=1))
+
+    async def fast():
+        return "primary"
+
+    async def hedge():
+        raise AssertionError("the hedge must not be sent")
+
+    assert asyncio.run(hedger.run(fast, hedge)) == "primary"
+    assert hedger.stats.hedges == 0
+
+
+def test_slow_request_is_hedged_and_cancelled():
+    hedger = Hedger(HedgingConfig(delay=0.01, max_hedge_ratio=1))
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "primary"
+
+    async def hedge():
+        return "hedge"
+
+    assert asyncio.run(hedger.run(slow, hedge)) == "hedge"
+    assert cancelled == [True]
+    # the cancelled primary is recorded with the time it ran
+    assert len(hedger._latencies) == 2 and max(hedger._latencies) >= 0.01
+    assert hedger.stats.hedges == 1
+    assert hedger.stats.hedge_wins == 1
+
+
+def test_failed_hedge_falls_back_to_primary():
+    hedger = Hedger(HedgingConfig(delay=0.01, max_hedge_ratio=1))
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def hedge():
+        raise Exception("replica down")
+
+    assert asyncio.run(hedger.run(slow, hedge)) == "primary"
+
+
+def test_error_bodies_do_not_win():
+    hedger = Hedger(HedgingConfig(delay=0.01, max_hedge_ratio=1))
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"choices": []}
+
+    async def throttled():
+        return {"error": {"code": "429"}}
+
+    def failed(response):
+        return "error" in response
+
+    assert asyncio.run(hedger.run(slow, throttled, failed)) == {"choices": []}
+    assert hedger.stats.hedge_wins == 0
+    # both failed, the body of the original request is returned
+    assert asyncio.run(hedger.run(lambda: asyncio.sleep(0.05, {"error": "primary"}), throttled, failed)) == {"error": "primary"}
+
+
+def test_budget_caps_the_hedge_ratio():
+    hedger = Hedger(HedgingConfig(delay=0, max_hedge_ratio=0.25))
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return "primary"
+
+    async def hedge():
+        await asyncio.sleep(0.01)
+        return "hedge"
+
+    async def run():
+        for _ in range(20):
+            await hedger.run(slow, hedge)
+
+    asyncio.run(run())
+    assert hedger.stats.requests == 20
+    assert hedger.stats.hedges == 5
+    assert hedger.stats.budget_exhausted == 15
+
+
+def test_client_hedges_to_alternate_deployment():
+    async def slow_completions(request):
+        await asyncio.sleep(0.5)
+        return web.json_response(completion("slow"))
+
+    async def fast_completions(request):
+        return web.json_response(completion("fast"))
+
+    slow_app = web.Application()
+    slow_app.router.add_post("/v1/chat/completions", slow_completions)
+    fast_app = web.Application()
+    fast_app.router.add_post("/v1/chat/completions", fast_completions)
+    with LocalServer(slow_app) as slow, LocalServer(fast_app) as fast:
+        async def run():
+            alternate = OpenAIInferenceClient(api_key="test", host=fast.url)
+            async with OpenAIInferenceClient(api_key="test", host=slow.url, hedge_client=alternate,
+                                             hedging=HedgingConfig(delay=0.05, max_hedge_ratio=1)) as client:
+                response = await client.agenerate([{"role": "user", "content": "hi"}])
+                await alternate.aclose()
+                return response, client.hedging_stats
+
+        response, stats = asyncio.run(run())
+    assert response["choices"][0]["message"]["content"] == "fast"
+    assert stats.hedge_wins == 1
+
+
+def test_hedge_to_the_same_client_is_not_shared_with_the_primary():
+    calls = []
+
+    async def completions(request):
+        calls.append(True)
+        # only the first request is slow
+        await asyncio.sleep(0.5 if len(calls) == 1 else 0)
+        return web.json_response(completion(str(len(calls))))
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    with LocalServer(app) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, single_flight=SingleFlight(),
+                                             hedging=HedgingConfig(delay=0.05, max_hedge_ratio=1)) as client:
+                response = await client.agenerate([{"role": "user", "content": "hi"}], temperature=0)
+                return response, client.hedging_stats
+
+        response, stats = asyncio.run(run())
+    assert len(calls) == 2
+    assert response["choices"][0]["message"]["content"] == "2"
+    assert stats.hedge_wins == 1
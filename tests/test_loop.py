@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.loop import iterate_sync
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+from tests.server import LocalServer
+
+
+def make_app(peers):
+    async def chat(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        return web.json_response({"choices": [{"message": body["messages"][-1]}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+def test_sync_calls_from_many_threads_share_the_pool():
+    peers = set()
+    with LocalServer(make_app(peers)) as server:
+        with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+            def call(i):
+                response = client.generate([{"role": "user", "content": str(i)}])
+                return response["choices"][0]["message"]["content"]
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                assert list(executor.map(call, range(32))) == [str(i) for i in range(32)]
+    # connections are pooled on the shared loop instead of one per call
+    assert len(peers) <= 8
+
+
+def test_sync_call_inside_a_running_loop():
+    with LocalServer(make_app(set())) as server:
+        client = OpenAIInferenceClient(api_key="test", host=server.url)
+
+        async def run():
+            sync_response = client.generate([{"role": "user", "content": "sync"}])
+            async_response = await client.agenerate([{"role": "user", "content": "async"}])
+            await client.aclose()
+            return sync_response, async_response
+
+        sync_response, async_response = asyncio.run(run())
+        assert sync_response["choices"][0]["message"]["content"] == "sync"
+        assert async_response["choices"][0]["message"]["content"] == "async"
+
+
+def test_sync_stream():
+    with MockServer(MockConfig(tokens=4)) as server:
+        with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+            lines = list(client.generate_stream_sync([{"role": "user", "content": "hi"}]))
+            deltas = list(client.generate_stream_sync([{"role": "user", "content": "hi"}], deltas=True))
+    assert lines[-2:] == [b"data: [DONE]\n", b"\n"]
+    assert "".join(delta.content or "" for delta in deltas) == "the model answered with"
+
+
+def test_sync_iteration_reads_ahead_a_bounded_number_of_items():
+    produced = []
+
+    async def numbers():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    iterator = iterate_sync(numbers(), max_buffer=4)
+    assert next(iterator) == 0
+    time.sleep(0.05)
+    # the item handed over, the queue and the one waiting to be queued
+    assert len(produced) <= 6
+    assert list(itertools.islice(iterator, 3)) == [1, 2, 3]
+    iterator.close()
+    assert len(produced) <= 10
+
+
+def test_stopping_a_sync_stream_closes_the_response():
+    disconnected = threading.Event()
+
+    async def chat(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for i in range(500):
+                await response.write(b'data: {"choices": [{"index": 0, "delta": {"content": "word"}}]}\n\n')
+                await asyncio.sleep(0.01)
+        except ConnectionResetError:
+            disconnected.set()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    with LocalServer(app) as server:
+        with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+            for delta in client.generate_stream_sync([{"role": "user", "content": "hi"}], deltas=True):
+                assert delta.content == "word"
+                break
+            assert disconnected.wait(2)
+
+
+def test_sync_stream_errors_are_raised():
+    async def failing():
+        yield 1
+        raise ValueError("stream broke")
+
+    iterator = iterate_sync(failing())
+    assert next(iterator) == 1
+    with pytest.raises(ValueError, match="stream broke"):
+        next(iterator)
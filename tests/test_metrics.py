@@ -0,0 +1,125 @@
+import asyncio
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.metrics import Metrics, RequestRecord
+from semantix_genai_inference.inference.ratelimit import RateLimitConfig, RateLimiter
+from tests.server import LocalServer
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def completion_app(throttled: int = 0):
+    calls = []
+
+    async def completions(request):
+        calls.append(1)
+        if len(calls) <= throttled:
+            return web.json_response({"error": "throttled"}, status=429, headers={"retry-after-ms": "10"})
+        return web.json_response({"choices": [{"message": {"content": "ok"}}],
+                                  "usage": {"prompt_tokens": 9, "completion_tokens": 2, "total_tokens": 11}})
+
+    async def stream(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for content in ("o", "k"):
+            await response.write(f'data: {{"choices": [{{"index": 0, "delta": {{"content": "{content}"}}}}]}}\n\n'.encode())
+            await asyncio.sleep(0.02)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def handler(request):
+        body = await request.json()
+        return await (stream(request) if body.get("stream") else completions(request))
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    return app
+
+
+def test_request_timings_sizes_and_usage_are_recorded():
+    records = []
+    metrics = Metrics(callback=records.append)
+    with LocalServer(completion_app()) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, metrics=metrics) as client:
+                await client.agenerate(MESSAGES)
+                await client.agenerate(MESSAGES)
+        asyncio.run(run())
+    assert len(records) == 2
+    first = records[0]
+    assert first.provider == "openai" and first.model == "gpt-4"
+    assert first.status == 200 and first.error is None
+    assert first.connect is not None and first.ttfb is not None
+    assert first.latency >= first.ttfb
+    assert first.request_bytes > 0 and first.response_bytes > 0
+    # the pooled connection is reused by the second request
+    assert records[1].connect is None
+    latency = metrics.histogram("semantix_request_latency_seconds", "openai", "gpt-4")
+    assert latency.count == 2
+    assert metrics.counter("semantix_requests_total", status=200) == 2
+    assert metrics.counter("semantix_tokens_total", kind="prompt") == 18
+    assert metrics.counter("semantix_tokens_total", kind="completion") == 4
+
+
+def test_time_to_first_token_of_streams():
+    records = []
+    metrics = Metrics(callback=records.append)
+    with LocalServer(completion_app()) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, metrics=metrics) as client:
+                return [line async for line in client.generate_stream(MESSAGES)]
+        lines = asyncio.run(run())
+    assert lines
+    record = records[0]
+    assert record.stream and record.response_bytes > 0
+    # the stream keeps going for about 40ms after its first chunk
+    assert record.ttft is not None and record.latency - record.ttft >= 0.03
+
+
+def test_throttled_retries_are_counted():
+    metrics = Metrics()
+    with LocalServer(completion_app(throttled=2)) as server:
+        limiter = RateLimiter(RateLimitConfig(base_delay=0.01))
+
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, rate_limiter=limiter,
+                                             metrics=metrics) as client:
+                await client.agenerate(MESSAGES)
+        asyncio.run(run())
+    assert metrics.counter("semantix_request_retries_total") == 2
+    assert metrics.counter("semantix_requests_total", status=200) == 1
+
+
+def test_failed_requests_are_counted_by_error():
+    metrics = Metrics()
+
+    async def run():
+        async with OpenAIInferenceClient(api_key="test", host="http://127.0.0.1:1", metrics=metrics) as client:
+            await client.agenerate(MESSAGES)
+    try:
+        asyncio.run(run())
+    except Exception:
+        pass
+    else:
+        raise AssertionError("the connection must be refused")
+    assert metrics.counter("semantix_requests_total", status="ClientConnectorError") == 1
+
+
+def test_prometheus_export():
+    metrics = Metrics()
+    record = RequestRecord("openai", "gpt-4")
+    record.status = 200
+    record.ttfb = 0.2
+    record.prompt_tokens = 5
+    metrics.finish(record)
+    text = metrics.to_prometheus()
+    assert "# TYPE semantix_request_ttfb_seconds histogram" in text
+    assert 'semantix_request_ttfb_seconds_bucket{provider="openai",model="gpt-4",le="0.25"} 1' in text
+    assert 'semantix_request_ttfb_seconds_bucket{provider="openai",model="gpt-4",le="0.1"} 0' in text
+    assert 'semantix_request_ttfb_seconds_count{provider="openai",model="gpt-4"} 1' in text
+    assert 'semantix_requests_total{provider="openai",model="gpt-4",status="200"} 1' in text
+    assert 'semantix_tokens_total{provider="openai",model="gpt-4",kind="prompt"} 5' in text
+    # no dns lookup happened, so its histogram is left out
+    assert "semantix_request_dns_seconds" not in text
+    metrics.reset()
+    assert metrics.to_prometheus() == ""
@@ -0,0 +1,55 @@
+import os
+import pytest
+from semantix_genai_inference.inference.model_client import ModelClient
+
+CONFIG = """
+providers:
+  openai:
+    apiKey: "key"
+    chat:
+      model: "{model}"
+      version: "v1"
+"""
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / "semantix.yaml"
+    path.write_text(CONFIG.format(model="gpt-4"))
+    monkeypatch.setenv("SEMANTIX_CONFIG_FILE", str(path))
+    ModelClient.clear_cache()
+    yield path
+    ModelClient.clear_cache()
+
+
+def test_clients_are_reused(config_file):
+    client = ModelClient.create("openai")
+    assert ModelClient.create("openai") is client
+    assert ModelClient.create("openai", reuse=False) is not client
+
+
+def test_config_is_parsed_once(config_file, monkeypatch):
+    ModelClient.create("openai")
+    calls = []
+    load_config = ModelClient._load_config
+    monkeypatch.setattr(ModelClient, "_load_config", lambda self: calls.append(1) or load_config(self))
+    ModelClient.create("openai")
+    ModelClient.create("openai", reuse=False)
+    assert calls == []
+
+
+def test_config_change_creates_new_client(config_file):
+    client = ModelClient.create("openai")
+    config_file.write_text(CONFIG.format(model="gpt-3.5-turbo"))
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+    reloaded = ModelClient.create("openai")
+    assert reloaded is not client
+    assert reloaded._model == "gpt-3.5-turbo"
+
+
+def test_environment_change_creates_new_client(config_file, monkeypatch):
+    client = ModelClient.create("openai")
+    # clients are keyed by the whole resolved configuration
+    monkeypatch.setenv("COHERE_API_KEY", "other")
+    assert ModelClient.create("openai") is not client
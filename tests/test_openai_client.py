@@ -1,22 +1,30 @@
 import asyncio
-from semantix_genai_inference import ModelClient
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.mock_server import MockConfig, MockServer
 
-class OpenAIInferenceClientTests:
+
+class TestOpenAIInferenceClient:
 
     def test_generate_async_with_streaming(self):
-        client = ModelClient.create("openai")
         prompt = [{"role": "user", "content": "Once upon a time"}]
         temperature = 0.5
         top_p = 1.0
         n = 1
         presence_penalty = 0.0
         frequency_penalty = 0.0
-        async def test():
-            async for line in client.generate_stream(prompt, temperature=temperature, top_p=top_p, n=n,
-                                                presence_penalty=presence_penalty, frequency_penalty=frequency_penalty):
-                print(line)
-        asyncio.run(test())
+        with MockServer(MockConfig(tokens=5)) as server:
+            async def test():
+                async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                    return [line async for line in client.generate_stream(prompt, temperature=temperature, top_p=top_p, n=n,
+                                                presence_penalty=presence_penalty, frequency_penalty=frequency_penalty)]
+            lines = asyncio.run(test())
+        assert lines[-2] == b"data: [DONE]\n"
 
-if __name__ == "__main__":
-    OpenAIInferenceClientTests().test_generate_async_with_streaming()
-    print("Done!")
\ No newline at end of file
+    def test_generate(self):
+        with MockServer(MockConfig(tokens=3)) as server:
+            async def test():
+                async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                    return await client.agenerate([{"role": "user", "content": "Once upon a time"}], n=2)
+            response = asyncio.run(test())
+        assert [choice["message"]["content"] for choice in response["choices"]] == ["the model answered"] * 2
+        assert response["usage"]["completion_tokens"] == 6
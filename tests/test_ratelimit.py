@@ -0,0 +1,103 @@
+import asyncio
+import time
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.ratelimit import (RateLimitConfig, RateLimiter, get_rate_limiter,
+                                                          parse_duration)
+from tests.server import LocalServer
+
+
+def test_parse_duration():
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("1.5s") == 1.5
+    assert parse_duration("2") == 2
+    assert parse_duration(None) is None
+
+
+def test_config_from_dict():
+    config = RateLimitConfig.from_dict({"requestsPerMinute": 60, "maxRetries": 2})
+    assert config.requests_per_minute == 60
+    assert config.max_retries == 2
+    try:
+        RateLimitConfig.from_dict({"rpm": 60})
+    except Exception as e:
+        assert "rpm" in str(e)
+    else:
+        raise AssertionError("an unknown key must be rejected")
+
+
+def test_requests_are_paced_once_the_bucket_is_empty():
+    # 600 requests per minute refill one request every 100ms
+    limiter = RateLimiter(RateLimitConfig(requests_per_minute=600))
+    limiter._requests.level = 1
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.18
+
+
+def test_headers_lower_the_remaining_quota():
+    limiter = RateLimiter()
+    limiter.update_from_headers({"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "100",
+                                 "x-ratelimit-remaining-requests": "5"})
+    assert limiter._tokens.capacity == 6000
+    assert limiter._tokens.level == 100
+    # no request limit was sent, so requests stay unpaced
+    assert limiter._requests is None
+
+
+def test_shared_limiter_per_key():
+    assert get_rate_limiter("test:a") is get_rate_limiter("test:a")
+    assert get_rate_limiter("test:a") is not get_rate_limiter("test:b")
+
+
+def test_throttled_requests_are_retried_after_retry_after():
+    calls = []
+
+    async def completions(request):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            return web.json_response({"error": "throttled"}, status=429, headers={"retry-after-ms": "50"})
+        return web.json_response({"choices": [{"message": {"content": "ok"}}]},
+                                 headers={"x-ratelimit-remaining-requests": "10"})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    with LocalServer(app) as server:
+        limiter = RateLimiter(RateLimitConfig(base_delay=0.01))
+
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, rate_limiter=limiter) as client:
+                return await client.agenerate([{"role": "user", "content": "hi"}])
+
+        response = asyncio.run(run())
+    assert response["choices"][0]["message"]["content"] == "ok"
+    assert len(calls) == 3
+    assert limiter.throttled == 2
+    assert calls[1] - calls[0] >= 0.05
+
+
+def test_retries_give_up_after_max_retries():
+    calls = []
+
+    async def completions(request):
+        calls.append(1)
+        return web.json_response({"error": "throttled"}, status=429)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    with LocalServer(app) as server:
+        limiter = RateLimiter(RateLimitConfig(max_retries=1, base_delay=0.01))
+
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, rate_limiter=limiter) as client:
+                return await client.agenerate([{"role": "user", "content": "hi"}])
+
+        response = asyncio.run(run())
+    assert response == {"error": "throttled"}
+    assert len(calls) == 2
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+from semantix_genai_inference.inference import registry
+from semantix_genai_inference.inference.registry import ProviderRegistry
+
+# the modules a client needs, imported by ModelClient.create but not by importing ModelClient
+CLIENT_MODULES = ("semantix_genai_inference.inference.clients", "semantix_genai_inference.inference.session",
+                  "semantix_genai_inference.inference.response_cache", "semantix_genai_inference.inference.semantic_cache",
+                  "asyncio")
+
+
+class FakeEntryPoint:
+    def __init__(self, name, value):
+        self.name = name
+        self.value = value
+
+
+def make_client(config):
+    return ("custom", config)
+
+
+def test_factories_are_imported_on_first_use():
+    providers = ProviderRegistry()
+    providers.register("custom", "tests.test_registry:make_client")
+    assert providers.get("custom")({"a": 1}) == ("custom", {"a": 1})
+
+
+def test_unknown_type_lists_the_valid_ones(monkeypatch):
+    monkeypatch.setattr(registry, "_entry_points", lambda group: [])
+    providers = ProviderRegistry()
+    providers.register("custom", make_client)
+    try:
+        providers.get("missing")
+    except Exception as e:
+        assert "custom" in str(e)
+    else:
+        raise AssertionError("an unknown type must be rejected")
+
+
+def test_entry_points_are_discovered_lazily(monkeypatch):
+    calls = []
+
+    def entry_points(group):
+        calls.append(group)
+        return [FakeEntryPoint("plugin", "tests.test_registry:make_client"), FakeEntryPoint("openai", "nope:nope")]
+
+    monkeypatch.setattr(registry, "_entry_points", entry_points)
+    providers = ProviderRegistry()
+    providers.register("openai", make_client)
+    assert providers.get("openai") is make_client
+    assert calls == []
+    assert providers.get("plugin") is make_client
+    # built-in types win on name clashes
+    assert providers.get("openai") is make_client
+    assert calls == [registry.ENTRY_POINT_GROUP]
+
+
+def imported_modules(statement):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_import_does_not_load_heavy_dependencies():
+    for statement in ("import semantix_genai_inference",
+                      "from semantix_genai_inference import ModelClient",
+                      "import semantix_genai_inference.cli"):
+        modules = imported_modules(statement)
+        assert "aiohttp" not in modules, statement
+        assert "yaml" not in modules, statement
+
+
+def test_importing_model_client_does_not_load_the_clients():
+    statement = "import sys; from semantix_genai_inference import ModelClient; print(' '.join(sys.modules))"
+    result = subprocess.run([sys.executable, "-c", statement], capture_output=True, text=True, check=True)
+    modules = set(result.stdout.split())
+    assert "semantix_genai_inference.inference.model_client" in modules
+    for module in CLIENT_MODULES:
+        assert module not in modules, module
@@ -0,0 +1,93 @@
+import threading
+import time
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.response_cache import DiskCacheBackend, MemoryCacheBackend, ResponseCache
+from tests.server import LocalServer
+
+
+def make_app(calls):
+    async def chat(request):
+        calls.append(await request.json())
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": str(len(calls))}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+def test_deterministic_requests_only():
+    cache = ResponseCache()
+    assert cache.key_for("url", {"messages": [], "temperature": 0}) is not None
+    assert cache.key_for("url", {"messages": [], "temperature": 0.7}) is None
+    assert cache.key_for("url", {"messages": [], "temperature": 0, "n": 3}) is None
+    assert ResponseCache(allow_nondeterministic=True).key_for("url", {"messages": []}) is not None
+    # the key doesn't depend on the order of the body keys
+    assert cache.key_for("url", {"a": 1, "temperature": 0}) == cache.key_for("url", {"temperature": 0, "a": 1})
+
+
+def test_ttl_and_lru_eviction():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set("a", b"1", None)
+    backend.set("b", b"2", None)
+    backend.get("a")
+    backend.set("c", b"3", time.time() - 1)
+    assert backend.get("b") is None
+    assert backend.get("c") is None
+    assert backend.get("a") == b"1"
+    assert backend.stats.evictions == 1
+
+
+def test_disk_reads_write_the_access_time_once_per_interval(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path / "responses.sqlite"), max_entries=2, touch_interval=60)
+    backend.set("a", b"1", None)
+    backend.set("b", b"2", None)
+    changes = backend._db.total_changes
+    assert [backend.get("a") for _ in range(5)] == [b"1"] * 5
+    assert backend._db.total_changes == changes
+    backend.touch_interval = 0
+    backend.get("a")
+    assert backend._db.total_changes == changes + 1
+    # the access time written still drives the eviction
+    backend.set("c", b"3", None)
+    assert (backend.get("a"), backend.get("b")) == (b"1", None)
+    backend.close()
+
+
+def test_disk_writes_keep_a_running_count(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    backend = DiskCacheBackend(path, max_entries=3)
+    statements = []
+    backend._db.set_trace_callback(statements.append)
+    for key in "abcab":
+        backend.set(key, key.encode(), None)
+    assert not any("COUNT" in statement for statement in statements)
+    backend.set("d", b"d", None)
+    backend.set("e", b"e", None)
+    assert backend.stats.evictions == 2
+    backend.close()
+    # a new process starts from the rows on disk
+    reopened = DiskCacheBackend(path, max_entries=3)
+    assert reopened._count == 3
+    reopened.close()
+
+
+def test_generate_uses_the_cache(tmp_path):
+    calls = []
+    messages = [{"role": "user", "content": "classify"}]
+    with LocalServer(make_app(calls)) as server:
+        cache = ResponseCache(DiskCacheBackend(str(tmp_path / "responses.sqlite")))
+        backend_threads = set()
+        get, set_ = cache.backend.get, cache.backend.set
+        cache.backend.get = lambda *args: backend_threads.add(threading.current_thread()) or get(*args)
+        cache.backend.set = lambda *args: backend_threads.add(threading.current_thread()) or set_(*args)
+        with OpenAIInferenceClient(api_key="test", host=server.url, response_cache=cache) as client:
+            first = client.generate(messages, temperature=0)
+            assert client.generate(messages, temperature=0) == first
+            assert client.generate(messages, temperature=0, cache=False) != first
+            client.generate(messages, temperature=1)
+            client.generate(messages, temperature=1)
+    assert len(calls) == 4
+    assert cache.stats.hits == 1
+    # the disk backend is used from the executor, not from the event loop of the client
+    assert backend_threads and all(thread.name.startswith("asyncio_") for thread in backend_threads)
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import pytest
+from aiohttp import web
+from semantix_genai_inference.inference import codec
+from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.response_cache import ResponseCache
+from semantix_genai_inference.inference.responses import ChatCompletion, Embeddings, Generation
+from tests.server import LocalServer
+
+COMPLETION = b'{"choices":[{"index":0,"message":{"role":"assistant","content":"hi"}}],"usage":{"prompt_tokens":3}}'
+
+
+@pytest.fixture(params=["json", "orjson"])
+def backend(request):
+    pytest.importorskip(request.param)
+    yield codec.set_json_backend(request.param)
+    codec.set_json_backend()
+
+
+def test_codec_round_trip(backend):
+    assert codec.json_backend() == backend
+    body = {"messages": [{"role": "user", "content": "olá"}], "logit_bias": {50256: -100}}
+    encoded = codec.dumps(body)
+    assert isinstance(encoded, bytes) and b" " not in encoded
+    # integer keys are sent as strings, as the stdlib json module does
+    assert codec.loads(encoded) == {"messages": [{"role": "user", "content": "olá"}], "logit_bias": {"50256": -100}}
+    assert codec.loads(codec.dumps({"response": ChatCompletion(COMPLETION)}))["response"]["choices"][0]["index"] == 0
+
+
+def test_invalid_backend():
+    with pytest.raises(Exception, match="yaml"):
+        codec.set_json_backend("yaml")
+
+
+def test_responses_are_dicts_keeping_the_received_bytes():
+    response = ChatCompletion(COMPLETION)
+    assert isinstance(response, dict)
+    assert response.raw is COMPLETION
+    assert json.loads(json.dumps(response)) == codec.loads(COMPLETION)
+    assert codec.loads(codec.dumps(response)) == codec.loads(COMPLETION)
+    assert response.content == "hi"
+    assert response.usage == {"prompt_tokens": 3}
+    assert response == codec.loads(COMPLETION) and dict(response) == codec.loads(COMPLETION)
+    assert "choices" in response and response.error is None
+    assert ChatCompletion.from_data({"error": {"message": "bad"}}).content is None
+    response["extra"] = 1
+    assert response["extra"] == 1 and response.to_dict()["extra"] == 1
+    assert Generation.from_data({"generations": [{"text": "once"}]}).text == "once"
+    embeddings = Embeddings(b'{"data":[{"index":1,"embedding":[3,4]},{"index":0,"embedding":[1,2]}]}')
+    assert embeddings.embedding == [3, 4]
+    pytest.importorskip("numpy")
+    assert embeddings.vectors().tolist() == [[1, 2], [3, 4]]
+
+
+def test_cache_stores_the_received_bytes():
+    cache = ResponseCache()
+    cache.set("key", ChatCompletion(COMPLETION))
+    assert cache.backend.get("key") == COMPLETION
+    cached = cache.get("key", ChatCompletion)
+    assert isinstance(cached, ChatCompletion) and cached.content == "hi"
+    cache.set("plain", {"a": 1})
+    assert cache.get("plain") == {"a": 1}
+
+
+def test_clients_send_only_the_arguments_set_and_return_typed_responses():
+    requests = []
+
+    async def chat(request):
+        requests.append((request.headers["Content-Type"], await request.json()))
+        return web.Response(body=COMPLETION, content_type="application/json")
+
+    async def generate(request):
+        requests.append((request.headers["Content-Type"], await request.json()))
+        return web.json_response({"generations": [{"text": "once"}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    app.router.add_post("/v1/generate", generate)
+    with LocalServer(app) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as openai:
+                chat_response = await openai.agenerate([{"role": "user", "content": "hi"}], temperature=0, n=2)
+            cohere = CohereInferenceClient(api_key="test")
+            cohere._host = server.url
+            async with cohere:
+                generation = await cohere.agenerate("once", max_tokens=5)
+            return chat_response, generation
+        chat_response, generation = asyncio.run(run())
+    assert isinstance(chat_response, ChatCompletion) and chat_response.raw == COMPLETION
+    assert isinstance(generation, Generation) and generation.text == "once"
+    assert requests[0] == ("application/json", {"messages": [{"role": "user", "content": "hi"}], "model": "gpt-4",
+                                                "temperature": 0, "n": 2})
+    assert requests[1] == ("application/json", {"prompt": "once", "max_tokens": 5})
@@ -0,0 +1,181 @@
+import asyncio
+import json
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.llm.router import RouterInferenceClient
+from semantix_genai_inference.inference.model_client import ModelClient
+from semantix_genai_inference.inference.routing import Backend, CircuitBreaker, Router, RoutingConfig
+from semantix_genai_inference.inference.session import ResponseError
+from tests.server import LocalServer
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def make_app(status=200, content="ok", calls=None):
+    async def completions(request):
+        if calls is not None:
+            calls.append(1)
+        body = await request.json()
+        if status != 200:
+            return web.json_response({"error": {"message": "failed"}}, status=status)
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            chunk = {"choices": [{"index": 0, "delta": {"content": content}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+            return response
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": content}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    return app
+
+
+def make_router(urls, **config):
+    backends = [Backend(OpenAIInferenceClient(api_key="test", host=url), name) for name, url in urls]
+    return RouterInferenceClient(backends, RoutingConfig(**config))
+
+
+def test_circuit_breaker_opens_and_recovers():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.on_failure(0)
+    assert breaker.available(0)
+    breaker.on_failure(0)
+    assert not breaker.available(5)
+    assert breaker.available(10)
+    breaker.on_dispatch()
+    # only one trial request while half-open
+    assert not breaker.available(10)
+    breaker.on_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_fails_over_and_ejects_unhealthy_backend():
+    failing_calls = []
+    with LocalServer(make_app(status=503, calls=failing_calls)) as failing, LocalServer(make_app()) as healthy:
+        async def run():
+            async with make_router([("failing", failing.url), ("healthy", healthy.url)],
+                                   policy="ewma", failure_threshold=2) as router:
+                responses = [await router.agenerate(MESSAGES) for _ in range(6)]
+                return responses, router.backends
+
+        responses, backends = asyncio.run(run())
+    assert all(r["choices"][0]["message"]["content"] == "ok" for r in responses)
+    assert backends[0].breaker.state == CircuitBreaker.OPEN
+    assert len(failing_calls) == 2
+
+
+def test_the_clients_of_the_backends_are_left_unchanged():
+    with LocalServer(make_app(status=503)) as failing, LocalServer(make_app()) as healthy:
+        async def run():
+            async with make_router([("failing", failing.url), ("healthy", healthy.url)], policy="weighted") as router:
+                client = router.backends[0].client
+                routed = [await router.agenerate(MESSAGES) for _ in range(4)]
+                lines = [line async for line in router.generate_stream(MESSAGES)]
+                return client, routed, lines, await client.agenerate(MESSAGES)
+
+        client, routed, lines, direct = asyncio.run(run())
+    assert not client.raise_for_status
+    assert all(r["choices"][0]["message"]["content"] == "ok" for r in routed)
+    assert lines[0].startswith(b"data: ")
+    # used directly, the client still returns the error body
+    assert direct["error"] == {"message": "failed"}
+
+
+def test_client_errors_are_not_failed_over():
+    calls = []
+    with LocalServer(make_app(status=400, calls=calls)) as bad, LocalServer(make_app(status=400, calls=calls)) as bad2:
+        async def run():
+            async with make_router([("a", bad.url), ("b", bad2.url)]) as router:
+                try:
+                    await router.agenerate(MESSAGES)
+                except ResponseError as e:
+                    return e, router.backends
+
+        error, backends = asyncio.run(run())
+    assert error.status == 400
+    assert len(calls) == 1
+    assert all(b.breaker.state == CircuitBreaker.CLOSED for b in backends)
+
+
+def test_all_backends_failing_raises_last_error():
+    with LocalServer(make_app(status=500)) as first, LocalServer(make_app(status=502)) as second:
+        async def run():
+            async with make_router([("a", first.url), ("b", second.url)]) as router:
+                try:
+                    await router.agenerate(MESSAGES)
+                except ResponseError as e:
+                    return e
+
+        assert asyncio.run(run()).status in (500, 502)
+
+
+def test_least_outstanding_spreads_concurrent_requests():
+    first_calls, second_calls = [], []
+    with LocalServer(make_app(calls=first_calls)) as first, LocalServer(make_app(calls=second_calls)) as second:
+        async def run():
+            async with make_router([("a", first.url), ("b", second.url)]) as router:
+                await asyncio.gather(*(router.agenerate(MESSAGES) for _ in range(10)))
+
+        asyncio.run(run())
+    assert len(first_calls) == len(second_calls) == 5
+
+
+def test_unsampled_backends_share_concurrent_requests():
+    warm, cold = Backend(None, "warm"), Backend(None, "cold")
+    warm.ewma = 0.1
+    router = Router([warm, cold], RoutingConfig(policy="ewma"))
+    picked = [router._acquire(set()).name for _ in range(10)]
+    # a cold backend is expected to be as fast as the warm ones, so it does not take the whole burst
+    assert picked.count("warm") == picked.count("cold") == 5
+
+
+def test_stream_fails_over_before_first_delta():
+    with LocalServer(make_app(status=429)) as throttled, LocalServer(make_app(content="streamed")) as healthy:
+        async def run():
+            async with make_router([("throttled", throttled.url), ("healthy", healthy.url)], policy="weighted") as router:
+                results = []
+                for _ in range(4):
+                    results.append([d.content async for d in router.generate_stream_deltas(MESSAGES)])
+                return results
+
+        results = asyncio.run(run())
+    assert results == [["streamed"]] * 4
+
+
+def test_model_client_creates_router(tmp_path, monkeypatch):
+    config = tmp_path / "semantix.yaml"
+    config.write_text("""
+providers:
+  openai:
+    apiKey: "key"
+    chat:
+      model: "gpt-4"
+      version: "v1"
+  azureOpenai:
+    apiKey: "azure-key"
+    chat:
+      apiBase: "https://east.openai.azure.com"
+      deploymentId: "gpt-4"
+      apiVersion: "2023-08-01-preview"
+router:
+  policy: ewma
+  failureThreshold: 3
+  backends:
+    - type: azure-openai
+      name: east
+      weight: 2
+    - type: azure-openai
+      name: west
+      chat:
+        apiBase: "https://west.openai.azure.com"
+    - type: openai
+""")
+    monkeypatch.setenv("SEMANTIX_CONFIG_FILE", str(config))
+    router = ModelClient.create("router")
+    assert [b.name for b in router.backends] == ["east", "west", "openai-2"]
+    assert router.backends[0].weight == 2
+    assert router.backends[1].client._host == "https://west.openai.azure.com"
+    assert router.backends[1].client._deployment_id == "gpt-4"
+    assert router._router.config.policy == "ewma"
+    assert router._router.config.failure_threshold == 3
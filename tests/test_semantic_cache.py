@@ -0,0 +1,180 @@
+import asyncio
+import random
+import threading
+import zlib
+import numpy as np
+import pytest
+from aiohttp import web
+from semantix_genai_inference.inference.llm.azure_openai import AzureOpenAIInferenceClient
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.providers import create_azure_openai
+from semantix_genai_inference.inference.responses import ChatCompletion
+from semantix_genai_inference.inference.semantic_cache import SemanticCache
+from tests.server import LocalServer
+
+URL = "https://api.openai.com/v1/chat/completions"
+
+
+def body(prompt, **params):
+    return {"model": "gpt-4", "temperature": 0, "messages": [{"role": "system", "content": "Be brief."},
+                                                              {"role": "user", "content": prompt}], **params}
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_config_from_dict():
+    cache = SemanticCache.from_dict({"threshold": 0.9, "maxEntries": 10, "approximateFrom": None})
+    assert (cache.threshold, cache.max_entries, cache.approximate_from) == (0.9, 10, None)
+    with pytest.raises(Exception, match="size"):
+        SemanticCache.from_dict({"size": 10})
+
+
+def test_partitions_ignore_only_the_prompt():
+    cache = SemanticCache()
+    partition, prompt = cache.query_for(URL, body("What is the capital of France?"))
+    assert prompt == "What is the capital of France?"
+    assert cache.query_for(URL, body("The capital of France?"))[0] == partition
+    assert cache.query_for(URL, body("The capital of France?", max_tokens=5))[0] != partition
+    assert cache.query_for(URL, body("The capital of France?", temperature=1)) is None
+    assert SemanticCache(allow_nondeterministic=True).query_for(URL, body("Hi", temperature=1)) is not None
+
+
+def test_hits_above_the_threshold():
+    cache = SemanticCache(threshold=0.9)
+    cache.set("a", unit(1, 0, 0), "capital of France", {"answer": "Paris"})
+    assert cache.get("a", unit(1, 0.1, 0)) == {"answer": "Paris"}
+    assert cache.get("a", unit(1, 1, 0)) is None
+    # the rest of the request must match
+    assert cache.get("b", unit(1, 0, 0)) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    response = ChatCompletion(b'{"choices": []}')
+    cache.set("a", unit(0, 1, 0), "other", response)
+    assert cache.get("a", unit(0, 1, 0), ChatCompletion).raw == response.raw
+
+
+def test_least_recently_used_are_evicted():
+    cache = SemanticCache(max_entries=2)
+    cache.set("a", unit(1, 0, 0), "x", {"n": 1})
+    cache.set("a", unit(0, 1, 0), "y", {"n": 2})
+    assert cache.get("a", unit(1, 0, 0)) == {"n": 1}
+    cache.set("a", unit(0, 0, 1), "z", {"n": 3})
+    assert len(cache) == 2 and cache.stats.evictions == 1
+    assert cache.get("a", unit(0, 1, 0)) is None
+    assert cache.get("a", unit(1, 0, 0)) == {"n": 1}
+
+
+def test_evicted_partitions_are_forgotten(tmp_path):
+    cache = SemanticCache(max_entries=2)
+    for i in range(6):
+        cache.set(f"p{i}", unit(1, i, 0), "x", {"n": i})
+    assert sorted(cache._codes) == ["p4", "p5"]
+    path = str(tmp_path / "semantic.npz")
+    cache.save(path)
+    loaded = SemanticCache(path=path)
+    assert sorted(loaded._codes) == ["p4", "p5"]
+    assert loaded.get("p5", unit(1, 5, 0)) == {"n": 5}
+    assert loaded.get("p4", unit(1, 4, 0)) == {"n": 4}
+
+
+def test_persistence(tmp_path):
+    path = str(tmp_path / "semantic.npz")
+    cache = SemanticCache(path=path)
+    cache.set("a", unit(1, 0, 0), "x", {"answer": "Olá"})
+    cache.set("b", unit(0, 1, 0), "y", {"answer": "Paris"})
+    cache.save()
+    loaded = SemanticCache(path=path)
+    assert len(loaded) == 2
+    assert loaded.get("a", unit(1, 0, 0)) == {"answer": "Olá"}
+    assert loaded.get("b", unit(0, 1, 0)) == {"answer": "Paris"}
+    assert len(SemanticCache(path=path, max_entries=1)) == 1
+
+
+def test_approximate_index_finds_the_stored_prompts():
+    generator = np.random.default_rng(1)
+    vectors = generator.normal(size=(400, 32)).astype(np.float32)
+    cache = SemanticCache(threshold=0.99, approximate_from=100, probes=4)
+    for i, vector in enumerate(vectors):
+        cache.set("a", vector, str(i), {"n": i})
+    assert cache._centroids is not None and cache._clustered_at == 400
+    found = [cache.get("a", vector + generator.normal(scale=0.01, size=32))["n"] for vector in vectors[::20]]
+    assert found == list(range(0, 400, 20))
+
+
+def test_azure_needs_an_embeddings_deployment():
+    with pytest.raises(Exception, match="embeddings"):
+        AzureOpenAIInferenceClient("https://example.openai.azure.com", "gpt-4", "2023-08-01-preview", api_key="test",
+                                   semantic_cache=SemanticCache())
+    chat = {"apiBase": "https://example.openai.azure.com", "deploymentId": "gpt-4", "apiVersion": "2023-08-01-preview"}
+    config = {"providers": {"azureOpenai": {"apiKey": "test", "chat": chat, "semanticCache": {"threshold": 0.9}}}}
+    with pytest.raises(Exception, match="embeddings"):
+        create_azure_openai(config)
+    config["providers"]["azureOpenai"]["semanticCache"]["embeddings"] = {"deploymentId": "ada"}
+    client = create_azure_openai(config)
+    assert client.semantic_cache.threshold == 0.9
+    assert client.embeddings_client._deployment_id == "ada"
+
+
+def embeddings_app(requests):
+    def embed(text):
+        # rephrasings differing by case and punctuation get the same vector
+        words = "".join(c for c in text.lower() if c.isalnum() or c.isspace()).split()
+        generator = random.Random(zlib.crc32(" ".join(words).encode()))
+        return [generator.uniform(-1, 1) for _ in range(16)]
+
+    async def embeddings(request):
+        requests.append("embeddings")
+        data = await request.json()
+        if data["input"] == "fail":
+            return web.json_response({"error": {"message": "The server had an error."}}, status=500)
+        return web.json_response({"data": [{"index": 0, "embedding": embed(data["input"])}]})
+
+    async def chat(request):
+        requests.append("chat")
+        data = await request.json()
+        answer = f"answer to {data['messages'][-1]['content']}"
+        return web.json_response({"choices": [{"index": 0, "message": {"role": "assistant", "content": answer}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/embeddings", embeddings)
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+def test_rephrased_prompts_skip_the_completion():
+    requests, threads = [], set()
+    cache = SemanticCache()
+    get, set_ = cache.get, cache.set
+    cache.get = lambda *args: threads.add(threading.current_thread()) or get(*args)
+    cache.set = lambda *args: threads.add(threading.current_thread()) or set_(*args)
+    with LocalServer(embeddings_app(requests)) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, semantic_cache=cache) as client:
+                first = await client.agenerate([{"role": "user", "content": "What is the capital of France?"}], temperature=0)
+                second = await client.agenerate([{"role": "user", "content": "what is the capital of france"}], temperature=0)
+                other = await client.agenerate([{"role": "user", "content": "And of Brazil?"}], temperature=0)
+                return first.content, second.content, other.content
+
+        first, second, other = asyncio.run(run())
+    assert first == second == "answer to What is the capital of France?"
+    assert other == "answer to And of Brazil?"
+    assert requests == ["embeddings", "chat", "embeddings", "embeddings", "chat"]
+    # the vectors are scanned and clustered in the executor, not on the event loop
+    assert threads and all(thread.name.startswith("asyncio_") for thread in threads)
+
+
+def test_embedding_errors_are_misses():
+    requests = []
+    with LocalServer(embeddings_app(requests)) as server:
+        async def run():
+            cache = SemanticCache()
+            async with OpenAIInferenceClient(api_key="test", host=server.url, semantic_cache=cache) as client:
+                response = await client.agenerate([{"role": "user", "content": "fail"}], temperature=0)
+                return response.content, cache
+
+        content, cache = asyncio.run(run())
+    assert content == "answer to fail"
+    assert requests == ["embeddings", "chat"]
+    assert len(cache) == 0 and cache.stats.misses == 1
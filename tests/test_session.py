@@ -0,0 +1,46 @@
+import asyncio
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.session import SessionConfig
+from tests.server import LocalServer
+
+
+def make_app(peers):
+    async def chat(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        return web.json_response({"model": body["model"], "choices": []})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    return app
+
+
+def test_session_config_from_dict():
+    config = SessionConfig.from_dict({"limit": 10, "limitPerHost": 5, "dnsCacheTtl": 60, "timeout": 30})
+    assert config.limit == 10
+    assert config.limit_per_host == 5
+    assert config.dns_cache_ttl == 60
+    assert config.timeout == 30
+    assert config.keepalive_timeout == 30
+
+
+def test_connections_are_reused_within_a_loop():
+    peers = set()
+    with LocalServer(make_app(peers)) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                for _ in range(5):
+                    response = await client._generate_async([{"role": "user", "content": "hi"}])
+                    assert response["model"] == "gpt-4"
+                session = await client._get_session()
+            assert session.closed
+        asyncio.run(run())
+    assert len(peers) == 1
+
+
+def test_sync_generate():
+    peers = set()
+    with LocalServer(make_app(peers)) as server:
+        client = OpenAIInferenceClient(api_key="test", host=server.url)
+        assert client.generate([{"role": "user", "content": "hi"}]) == {"model": "gpt-4", "choices": []}
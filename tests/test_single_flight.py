@@ -0,0 +1,171 @@
+import asyncio
+import pytest
+from semantix_genai_inference.inference.deadline import DeadlineExceeded, deadline
+from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.providers import client_options
+from semantix_genai_inference.inference.session import ResponseError
+from semantix_genai_inference.inference.single_flight import SingleFlight
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_config_from_dict():
+    assert SingleFlight.from_dict({"allowNondeterministic": True}).allow_nondeterministic
+    assert not SingleFlight.from_dict(True).allow_nondeterministic
+    with pytest.raises(Exception, match="ttl"):
+        SingleFlight.from_dict({"ttl": 1})
+    config = {"providers": {"openai": {"singleFlight": {"allowNondeterministic": True}}}}
+    assert client_options(config, "openai")["single_flight"].allow_nondeterministic
+
+
+def test_identical_calls_share_one_request():
+    single_flight = SingleFlight()
+    with MockServer(MockConfig(latency=0.1, embedding_size=8)) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, single_flight=single_flight) as client:
+                responses = await asyncio.gather(*(client.agenerate(MESSAGES, temperature=0) for _ in range(20)))
+                embeddings = await asyncio.gather(*(client.aembeddings("same text") for _ in range(5)))
+                # nothing is kept once the request completes
+                await client.agenerate(MESSAGES, temperature=0)
+                return responses, embeddings
+
+        responses, embeddings = asyncio.run(run())
+        assert server.requests == 3
+    assert all(response is responses[0] for response in responses)
+    assert embeddings[4].embedding == embeddings[0].embedding
+    assert (single_flight.stats.leaders, single_flight.stats.shared) == (3, 23)
+
+
+def test_nondeterministic_calls_are_shared_only_when_allowed():
+    with MockServer(MockConfig(latency=0.05)) as server:
+        async def run(single_flight):
+            async with OpenAIInferenceClient(api_key="test", host=server.url, single_flight=single_flight) as client:
+                await asyncio.gather(*(client.agenerate(MESSAGES, temperature=0.7) for _ in range(4)))
+
+        asyncio.run(run(SingleFlight()))
+        assert server.requests == 4
+        asyncio.run(run(SingleFlight(allow_nondeterministic=True)))
+        assert server.requests == 5
+
+
+def test_streams_fan_out_to_every_subscriber():
+    single_flight = SingleFlight()
+    with MockServer(MockConfig(tokens=6, chunk_delay=0.02)) as server:
+        async def read(client, delay):
+            await asyncio.sleep(delay)
+            return "".join([delta.content or "" async for delta in client.generate_stream_deltas(MESSAGES, temperature=0)])
+
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, single_flight=single_flight) as client:
+                # the late subscribers join mid-stream and replay it from the start
+                texts = await asyncio.gather(*(read(client, delay) for delay in (0, 0, 0.05, 0.08)))
+                lines = [line async for line in client.generate_stream(MESSAGES, temperature=0)]
+                return texts, lines
+
+        texts, lines = asyncio.run(run())
+        assert server.requests == 2
+    assert texts == ["the model answered with a short"] * 4
+    assert lines[-2:] == [b"data: [DONE]\n", b"\n"]
+
+
+def test_errors_reach_every_caller():
+    single_flight = SingleFlight()
+    with MockServer(MockConfig(latency=0.05, error_rate=1.0)) as server:
+        async def generate(client):
+            async for delta in client.generate_stream("Once upon a time", temperature=0):
+                pass
+
+        async def run():
+            async with CohereInferenceClient(api_key="test", generate_model="command",
+                                             single_flight=single_flight) as client:
+                client._host = server.url
+                return await asyncio.gather(*(generate(client) for _ in range(3)), return_exceptions=True)
+
+        errors = asyncio.run(run())
+        assert server.requests == 1
+    assert all(isinstance(error, ResponseError) and error.status == 500 for error in errors)
+
+
+def test_cancelling_every_caller_cancels_the_request():
+    single_flight = SingleFlight()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        callers = [asyncio.ensure_future(single_flight.call("key", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel()
+        await asyncio.sleep(0.01)
+        assert not cancelled
+        for caller in callers[1:]:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_requests_after_a_cancelled_flight_start_a_new_one():
+    async def run():
+        single_flight = SingleFlight()
+        opened = []
+
+        async def events():
+            opened.append(True)
+            for i in range(3):
+                yield i
+                await asyncio.sleep(0)
+
+        first = single_flight.stream("key", events)
+        assert await first.__anext__() == 0
+        # the pump is cancelled but not done yet when the identical stream arrives
+        await first.aclose()
+        second = [event async for event in single_flight.stream("key", events)]
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return "result"
+
+        cancelled = asyncio.ensure_future(single_flight.call("key", fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        return second, len(opened), await single_flight.call("key", fetch)
+
+    assert asyncio.run(run()) == ([0, 1, 2], 2, "result")
+
+
+def test_deadlines_bound_only_their_own_caller():
+    single_flight = SingleFlight()
+    with MockServer(MockConfig(latency=0.3, tokens=6, chunk_delay=0.02)) as server:
+        async def leader(call):
+            with deadline(0.1):
+                return await call()
+
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url, single_flight=single_flight) as client:
+                async def generate():
+                    return await client.agenerate(MESSAGES, temperature=0)
+
+                async def stream():
+                    return "".join([delta.content or "" async for delta in
+                                    client.generate_stream_deltas(MESSAGES, temperature=0)])
+
+                first = await asyncio.gather(leader(generate), generate(), return_exceptions=True)
+                second = await asyncio.gather(leader(stream), stream(), return_exceptions=True)
+                return first, second
+
+        (timed_out, response), (stream_timed_out, text) = asyncio.run(run())
+        assert server.requests == 2
+    assert type(timed_out) is DeadlineExceeded and type(stream_timed_out) is DeadlineExceeded
+    assert response.content == "the model answered with a short"
+    assert text == "the model answered with a short"
@@ -0,0 +1,195 @@
+import asyncio
+import json
+from aiohttp import web
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+import pytest
+from semantix_genai_inference.inference.streaming import (ChatCompletionDelta, ChatStreamAccumulator, ChoiceStreams,
+                                                           SSEParser, StoppableStream, accumulate)
+from semantix_genai_inference.mock_server import MockConfig, MockServer
+from tests.server import LocalServer
+
+CHUNKS = [
+    {"id": "1", "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]},
+    {"id": "1", "choices": [{"index": 0, "delta": {"content": "Olá"}, "finish_reason": None}]},
+    {"id": "1", "choices": [{"index": 0, "delta": {"content": " mundo"}, "finish_reason": None}]},
+    {"id": "1", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]},
+]
+
+
+def encode_stream(chunks):
+    events = b"".join(b"data: " + json.dumps(chunk, ensure_ascii=False).encode() + b"\n\n" for chunk in chunks)
+    return b": keep-alive\n\n" + events + b"data: [DONE]\n\n"
+
+
+def test_parser_handles_frames_split_anywhere():
+    stream = encode_stream(CHUNKS).replace(b"\n", b"\r\n")
+    for size in (1, 3, 7, len(stream)):
+        parser = SSEParser()
+        events = []
+        for i in range(0, len(stream), size):
+            events.extend(parser.feed(stream[i:i + size]))
+        events.extend(parser.close())
+        assert events == [json.dumps(chunk, ensure_ascii=False) for chunk in CHUNKS] + ["[DONE]"]
+
+
+def test_accumulator_joins_content_and_function_calls():
+    accumulator = ChatStreamAccumulator()
+    for chunk in CHUNKS:
+        accumulator.add(ChatCompletionDelta.from_dict(chunk))
+    accumulator.add(ChatCompletionDelta.from_dict(
+        {"choices": [{"index": 1, "delta": {"function_call": {"name": "get", "arguments": "{\"a\""}}}]}))
+    accumulator.add(ChatCompletionDelta.from_dict(
+        {"choices": [{"index": 1, "delta": {"function_call": {"arguments": ": 1}"}}, "finish_reason": "function_call"}]}))
+    assert accumulator.message(0) == {"role": "assistant", "content": "Olá mundo"}
+    choices = accumulator.choices()
+    assert choices[1]["message"]["function_call"] == {"name": "get", "arguments": "{\"a\": 1}"}
+    assert choices[1]["finish_reason"] == "function_call"
+
+
+def test_generate_stream_deltas():
+    async def chat(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        stream = encode_stream(CHUNKS)
+        # write in small pieces so frames are split across TCP chunks
+        for i in range(0, len(stream), 5):
+            await response.write(stream[i:i + 5])
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    with LocalServer(app) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                return await accumulate(client.generate_stream_deltas([{"role": "user", "content": "oi"}]))
+
+        choices = asyncio.run(run())
+    assert choices == [{"index": 0, "message": {"role": "assistant", "content": "Olá mundo"}, "finish_reason": "stop"}]
+
+
+def test_generate_stream_choices():
+    with MockServer(MockConfig(tokens=3, chunk_delay=0.001)) as server:
+        async def read(choice, delay):
+            words = []
+            async for delta in choice:
+                words.append(delta.content)
+                await asyncio.sleep(delay)
+            return choice.index, "".join(word for word in words if word)
+
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                async with client.generate_stream_choices([{"role": "user", "content": "hi"}], n=3, max_buffer=2) as choices:
+                    return await asyncio.gather(*(read(choice, 0.002 * choice.index) for choice in choices))
+
+        results = asyncio.run(run())
+    assert results == [(i, "the model answered") for i in range(3)]
+
+
+def chunks(n, words):
+    yield ChatCompletionDelta.from_dict({"choices": [{"index": i, "delta": {"role": "assistant"}} for i in range(n)]})
+    for word in words:
+        yield ChatCompletionDelta.from_dict({"choices": [{"index": i, "delta": {"content": word}} for i in range(n)]})
+
+
+async def upstream(n, words, error=None):
+    for delta in chunks(n, words):
+        await asyncio.sleep(0)
+        yield delta
+    if error is not None:
+        raise error
+
+
+def test_choice_streams_backpressure_and_closing():
+    async def run():
+        async with ChoiceStreams(upstream(2, [str(i) for i in range(20)]), 2, max_buffer=3) as (first, second):
+            await asyncio.sleep(0.01)
+            # the reader of the upstream waits for the first choice, which nobody reads yet
+            assert first._buffer.qsize() == 3 and second._buffer.qsize() == 3
+            second.aclose()
+            contents = [delta.content async for delta in first]
+            assert [delta async for delta in second] == []
+            return contents
+
+    assert asyncio.run(run()) == [None] + [str(i) for i in range(20)]
+
+
+def test_choice_streams_raise_upstream_errors():
+    async def run():
+        async with ChoiceStreams(upstream(2, ["a", "b"], Exception("connection lost")), 2) as choices:
+            for choice in choices:
+                with pytest.raises(Exception, match="connection lost"):
+                    async for _ in choice:
+                        pass
+
+    asyncio.run(run())
+
+
+def words(*pieces):
+    async def deltas():
+        for piece in pieces:
+            yield ChatCompletionDelta.from_dict({"choices": [{"index": 0, "delta": {"content": piece}}]})
+    return deltas()
+
+
+def test_stop_conditions():
+    async def run(deltas, **conditions):
+        stream = StoppableStream(deltas, **conditions)
+        text = "".join([delta.content async for delta in stream])
+        return text, stream.stop_reason, stream.cut
+
+    assert asyncio.run(run(words("Answer: 42", "</answer>", "more"), pattern="</answer>")) == \
+        ("Answer: 42", "pattern", "</answer>")
+    assert asyncio.run(run(words("Answer: 42 is", " the end"), pattern=r"\d+ is")) == ("Answer: ", "pattern", "42 is")
+    assert asyncio.run(run(words("abc", "def", "ghi"), max_chars=5)) == ("abcde", "max_chars", "f")
+    assert asyncio.run(run(words("one.", " two.", " three."), predicate=lambda text: text.count(".") == 2)) == \
+        ("one. two.", "predicate", "")
+    assert asyncio.run(run(words("abc", "def"), max_chars=10)) == ("abcdef", None, "")
+
+
+def test_stop_strings_only_scan_the_end_of_the_text():
+    async def run(pieces, **conditions):
+        stream = StoppableStream(words(*pieces), **conditions)
+        text = "".join([delta.content async for delta in stream])
+        return text, stream.stop_reason, stream.cut, stream
+
+    # the stop strings span deltas, the text yielded before the delta is not taken back
+    assert asyncio.run(run(["Answer: 42</an", "swer>more"], stop=["</answer>", "\n\n"]))[:3] == \
+        ("Answer: 42</an", "stop", "</answer>more")
+    assert asyncio.run(run(["abc", "de"], stop="</x>", pattern=r"c\s*d", pattern_window=2))[:3] == \
+        ("abc", "pattern", "cde")
+    text, reason, _, stream = asyncio.run(run(["word "] * 2000, stop="</answer>"))
+    assert reason is None and stream.text() == text == "word " * 2000
+    # only the last 8 characters are kept to be scanned with the next delta
+    assert stream._tails[0] == "rd word "
+
+
+def test_stopping_closes_the_connection():
+    disconnected = []
+
+    async def chat(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for i in range(500):
+                chunk = {"choices": [{"index": 0, "delta": {"content": f" {i}"}}]}
+                await response.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+                await asyncio.sleep(0.01)
+        except ConnectionResetError:
+            disconnected.append(True)
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    with LocalServer(app) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as client:
+                stream = StoppableStream(client.generate_stream_deltas([{"role": "user", "content": "hi"}]), pattern=" 5")
+                text = "".join([delta.content async for delta in stream])
+                for _ in range(100):
+                    if disconnected:
+                        break
+                    await asyncio.sleep(0.01)
+                return text, stream.stop_index
+
+        assert asyncio.run(run()) == (" 0 1 2 3 4", 0)
+    assert disconnected
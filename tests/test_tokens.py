@@ -0,0 +1,105 @@
+import asyncio
+from aiohttp import web
+from semantix_genai_inference.inference.llm.azure_openai import AzureOpenAIInferenceClient
+from semantix_genai_inference.inference.llm.cohere import CohereInferenceClient
+from semantix_genai_inference.inference.llm.openai import OpenAIInferenceClient
+from semantix_genai_inference.inference.tokens import (ContextWindowExceeded, context_window, count_message_tokens,
+                                                       count_tokens, fit_messages, fit_prompt, truncate_text)
+from tests.server import LocalServer
+
+
+def test_count_tokens():
+    assert count_tokens("") == 0
+    assert count_tokens("Hello, world!") == 4
+    assert count_tokens("The year 2023") == 4
+    # long words are split
+    assert count_tokens("internationalization") == 5
+    assert count_tokens("a" * 40) == 10
+
+
+def test_count_message_tokens_adds_the_chat_format():
+    messages = [{"role": "user", "content": "Hello"}]
+    assert count_message_tokens(messages) == 3 + 3 + count_tokens("user") + count_tokens("Hello")
+
+
+def test_context_window_uses_the_longest_prefix():
+    assert context_window("gpt-4") == 8192
+    assert context_window("gpt-4-32k-0613") == 32768
+    assert context_window("gpt-35-turbo-16k") == 16384
+    # the newer gpt-4 families are not the 8k gpt-4
+    for model in ("gpt-4o", "gpt-4o-mini", "gpt-4-turbo-2024-04-09", "gpt-4-1106-preview", "gpt-4-0125-preview"):
+        assert context_window(model) == 128000
+    assert context_window("my-model") is None
+
+
+def test_fit_messages_computes_max_tokens():
+    messages = [{"role": "user", "content": "Hello"}]
+    _, max_tokens = fit_messages(messages, 100, "auto", None)
+    assert max_tokens == 100 - count_message_tokens(messages)
+
+
+def test_fit_messages_rejects_or_truncates():
+    messages = [{"role": "system", "content": "Be brief."}] + \
+        [{"role": "user", "content": "word " * 50} for _ in range(5)] + [{"role": "user", "content": "Last"}]
+    try:
+        fit_messages(messages, 200, 20, "error")
+    except ContextWindowExceeded as e:
+        assert e.context_window == 200
+    else:
+        raise AssertionError("an oversized prompt must be rejected")
+    fitted, max_tokens = fit_messages(messages, 200, 20, "truncate")
+    assert fitted[0] == messages[0]
+    assert fitted[-1] == messages[-1]
+    assert len(fitted) < len(messages)
+    assert count_message_tokens(fitted) + 20 <= 200
+    assert max_tokens == 20
+
+
+def test_fit_prompt_keeps_the_end():
+    prompt = " ".join(str(i) for i in range(1000))
+    fitted, max_tokens = fit_prompt(prompt, 100, 10, "truncate")
+    assert prompt.endswith(fitted)
+    assert count_tokens(fitted) <= 90
+    assert truncate_text("short", 10) == "short"
+
+
+def test_openai_client_rejects_before_sending():
+    # nothing listens on this port, the error must come from the pre-flight check
+    client = OpenAIInferenceClient(api_key="test", host="http://127.0.0.1:9", overflow="error", context_window=50)
+    try:
+        client.generate([{"role": "user", "content": "word " * 100}])
+    except ContextWindowExceeded:
+        pass
+    else:
+        raise AssertionError("an oversized prompt must be rejected")
+    finally:
+        client.close()
+
+
+def test_clients_send_the_computed_max_tokens():
+    bodies = []
+
+    async def handler(request):
+        bodies.append(await request.json())
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    app.router.add_post("/openai/deployments/gpt-35-turbo/chat/completions", handler)
+    app.router.add_post("/v1/generate", handler)
+    messages = [{"role": "user", "content": "Hello"}]
+    with LocalServer(app) as server:
+        async def run():
+            async with OpenAIInferenceClient(api_key="test", host=server.url) as openai:
+                await openai.agenerate(messages, max_tokens="auto")
+            async with AzureOpenAIInferenceClient(server.url, "gpt-35-turbo", "2023-08-01-preview",
+                                                  api_key="test") as azure:
+                await azure.agenerate(messages, max_tokens="auto")
+            async with CohereInferenceClient(api_key="test") as cohere:
+                cohere._host = server.url
+                await cohere.agenerate("Hello", max_tokens="auto")
+
+        asyncio.run(run())
+    assert bodies[0]["max_tokens"] == 8192 - count_message_tokens(messages)
+    assert bodies[1]["max_tokens"] == 4096 - count_message_tokens(messages)
+    assert bodies[2]["max_tokens"] == 4096 - count_tokens("Hello")